@@ -86,17 +86,10 @@ def get_account_names() -> dict[str, str]:
 
 def get_community_overall_stats(pool_id: str, queue_id: int, min_friends: int) -> dict:
     df = _q("""
-        WITH group_matches AS (
-            SELECT m.match_id,
-                   (SELECT win FROM player_performances pp
-                    WHERE pp.match_id = m.match_id AND pp.is_friend = TRUE
-                    LIMIT 1) AS group_win
-            FROM matches m
-            WHERE m.pool_id = %s AND m.queue_id = %s AND cardinality(m.friends_present) >= %s
-        )
         SELECT COUNT(*) AS total_matches,
                SUM(CASE WHEN group_win THEN 1 ELSE 0 END) AS total_wins
-        FROM group_matches
+        FROM matches
+        WHERE pool_id = %s AND queue_id = %s AND friends_count >= %s
     """, (pool_id, queue_id, min_friends))
     if df.empty:
         return {"matches": 0, "winrate": 0}
@@ -138,10 +131,10 @@ def get_top_outsider_allies(pool_id: str, queue_id: int, min_friends: int) -> pd
 
 def get_winrate_by_persona(pool_id: str, queue_id: int, min_friends: int) -> pd.DataFrame:
     return _q("""
-        SELECT persona, SUM(wins) AS wins, SUM(losses) AS losses, 
-               SUM(total_matches) AS total_matches,
-               ROUND((SUM(wins)::numeric / GREATEST(SUM(total_matches), 1)) * 100, 2) AS winrate
-        FROM metric_01_players_winrate
+        SELECT persona, SUM(wins) AS wins, SUM(games - wins) AS losses,
+               SUM(games) AS total_matches,
+               ROUND((SUM(wins)::numeric / GREATEST(SUM(games), 1)) * 100, 2) AS winrate
+        FROM metric_agg_persona
         WHERE pool_id = %s AND queue_id = %s AND friends_count >= %s
         GROUP BY persona
         ORDER BY winrate DESC
@@ -156,7 +149,8 @@ def get_winrate_by_account(pool_id: str, queue_id: int, min_friends: int) -> pd.
             SUM(CASE WHEN win THEN 1 ELSE 0 END) AS wins,
             ROUND(SUM(CASE WHEN win THEN 1 ELSE 0 END)::numeric / GREATEST(COUNT(*), 1) * 100, 2) AS winrate
         FROM player_performances
-        WHERE is_friend = TRUE AND pool_id = %s AND queue_id = %s AND friends_count >= %s
+        WHERE is_friend = TRUE AND persona IS NOT NULL
+          AND pool_id = %s AND queue_id = %s AND friends_count >= %s
         GROUP BY puuid, persona
         ORDER BY winrate DESC
     """, (pool_id, queue_id, min_friends))
@@ -168,15 +162,15 @@ def get_player_stats(pool_id: str, queue_id: int, min_friends: int) -> pd.DataFr
     return _q("""
         SELECT persona, SUM(games) AS games, SUM(wins) AS wins,
                ROUND((SUM(wins)::numeric / GREATEST(SUM(games), 1)) * 100, 2) AS winrate,
-               ROUND(AVG(avg_kills), 2) AS avg_kills,
-               ROUND(AVG(avg_deaths), 2) AS avg_deaths,
-               ROUND(AVG(avg_assists), 2) AS avg_assists,
-               ROUND(AVG(avg_damage), 1) AS avg_damage,
-               ROUND(AVG(avg_damage_taken), 1) AS avg_damage_taken,
-               ROUND(AVG(avg_vision), 1) AS avg_vision,
-               ROUND(AVG(avg_gold), 1) AS avg_gold,
-               ROUND(AVG(avg_cs), 1) AS avg_cs
-        FROM metric_05_player_stats
+               ROUND(SUM(sum_kills)::numeric / GREATEST(SUM(games), 1), 2) AS avg_kills,
+               ROUND(SUM(sum_deaths)::numeric / GREATEST(SUM(games), 1), 2) AS avg_deaths,
+               ROUND(SUM(sum_assists)::numeric / GREATEST(SUM(games), 1), 2) AS avg_assists,
+               ROUND(SUM(sum_damage_dealt)::numeric / GREATEST(SUM(games), 1), 1) AS avg_damage,
+               ROUND(SUM(sum_damage_taken)::numeric / GREATEST(SUM(games), 1), 1) AS avg_damage_taken,
+               ROUND(SUM(sum_vision_score)::numeric / GREATEST(SUM(games), 1), 1) AS avg_vision,
+               ROUND(SUM(sum_gold_earned)::numeric / GREATEST(SUM(games), 1), 1) AS avg_gold,
+               ROUND(SUM(sum_cs_total)::numeric / GREATEST(SUM(games), 1), 1) AS avg_cs
+        FROM metric_agg_persona
         WHERE pool_id = %s AND queue_id = %s AND friends_count >= %s
         GROUP BY persona
         ORDER BY persona
@@ -205,12 +199,6 @@ def get_player_performance_stats(pool_id: str, queue_id: int, min_friends: int,
     pos_clause = _POS_FILTER.get(position, "TRUE")
 
     sql = f"""
-        WITH team_kills AS (
-            SELECT match_id, team_id, SUM(kills) AS total_team_kills
-            FROM player_performances
-            WHERE pool_id = %s AND queue_id = %s AND friends_count >= %s
-            GROUP BY match_id, team_id
-        )
         SELECT
             p.persona,
             COUNT(*) AS games,
@@ -221,20 +209,21 @@ def get_player_performance_stats(pool_id: str, queue_id: int, min_friends: int,
                 (p.kills + p.assists)::numeric / GREATEST(p.deaths, 1)
             ), 2) AS avg_kda,
             ROUND(AVG(
-                CASE WHEN tk.total_team_kills = 0 THEN 0
-                ELSE (p.kills + p.assists)::numeric / tk.total_team_kills END
+                CASE WHEN tk.kills = 0 THEN 0
+                ELSE (p.kills + p.assists)::numeric / tk.kills END
             ) * 100, 2) AS avg_kill_participation,
             ROUND(AVG(p.deaths), 2)                    AS avg_deaths,
             ROUND((SUM(CASE WHEN p.win THEN 1 ELSE 0 END)::numeric / COUNT(*)) * 100, 2) AS winrate
         FROM player_performances p
-        JOIN team_kills tk ON p.match_id = tk.match_id AND p.team_id = tk.team_id
+        JOIN team_performances tk
+          ON tk.match_id = p.match_id AND tk.pool_id = p.pool_id AND tk.team_id = p.team_id
         WHERE p.is_friend = TRUE AND p.persona IS NOT NULL
           AND p.pool_id = %s AND p.queue_id = %s AND p.friends_count >= %s
           AND {pos_clause}
         GROUP BY p.persona
         ORDER BY p.persona
     """
-    return _q(sql, (pool_id, queue_id, min_friends, pool_id, queue_id, min_friends))
+    return _q(sql, (pool_id, queue_id, min_friends))
 
 
 def get_champion_stats_by_role(
@@ -277,9 +266,9 @@ def get_champion_stats_by_role(
 
 def get_champion_stats(pool_id: str, queue_id: int, min_friends: int) -> pd.DataFrame:
     return _q("""
-        SELECT persona, champion_name, SUM(total_matches) AS total_matches, SUM(wins) AS wins,
-               ROUND((SUM(wins)::numeric / GREATEST(SUM(total_matches), 1)) * 100, 2) AS winrate
-        FROM metric_02_13_champions_winrate
+        SELECT persona, champion_name, SUM(games) AS total_matches, SUM(wins) AS wins,
+               ROUND((SUM(wins)::numeric / GREATEST(SUM(games), 1)) * 100, 2) AS winrate
+        FROM metric_agg_persona_champion
         WHERE pool_id = %s AND queue_id = %s AND friends_count >= %s
         GROUP BY persona, champion_name
         ORDER BY persona, total_matches DESC
@@ -290,8 +279,8 @@ def get_community_champions(pool_id: str, queue_id: int, min_friends: int) -> pd
     return _q("""
         SELECT champion_name, SUM(games) AS games, SUM(wins) AS wins,
                ROUND((SUM(wins)::numeric / GREATEST(SUM(games), 1)) * 100, 2) AS winrate
-        FROM metric_14_community_champions
-        WHERE pool_id = %s AND queue_id = %s AND friends_count >= %s
+        FROM metric_agg_champion
+        WHERE is_friend AND pool_id = %s AND queue_id = %s AND friends_count >= %s
         GROUP BY champion_name
         ORDER BY games DESC
     """, (pool_id, queue_id, min_friends))
@@ -301,8 +290,8 @@ def get_enemy_champions(pool_id: str, queue_id: int, min_friends: int) -> pd.Dat
     return _q("""
         SELECT champion_name, SUM(games) AS games, SUM(wins) AS wins,
                ROUND((SUM(wins)::numeric / GREATEST(SUM(games), 1)) * 100, 2) AS winrate
-        FROM metric_15_enemy_champions
-        WHERE pool_id = %s AND queue_id = %s AND friends_count >= %s
+        FROM metric_agg_champion
+        WHERE NOT is_friend AND pool_id = %s AND queue_id = %s AND friends_count >= %s
         GROUP BY champion_name
         ORDER BY games DESC
     """, (pool_id, queue_id, min_friends))
@@ -318,7 +307,7 @@ def get_ego_index(pool_id: str, queue_id: int, min_friends: int) -> pd.DataFrame
 def get_troll_index(pool_id: str, queue_id: int, min_friends: int) -> pd.DataFrame:
     return _q("""
         SELECT persona, SUM(games) AS games, SUM(early_surrenders) AS early_surrenders, SUM(afks) AS afks
-        FROM metric_07_troll_index
+        FROM metric_agg_persona
         WHERE pool_id = %s AND queue_id = %s AND friends_count >= %s
         GROUP BY persona
         ORDER BY (SUM(early_surrenders) + SUM(afks)) DESC
@@ -328,13 +317,13 @@ def get_troll_index(pool_id: str, queue_id: int, min_friends: int) -> pd.DataFra
 def get_first_metrics(pool_id: str, queue_id: int, min_friends: int) -> pd.DataFrame:
     return _q("""
         SELECT persona, SUM(games) AS games,
-               SUM(total_fb_kills) AS total_fb_kills, SUM(total_fb_assists) AS total_fb_assists,
-               ROUND(AVG(avg_early_takedowns), 2) AS avg_early_takedowns, 
-               ROUND(AVG(avg_early_gold_per_min), 2) AS avg_early_gold_per_min,
-               ROUND(AVG(avg_early_dmg_per_min), 2) AS avg_early_dmg_per_min, 
-               ROUND(AVG(avg_early_vision_per_min), 2) AS avg_early_vision_per_min, 
-               ROUND(AVG(avg_early_cs_10m), 2) AS avg_early_cs_10m
-        FROM metric_08_first_metrics
+               SUM(fb_kills) AS total_fb_kills, SUM(fb_assists) AS total_fb_assists,
+               ROUND(SUM(sum_early_takedowns) / GREATEST(SUM(games), 1), 2) AS avg_early_takedowns,
+               ROUND(SUM(sum_gold_per_minute) / GREATEST(SUM(games), 1), 2) AS avg_early_gold_per_min,
+               ROUND(SUM(sum_damage_per_minute) / GREATEST(SUM(games), 1), 2) AS avg_early_dmg_per_min,
+               ROUND(SUM(sum_vision_per_minute) / GREATEST(SUM(games), 1), 2) AS avg_early_vision_per_min,
+               ROUND(SUM(sum_cs_10m)::numeric / GREATEST(SUM(games), 1), 2) AS avg_early_cs_10m
+        FROM metric_agg_persona
         WHERE pool_id = %s AND queue_id = %s AND friends_count >= %s
         GROUP BY persona
         ORDER BY persona
@@ -366,15 +355,15 @@ def get_stats_by_role(pool_id: str, queue_id: int, min_friends: int) -> pd.DataF
     return _q("""
         SELECT persona, position, SUM(games) AS games, SUM(wins) AS wins,
                ROUND((SUM(wins)::numeric / GREATEST(SUM(games), 1)) * 100, 2) AS winrate,
-               ROUND(AVG(avg_kills), 2) AS avg_kills,
-               ROUND(AVG(avg_deaths), 2) AS avg_deaths,
-               ROUND(AVG(avg_assists), 2) AS avg_assists,
-               ROUND(AVG(avg_damage), 1) AS avg_damage,
-               ROUND(AVG(avg_damage_taken), 1) AS avg_damage_taken,
-               ROUND(AVG(avg_vision), 1) AS avg_vision,
-               ROUND(AVG(avg_gold), 1) AS avg_gold,
-               ROUND(AVG(avg_cs), 1) AS avg_cs
-        FROM metric_10_stats_by_role
+               ROUND(SUM(sum_kills)::numeric / GREATEST(SUM(games), 1), 2) AS avg_kills,
+               ROUND(SUM(sum_deaths)::numeric / GREATEST(SUM(games), 1), 2) AS avg_deaths,
+               ROUND(SUM(sum_assists)::numeric / GREATEST(SUM(games), 1), 2) AS avg_assists,
+               ROUND(SUM(sum_damage_dealt)::numeric / GREATEST(SUM(games), 1), 1) AS avg_damage,
+               ROUND(SUM(sum_damage_taken)::numeric / GREATEST(SUM(games), 1), 1) AS avg_damage_taken,
+               ROUND(SUM(sum_vision_score)::numeric / GREATEST(SUM(games), 1), 1) AS avg_vision,
+               ROUND(SUM(sum_gold_earned)::numeric / GREATEST(SUM(games), 1), 1) AS avg_gold,
+               ROUND(SUM(sum_cs_total)::numeric / GREATEST(SUM(games), 1), 1) AS avg_cs
+        FROM metric_agg_persona_role
         WHERE pool_id = %s AND queue_id = %s AND friends_count >= %s
         GROUP BY persona, position
         ORDER BY persona, games DESC
@@ -390,7 +379,7 @@ def get_records(pool_id: str, queue_id: int, min_friends: int) -> pd.DataFrame:
                MAX(max_vision_score) AS max_vision_score, MAX(max_cs) AS max_cs, 
                MAX(max_damage_dealt) AS max_damage_dealt,
                MAX(max_gold) AS max_gold, MAX(max_duration_s) AS max_duration_s
-        FROM metric_11_records
+        FROM metric_agg_persona
         WHERE pool_id = %s AND queue_id = %s AND friends_count >= %s
         GROUP BY persona
         ORDER BY persona
@@ -398,29 +387,7 @@ def get_records(pool_id: str, queue_id: int, min_friends: int) -> pd.DataFrame:
 
 
 def get_streaks(pool_id: str, queue_id: int, min_friends: int) -> pd.DataFrame:
-    # Nota: Las rachas dependen del orden temporal. Aquí usamos player_performances real-time 
-    # para asegurar que si el usuario filtra por min_friends, la racha es sobre esa serie.
-    return _q("""
-        WITH ordered AS (
-            SELECT persona, win, 
-                   ROW_NUMBER() OVER(PARTITION BY persona ORDER BY game_start_at) AS rn,
-                   ROW_NUMBER() OVER(PARTITION BY persona, win ORDER BY game_start_at) AS rn_win
-            FROM player_performances
-            WHERE is_friend = TRUE AND persona IS NOT NULL
-              AND pool_id = %s AND queue_id = %s AND friends_count >= %s
-        ),
-        streak_groups AS (
-            SELECT persona, win, (rn - rn_win) AS grp, COUNT(*) AS streak_len
-            FROM ordered
-            GROUP BY persona, win, grp
-        )
-        SELECT persona, 
-               MAX(CASE WHEN win THEN streak_len ELSE 0 END) AS max_win_streak,
-               MAX(CASE WHEN NOT win THEN streak_len ELSE 0 END) AS max_lose_streak
-        FROM streak_groups
-        GROUP BY persona
-        ORDER BY max_win_streak DESC
-    """, (pool_id, queue_id, min_friends))
+    return get_streaks_by_role(pool_id, queue_id, min_friends)
 
 
 _POS_FILTER_REC = {
@@ -456,39 +423,19 @@ def get_records_by_stat(pool_id: str, queue_id: int, min_friends: int, stat_col:
 
 
 def get_streaks_by_role(pool_id: str, queue_id: int, min_friends: int, position: str = "Todos") -> pd.DataFrame:
-    """Rachas máximas de victorias/derrotas por jugador, filtradas por posición."""
-    pos_clause = _POS_FILTER_REC.get(position, "TRUE")
-    return _q(f"""
-        WITH ordered AS (
-            SELECT
-                persona,
-                win,
-                ROW_NUMBER() OVER (PARTITION BY persona ORDER BY game_start_at) AS rn
-            FROM player_performances
-            WHERE is_friend = TRUE AND persona IS NOT NULL
-              AND pool_id = %s AND queue_id = %s AND friends_count >= %s
-              AND {pos_clause}
-        ),
-        grouped AS (
-            SELECT
-                persona,
-                win,
-                rn - ROW_NUMBER() OVER (PARTITION BY persona, win ORDER BY rn) AS grp
-            FROM ordered
-        ),
-        streaks AS (
-            SELECT persona, win, COUNT(*) AS streak_len
-            FROM grouped
-            GROUP BY persona, win, grp
-        )
-        SELECT
-            persona,
-            MAX(CASE WHEN win THEN streak_len ELSE 0 END) AS max_win_streak,
-            MAX(CASE WHEN NOT win THEN streak_len ELSE 0 END) AS max_lose_streak
+    """
+    Rachas máximas y actual de victorias/derrotas por jugador, filtradas por posición.
+    Precalculadas por el ETL en `streaks` (serie: partidas con friends_count >= min_friends).
+    current_streak: longitud de la racha actual, positiva si es de victorias y negativa si es de derrotas.
+    """
+    return _q("""
+        SELECT persona, max_win_streak, max_lose_streak,
+               CASE WHEN current_win THEN current_len ELSE -current_len END AS current_streak,
+               last_game_at
         FROM streaks
-        GROUP BY persona
+        WHERE pool_id = %s AND queue_id = %s AND min_friends = %s AND position = %s
         ORDER BY max_win_streak DESC
-    """, (pool_id, queue_id, min_friends))
+    """, (pool_id, queue_id, min_friends, position if position in _POS_FILTER_REC else "Todos"))
 
 
 
@@ -514,18 +461,17 @@ def get_ego_score(pool_id: str, queue_id: int, min_friends: int) -> pd.DataFrame
               AND persona IS NOT NULL
               AND pool_id = %s AND queue_id = %s AND friends_count >= %s
         ),
-        -- 2. Totales del equipo completo (los 5) para los matches del pool
+        -- 2. Totales del equipo completo (los 5), precalculados por el ETL
         team_totals AS (
             SELECT
                 t.match_id,
                 t.team_id,
-                SUM(t.damage_dealt) AS team_damage,
-                SUM(t.gold_earned)  AS team_gold,
-                SUM(t.kills)        AS team_kills,
-                SUM(t.assists)      AS team_assists
-            FROM player_performances t
+                t.damage_dealt AS team_damage,
+                t.gold_earned  AS team_gold,
+                t.kills        AS team_kills,
+                t.assists      AS team_assists
+            FROM team_performances t
             WHERE t.pool_id = %s AND t.queue_id = %s AND t.friends_count >= %s
-            GROUP BY t.match_id, t.team_id
         ),
         -- 3. Shares por partida
         shares AS (
@@ -566,15 +512,14 @@ def get_troll_index(pool_id: str, queue_id: int, min_friends: int) -> pd.DataFra
     """
     return _q("""
         WITH
-        -- Totales de equipo para KP y damage share
+        -- Totales de equipo para KP y damage share (team_performances)
         team_totals AS (
             SELECT
                 t.match_id, t.team_id,
-                SUM(t.kills)        AS team_kills,
-                SUM(t.damage_dealt) AS team_damage
-            FROM player_performances t
+                t.kills        AS team_kills,
+                t.damage_dealt AS team_damage
+            FROM team_performances t
             WHERE t.pool_id = %s AND t.queue_id = %s AND t.friends_count >= %s
-            GROUP BY t.match_id, t.team_id
         ),
         base AS (
             SELECT
@@ -678,7 +623,7 @@ def get_champions_by_persona(pool_id: str, queue_id: int, min_friends: int, pers
 
     df = _q(f"""
         SELECT DISTINCT champion_name FROM player_performances
-        WHERE is_friend = TRUE AND champion_name IS NOT NULL AND {where_clause}
+        WHERE is_friend = TRUE AND persona IS NOT NULL AND champion_name IS NOT NULL AND {where_clause}
         ORDER BY champion_name
     """, tuple(params))
     return df["champion_name"].tolist() if not df.empty else []
@@ -753,7 +698,7 @@ def get_matches_filtered(
             conditions.append(f"EXISTS (SELECT 1 FROM player_performances pp WHERE {where_sub})")
             params.extend(sub_params)
 
-    conditions.append("cardinality(m.friends_present) >= %s")
+    conditions.append("m.friends_count >= %s")
     params.append(min_friends)
 
     where_clause = " AND ".join(conditions)
@@ -761,10 +706,7 @@ def get_matches_filtered(
 
     return _q(f"""
         SELECT m.match_id, m.game_start_at, m.duration_s,
-               m.friends_present, m.personas_present, m.winning_team,
-               (SELECT win FROM player_performances pp
-                WHERE pp.match_id = m.match_id AND pp.is_friend = TRUE
-                LIMIT 1) AS group_win
+               m.friends_present, m.personas_present, m.winning_team, m.group_win
         FROM matches m
         WHERE {where_clause}
         ORDER BY m.game_start_at DESC
@@ -780,7 +722,7 @@ def get_matches_per_day(pool_id: str, queue_id: int, min_friends: int) -> pd.Dat
     return _q("""
         SELECT DATE(game_start_at) AS day, COUNT(*) AS matches
         FROM matches
-        WHERE pool_id = %s AND queue_id = %s AND cardinality(friends_present) >= %s
+        WHERE pool_id = %s AND queue_id = %s AND friends_count >= %s
         GROUP BY DATE(game_start_at)
         ORDER BY day
     """, (pool_id, queue_id, min_friends))
@@ -793,7 +735,7 @@ def get_matches_per_day_persona(pool_id: str, queue_id: int, min_friends: int) -
                DATE(pp.game_start_at) AS day,
                COUNT(*) AS matches
         FROM player_performances pp
-        WHERE pp.is_friend = TRUE
+        WHERE pp.is_friend = TRUE AND pp.persona IS NOT NULL
           AND pp.pool_id = %s
           AND pp.queue_id = %s
           AND pp.friends_count >= %s
@@ -992,7 +934,7 @@ def get_matches_heatmap(pool_id: str, queue_id: int, min_friends: int) -> pd.Dat
                 EXTRACT(ISODOW FROM (game_start_at AT TIME ZONE 'Europe/Madrid' - INTERVAL '7 hours')) AS logical_dow,
                 EXTRACT(HOUR FROM game_start_at AT TIME ZONE 'Europe/Madrid') AS hour_of_day
             FROM matches
-            WHERE pool_id = %s AND queue_id = %s AND cardinality(friends_present) >= %s
+            WHERE pool_id = %s AND queue_id = %s AND friends_count >= %s
         )
         SELECT logical_dow, hour_of_day, COUNT(*) as matches_count
         FROM corrected_times
@@ -1085,98 +1027,41 @@ def get_match_landscape_data(pool_id: str, queue_id: int, min_friends: int) -> p
             SUM(pp.kills) as total_kills
         FROM matches m
         JOIN player_performances pp ON m.match_id = pp.match_id AND m.pool_id = pp.pool_id
-        WHERE m.pool_id = %s AND m.queue_id = %s AND cardinality(m.friends_present) >= %s
+        WHERE m.pool_id = %s AND m.queue_id = %s AND m.friends_count >= %s
         GROUP BY m.match_id, m.duration_s
     """, (pool_id, queue_id, min_friends))
 
-@st.cache_data(ttl=600, show_spinner="Analizando flujo de partidas (SQL + Mongo)...")
+@st.cache_data(ttl=600, show_spinner="Analizando flujo de partidas...")
 def get_sankey_flow_data(pool_id: str, queue_id: int, min_friends: int) -> pd.DataFrame:
     """
     Agrega datos para el gráfico Sankey: Primera ventaja -> Tipo Partida -> Resultado.
     Stage 1: Primera ventaja (FB, Torre, Dragón, Heraldo, Ninguna) - Solo si la consiguió el equipo de amigos.
     Stage 2: Tipo de partida (Stomp, Standard, Late).
     Stage 3: Resultado (Victoria, Derrota).
+    Los objetivos salen de team_performances (fila del equipo de amigos).
     """
-    # 1. Obtener datos base de PostgreSQL (incluyendo First Blood)
-    df_matches = _q("""
-        SELECT m.match_id, m.duration_s, m.winning_team,
-               (SELECT team_id FROM player_performances pp 
-                WHERE pp.match_id = m.match_id AND pp.is_friend = TRUE LIMIT 1) as friends_team,
-               EXISTS (
-                   SELECT 1 FROM player_performances pp 
-                   WHERE pp.match_id = m.match_id 
-                   AND pp.is_friend = TRUE 
-                   AND (pp.first_blood_kill = TRUE OR pp.first_blood_assist = TRUE)
-               ) as first_blood
+    return _q("""
+        SELECT
+            CASE WHEN m.duration_s < 20 * 60 THEN 'Stomp'
+                 WHEN m.duration_s <= 30 * 60 THEN 'Fast'
+                 WHEN m.duration_s <= 40 * 60 THEN 'Standard'
+                 ELSE 'Late' END AS match_type,
+            EXISTS (
+                SELECT 1 FROM player_performances pp
+                WHERE pp.match_id = m.match_id AND pp.pool_id = m.pool_id
+                  AND pp.is_friend = TRUE
+                  AND (pp.first_blood_kill = TRUE OR pp.first_blood_assist = TRUE)
+            ) AS first_blood,
+            COALESCE(ft.first_tower, FALSE)  AS tower,
+            COALESCE(ft.first_dragon, FALSE) AS dragon,
+            COALESCE(ft.first_herald, FALSE) AS herald,
+            COALESCE(ft.first_horde, FALSE)  AS grubs,
+            CASE WHEN m.group_win THEN 'Victoria' ELSE 'Derrota' END AS result
         FROM matches m
-        WHERE m.pool_id = %s AND m.queue_id = %s AND cardinality(m.friends_present) >= %s
+        JOIN team_performances ft
+          ON ft.match_id = m.match_id AND ft.pool_id = m.pool_id AND ft.is_friends_team
+        WHERE m.pool_id = %s AND m.queue_id = %s AND m.friends_count >= %s
     """, (pool_id, queue_id, min_friends))
-    
-    if df_matches.empty:
-        return pd.DataFrame()
-
-    match_ids = df_matches['match_id'].tolist()
-    match_map = df_matches.set_index('match_id').to_dict('index')
-
-    # 2. Consultar MongoDB para obtener objetivos de mapa
-    from utils.db import get_mongo_client
-    from utils.config import MONGO_DB, COLLECTION_RAW_MATCHES
-    
-    results = []
-    try:
-        with get_mongo_client() as client:
-            db = client[MONGO_DB]
-            cursor = db[COLLECTION_RAW_MATCHES].find(
-                {"_id": {"$in": match_ids}},
-                {"data.info.teams.objectives": 1, "data.info.teams.teamId": 1}
-            )
-            
-            for doc in cursor:
-                m_id = doc["_id"]
-                if m_id not in match_map:
-                    continue
-                
-                m_info = match_map[m_id]
-                friends_team_id = m_info['friends_team']
-                win = m_info['winning_team'] == friends_team_id
-                
-                # Clasificación por duración
-                dur_m = m_info['duration_s'] / 60
-                if dur_m < 20: match_type = "Stomp"
-                elif dur_m <= 30: match_type = "Fast"
-                elif dur_m <= 40: match_type = "Standard"
-                else: match_type = "Late"
-                
-                # Extraer objetivos de mapa de MongoDB
-                teams = doc.get("data", {}).get("info", {}).get("teams", [])
-                friends_team_data = next((t for t in teams if t.get("teamId") == friends_team_id), None)
-                
-                tower = False
-                dragon = False
-                herald = False
-                grubs = False
-                
-                if friends_team_data:
-                    objs = friends_team_data.get("objectives", {})
-                    tower = objs.get("tower", {}).get("first", False)
-                    dragon = objs.get("dragon", {}).get("first", False)
-                    herald = objs.get("riftHerald", {}).get("first", False)
-                    grubs = objs.get("horde", {}).get("first", False)
-                
-                results.append({
-                    "match_type": match_type,
-                    "first_blood": m_info['first_blood'],
-                    "tower": tower,
-                    "dragon": dragon,
-                    "herald": herald,
-                    "grubs": grubs,
-                    "result": "Victoria" if win else "Derrota"
-                })
-    except Exception as e:
-        st.error(f"Error al conectar con MongoDB: {e}")
-        return pd.DataFrame()
-
-    return pd.DataFrame(results)
 
 
 @st.cache_data(ttl=300, show_spinner=False)
@@ -1185,15 +1070,17 @@ def get_fiesta_stats(pool_id: str, queue_id: int, min_friends: int, min_games: i
     Calcula el 'Fiesta Score' por campeón.
     fiesta_score = z(kills_per_minute) + z(damage_per_minute) - z(objectives_per_minute)
     """
-    # 1. Base match data from PG
+    # 1. Totales por partida (ambos equipos) desde team_performances
     df_matches = _q("""
-        SELECT m.match_id, m.duration_s,
-               SUM(pp.kills) AS total_kills,
-               SUM(pp.damage_dealt) AS total_damage
-        FROM matches m
-        JOIN player_performances pp ON m.match_id = pp.match_id AND m.pool_id = pp.pool_id
-        WHERE m.pool_id = %s AND m.queue_id = %s AND cardinality(m.friends_present) >= %s
-        GROUP BY m.match_id, m.duration_s
+        SELECT match_id,
+               MAX(duration_s)      AS duration_s,
+               SUM(kills)           AS total_kills,
+               SUM(damage_dealt)    AS total_damage,
+               SUM(COALESCE(dragon_kills, 0) + COALESCE(tower_kills, 0) + COALESCE(horde_kills, 0)
+                   + COALESCE(herald_kills, 0) + COALESCE(baron_kills, 0)) AS total_objectives
+        FROM team_performances
+        WHERE pool_id = %s AND queue_id = %s AND friends_count >= %s
+        GROUP BY match_id
     """, (pool_id, queue_id, min_friends))
 
     if df_matches.empty:
@@ -1204,41 +1091,10 @@ def get_fiesta_stats(pool_id: str, queue_id: int, min_friends: int, min_games: i
         SELECT match_id, champion_name
         FROM player_performances
         WHERE pool_id = %s AND queue_id = %s AND friends_count >= %s
-          AND is_friend = TRUE
+          AND is_friend = TRUE AND persona IS NOT NULL
     """, (pool_id, queue_id, min_friends))
 
-    # 3. Objectives from Mongo
-    from utils.db import get_mongo_client
-    from utils.config import MONGO_DB, COLLECTION_RAW_MATCHES
-    
-    match_ids = df_matches['match_id'].tolist()
-    objectives_map = {}
-    
-    try:
-        with get_mongo_client() as client:
-            db = client[MONGO_DB]
-            cursor = db[COLLECTION_RAW_MATCHES].find(
-                {"_id": {"$in": match_ids}},
-                {"data.info.teams.objectives": 1}
-            )
-            for doc in cursor:
-                m_id = doc["_id"]
-                teams = doc.get("data", {}).get("info", {}).get("teams", [])
-                total_objs = 0
-                for t in teams:
-                    objs = t.get("objectives", {})
-                    # Sum kills for each objective type specified by user
-                    total_objs += objs.get("dragon", {}).get("kills", 0)
-                    total_objs += objs.get("tower", {}).get("kills", 0)
-                    total_objs += objs.get("horde", {}).get("kills", 0)
-                    total_objs += objs.get("riftHerald", {}).get("kills", 0)
-                    total_objs += objs.get("baron", {}).get("kills", 0)
-                objectives_map[m_id] = total_objs
-    except Exception as e:
-        st.warning(f"Error fetching objectives from Mongo: {e}")
-
-    # 4. Processing match-level metrics
-    df_matches['total_objectives'] = df_matches['match_id'].map(lambda x: objectives_map.get(x, 0))
+    # 3. Processing match-level metrics
     df_matches['duration_m'] = df_matches['duration_s'] / 60.0
     
     # Evitar división por cero si duration_m es 0
@@ -1263,7 +1119,7 @@ def get_fiesta_stats(pool_id: str, queue_id: int, min_friends: int, min_games: i
     threshold = df_matches['fiesta_score'].quantile(0.75) if not df_matches.empty else 0
     df_matches['fiesta_game'] = (df_matches['fiesta_score'] >= threshold).astype(int)
 
-    # 5. Champion aggregation
+    # 4. Champion aggregation
     df_merged = pd.merge(df_champs, df_matches, on='match_id')
     
     champion_stats = df_merged.groupby('champion_name').agg(
@@ -1413,128 +1269,70 @@ def get_match_anomaly_data(pool_id: str, queue_id: int, min_friends: int, contam
     from sklearn.ensemble import IsolationForest
     import numpy as np
 
-    # 1. Obtener datos base (matches + all performance for each match)
-    df_raw = _q("""
-        SELECT m.match_id, m.duration_s, m.winning_team,
-               pp.team_id, pp.win, pp.is_friend,
-               pp.kills, pp.deaths, pp.assists, pp.gold_earned,
-               pp.damage_dealt, pp.vision_score, pp.cs_total
-        FROM matches m
-        JOIN player_performances pp ON m.match_id = pp.match_id AND m.pool_id = pp.pool_id
-        WHERE m.pool_id = %s AND m.queue_id = %s AND cardinality(m.friends_present) >= %s
-    """, (pool_id, queue_id, min_friends))
-
-    if df_raw.empty:
-        return pd.DataFrame()
-
-    # 2. Objetivos desde Mongo
-    from utils.db import get_mongo_client
-    from utils.config import MONGO_DB, COLLECTION_RAW_MATCHES
-    
-    match_ids = df_raw['match_id'].unique().tolist()
-    objectives_map = {}
-    
-    try:
-        with get_mongo_client() as client:
-            db = client[MONGO_DB]
-            cursor = db[COLLECTION_RAW_MATCHES].find(
-                {"_id": {"$in": match_ids}},
-                {"data.info.teams.objectives": 1, "data.info.teams.teamId": 1}
-            )
-            for doc in cursor:
-                m_id = doc["_id"]
-                teams = doc.get("data", {}).get("info", {}).get("teams", [])
-                m_objs = {}
-                for t in teams:
-                    t_id = t.get("teamId")
-                    objs = t.get("objectives", {})
-                    # Sum objectives relevant for macro
-                    total = (objs.get("dragon", {}).get("kills", 0) +
-                             objs.get("tower", {}).get("kills", 0) * 2 + # Towers weigh more for macro
-                             objs.get("baron", {}).get("kills", 0) * 3 +
-                             objs.get("horde", {}).get("kills", 0) +
-                             objs.get("riftHerald", {}).get("kills", 0))
-                    
-                    # Direct counts for diffs
-                    m_objs[t_id] = {
-                        "total_score": total,
-                        "towers": objs.get("tower", {}).get("kills", 0),
-                        "dragons": objs.get("dragon", {}).get("kills", 0),
-                        "barons": objs.get("baron", {}).get("kills", 0)
-                    }
-                objectives_map[m_id] = m_objs
-    except Exception as e:
-        st.warning(f"Error fetching objectives for anomalies: {e}")
-
-    # 3. Feature Engineering
-    match_features = []
-    for match_id, group in df_raw.groupby('match_id'):
-        duration_m = group['duration_s'].iloc[0] / 60.0
-        if duration_m == 0: duration_m = 1
-        
-        # Identificar equipo de amigos (team_id)
-        friends_team = group[group['is_friend'] == True]['team_id'].unique()
-        if len(friends_team) == 0: continue
-        f_team_id = friends_team[0]
-        
-        team_p = group[group['team_id'] == f_team_id]
-        enemy_p = group[group['team_id'] != f_team_id]
-        
-        # Metricas agregadas
-        f_kills = team_p['kills'].sum()
-        e_kills = enemy_p['kills'].sum()
-        f_dmg = team_p['damage_dealt'].sum()
-        e_dmg = enemy_p['damage_dealt'].sum()
-        f_gold = team_p['gold_earned'].sum()
-        e_gold = enemy_p['gold_earned'].sum()
-        
-        win = team_p['win'].iloc[0]
-        
-        # Objetivos
-        m_objs = objectives_map.get(match_id, {})
-        f_objs = m_objs.get(f_team_id, {"total_score": 0, "towers": 0, "dragons": 0, "barons": 0})
-        # Find enemy team id
-        e_team_id = next((tid for tid in m_objs.keys() if tid != f_team_id), None)
-        e_objs = m_objs.get(e_team_id, {"total_score": 0, "towers": 0, "dragons": 0, "barons": 0}) if e_team_id else {"total_score": 0, "towers": 0, "dragons": 0, "barons": 0}
-        
-        # Averages & Diffs
-        gold_diff = f_gold - e_gold
-        dmg_diff = f_dmg - e_dmg
-        kill_diff = f_kills - e_kills
-        tower_diff = f_objs['towers'] - e_objs['towers']
-        dragon_diff = f_objs['dragons'] - e_objs['dragons']
-        
-        match_features.append({
-            "match_id": match_id,
-            "duration_m": duration_m,
-            "team_kills": f_kills,
-            "enemy_kills": e_kills,
-            "total_kills": f_kills + e_kills,
-            "team_damage": f_dmg,
-            "enemy_damage": e_dmg,
-            "team_gold": f_gold,
-            "enemy_gold": e_gold,
-            "gold_diff": gold_diff,
-            "damage_diff": dmg_diff,
-            "kill_diff": kill_diff,
-            "tower_diff": tower_diff,
-            "dragon_diff": dragon_diff,
-            "baron_diff": f_objs['barons'] - e_objs['barons'],
-            "team_total_objs": f_objs['total_score'],
-            "enemy_total_objs": e_objs['total_score'],
-            "avg_kda_team": (f_kills + team_p['assists'].sum()) / max(1, team_p['deaths'].sum()),
-            "avg_cs_team": team_p['cs_total'].mean(),
-            "avg_vision_team": team_p['vision_score'].mean(),
-            "kp_media": (team_p['kills'] + team_p['assists']).sum() / max(1, f_kills * 5), # Simplified
-            "max_dmg_share": team_p['damage_dealt'].max() / max(1, f_dmg),
-            "win": win
-        })
+    # 1. Equipo de amigos (f) frente al rival (e) desde team_performances; del detalle
+    #    por jugador solo hace falta el mayor daño.
+    df = _q("""
+        WITH players AS (
+            SELECT match_id, team_id, MAX(damage_dealt) AS max_dmg
+            FROM player_performances
+            WHERE pool_id = %s AND queue_id = %s AND friends_count >= %s
+            GROUP BY match_id, team_id
+        )
+        SELECT f.match_id, f.duration_s, f.win,
+               f.kills AS team_kills,          e.kills AS enemy_kills,
+               f.damage_dealt AS team_damage,  e.damage_dealt AS enemy_damage,
+               f.gold_earned AS team_gold,     e.gold_earned AS enemy_gold,
+               f.assists AS team_assists,      f.deaths AS team_deaths,
+               f.cs_total AS team_cs,          f.vision_score AS team_vision,
+               COALESCE(f.tower_kills, 0)  - COALESCE(e.tower_kills, 0)  AS tower_diff,
+               COALESCE(f.dragon_kills, 0) - COALESCE(e.dragon_kills, 0) AS dragon_diff,
+               COALESCE(f.baron_kills, 0)  - COALESCE(e.baron_kills, 0)  AS baron_diff,
+               -- Objetivos de macro: las torres y el barón pesan más
+               COALESCE(f.dragon_kills, 0) + COALESCE(f.tower_kills, 0) * 2 + COALESCE(f.baron_kills, 0) * 3
+                   + COALESCE(f.horde_kills, 0) + COALESCE(f.herald_kills, 0) AS team_total_objs,
+               COALESCE(e.dragon_kills, 0) + COALESCE(e.tower_kills, 0) * 2 + COALESCE(e.baron_kills, 0) * 3
+                   + COALESCE(e.horde_kills, 0) + COALESCE(e.herald_kills, 0) AS enemy_total_objs,
+               p.max_dmg
+        FROM team_performances f
+        JOIN team_performances e
+          ON e.match_id = f.match_id AND e.pool_id = f.pool_id AND e.team_id <> f.team_id
+        JOIN players p ON p.match_id = f.match_id AND p.team_id = f.team_id
+        WHERE f.is_friends_team
+          AND f.pool_id = %s AND f.queue_id = %s AND f.friends_count >= %s
+    """, (pool_id, queue_id, min_friends, pool_id, queue_id, min_friends))
 
-    df_feats = pd.DataFrame(match_features)
-    if df_feats.empty:
+    if df.empty:
         return pd.DataFrame()
 
-    # 4. Outlier Detection (Isolation Forest)
+    # 2. Feature Engineering
+    df_feats = pd.DataFrame({
+        "match_id": df['match_id'],
+        "duration_m": (df['duration_s'] / 60.0).replace(0, 1),
+        "team_kills": df['team_kills'],
+        "enemy_kills": df['enemy_kills'],
+        "total_kills": df['team_kills'] + df['enemy_kills'],
+        "team_damage": df['team_damage'],
+        "enemy_damage": df['enemy_damage'],
+        "team_gold": df['team_gold'],
+        "enemy_gold": df['enemy_gold'],
+        "gold_diff": df['team_gold'] - df['enemy_gold'],
+        "damage_diff": df['team_damage'] - df['enemy_damage'],
+        "kill_diff": df['team_kills'] - df['enemy_kills'],
+        "tower_diff": df['tower_diff'],
+        "dragon_diff": df['dragon_diff'],
+        "baron_diff": df['baron_diff'],
+        "team_total_objs": df['team_total_objs'],
+        "enemy_total_objs": df['enemy_total_objs'],
+        "avg_kda_team": (df['team_kills'] + df['team_assists']) / df['team_deaths'].clip(lower=1),
+        # team_cs / team_vision suman los 5 participantes del equipo (team_performances)
+        "avg_cs_team": df['team_cs'] / 5,
+        "avg_vision_team": df['team_vision'] / 5,
+        "kp_media": (df['team_kills'] + df['team_assists']) / (df['team_kills'] * 5).clip(lower=1), # Simplified
+        "max_dmg_share": df['max_dmg'] / df['team_damage'].clip(lower=1),
+        "win": df['win'],
+    })
+
+    # 3. Outlier Detection (Isolation Forest)
     cols_to_use = [
         'duration_m', 'total_kills', 'gold_diff', 'damage_diff', 'kill_diff',
         'tower_diff', 'dragon_diff', 'avg_kda_team', 'team_total_objs', 'max_dmg_share'
@@ -1550,7 +1348,7 @@ def get_match_anomaly_data(pool_id: str, queue_id: int, min_friends: int, contam
     df_feats['is_outlier'] = df_feats['anomaly_score'].map({1: "Normal", -1: "Outlier"})
     df_feats['decision_score'] = clf.decision_function(X) # lower means more abnormal
 
-    # 5. Automatic Classification
+    # 4. Automatic Classification
     def classify_match(row):
         types = []
         if row['duration_m'] < 20 and row['gold_diff'] > 8000: types.append("STOMP")
@@ -1583,5 +1381,5 @@ def get_apriori_raw_data(pool_id: str, queue_id: int, min_friends: int) -> pd.Da
                pp.is_friend
         FROM matches m
         JOIN player_performances pp ON m.match_id = pp.match_id AND m.pool_id = pp.pool_id
-        WHERE m.pool_id = %s AND m.queue_id = %s AND cardinality(m.friends_present) >= %s
+        WHERE m.pool_id = %s AND m.queue_id = %s AND m.friends_count >= %s
     """, (pool_id, queue_id, min_friends))
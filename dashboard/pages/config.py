@@ -11,18 +11,17 @@ def render(pool_id: str, queue_id: int, min_friends: int):
 
     st.subheader("Estado de la base de datos")
 
-    matches_count = _q("SELECT COUNT(*) AS n FROM matches WHERE pool_id=%s AND queue_id=%s AND min_friends=%s",
+    matches_count = _q("SELECT COUNT(*) AS n FROM matches "
+                       "WHERE pool_id=%s AND queue_id=%s AND friends_count >= %s",
                        (pool_id, queue_id, min_friends))
     pp_count = _q(
         "SELECT COUNT(*) AS n FROM player_performances pp "
-        "JOIN matches m ON pp.match_id = m.match_id AND pp.pool_id = m.pool_id "
-        "WHERE pp.pool_id=%s AND pp.queue_id=%s AND m.min_friends=%s",
+        "WHERE pp.pool_id=%s AND pp.queue_id=%s AND pp.friends_count >= %s",
         (pool_id, queue_id, min_friends)
     )
     friends_count = _q(
         "SELECT COUNT(DISTINCT pp.persona) AS n FROM player_performances pp "
-        "JOIN matches m ON pp.match_id = m.match_id AND pp.pool_id = m.pool_id "
-        "WHERE pp.is_friend=TRUE AND pp.pool_id=%s AND pp.queue_id=%s AND m.min_friends=%s",
+        "WHERE pp.is_friend=TRUE AND pp.pool_id=%s AND pp.queue_id=%s AND pp.friends_count >= %s",
         (pool_id, queue_id, min_friends)
     )
 
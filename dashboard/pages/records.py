@@ -43,6 +43,13 @@ def render(pool_id: str, queue_id: int, min_friends: int):
                         title="Mayor racha de derrotas", color_scale=CHART_SCALE,
                         text_fmt=":.0f")
             st.plotly_chart(fig, use_container_width=True, theme=None)
+
+        st.subheader("Racha actual")
+        cur_df = str_df.sort_values("current_streak", ascending=True)
+        fig = make_hbar(cur_df, x="current_streak", y="persona",
+                        title="Victorias (+) / derrotas (−) seguidas", color_scale=CHART_SCALE,
+                        text_fmt=":.0f", color_mid=0)
+        st.plotly_chart(fig, use_container_width=True, theme=None)
     else:
         st.info("Sin datos de rachas para este filtro.")
 
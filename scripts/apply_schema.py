@@ -2,10 +2,18 @@
 scripts/apply_schema.py
 Aplica el esquema SQL al PostgreSQL local.
 
+BD nueva: crea el esquema desde init_db.sql y lo marca en la última versión.
+BD existente: aplica las migraciones pendientes de scripts/migrations/ (tabla
+schema_version) y crea lo que falte de init_db.sql. Después recrea las vistas
+materializadas metric_* (populate_pg.py las refresca al final de cada carga) y
+suma a las tablas metric_agg_* (y a las rachas) las partidas pendientes de agregar.
+
 Uso:
     python scripts/apply_schema.py
+    python scripts/apply_schema.py --status     # solo muestra la versión actual
 """
 import sys
+import argparse
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parents[1]
@@ -15,6 +23,9 @@ if str(SRC_DIR) not in sys.path:
 
 import psycopg2
 from utils.config import POSTGRES_URI
+from utils.migrations import apply_schema, current_version, latest_version
+from utils.metric_aggregates import apply_metric_deltas
+from utils.streaks import rebuild_streaks
 
 # psycopg2 necesita DSN sin el prefijo de SQLAlchemy
 def to_psycopg2_dsn(uri: str) -> str:
@@ -25,19 +36,25 @@ VIEWS_FILE = Path(__file__).parent / "create_metric_views.sql"
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Aplica esquema, migraciones y vistas en PostgreSQL")
+    parser.add_argument("--status", action="store_true", help="Mostrar versión aplicada y salir")
+    args = parser.parse_args()
+
     dsn = to_psycopg2_dsn(POSTGRES_URI)
     print(f"[SCHEMA] Conectando a PostgreSQL...")
     try:
         conn = psycopg2.connect(dsn)
-        conn.autocommit = True
     except Exception as e:
         print(f"[ERROR] No se pudo conectar: {e}")
         sys.exit(1)
 
-    # 1. Aplicar tablas base
-    sql_base = SQL_FILE.read_text(encoding="utf-8")
-    with conn.cursor() as cur:
-        cur.execute(sql_base)
+    if args.status:
+        print(f"[SCHEMA] Versión aplicada: {current_version(conn)} | última: {latest_version()}")
+        conn.close()
+        return
+
+    # 1. Tablas base + migraciones
+    apply_schema(conn, SQL_FILE.read_text(encoding="utf-8"))
     print(f"[SCHEMA] ✅ Schema aplicado correctamente desde {SQL_FILE.name}")
 
     # 2. Aplicar vistas de métricas
@@ -45,8 +62,20 @@ def main():
         sql_views = VIEWS_FILE.read_text(encoding="utf-8")
         with conn.cursor() as cur:
             cur.execute(sql_views)
-        print(f"[SCHEMA] ✅ Vistas de métricas aplicadas desde {VIEWS_FILE.name}")
-    
+        conn.commit()
+        print(f"[SCHEMA] ✅ Vistas materializadas de métricas recreadas desde {VIEWS_FILE.name}")
+
+    # 3. Agregados metric_agg_* y rachas: partidas aún no sumadas (tras la migración 005, todas)
+    apply_metric_deltas(conn)
+
+    # 4. Rachas vacías con partidas ya agregadas (tras la migración 007): recalcular desde cero
+    with conn.cursor() as cur:
+        cur.execute("SELECT NOT EXISTS (SELECT 1 FROM streaks) AND EXISTS (SELECT 1 FROM matches WHERE aggregated)")
+        if cur.fetchone()[0]:
+            n = rebuild_streaks(cur)
+            print(f"[SCHEMA] ✅ Rachas recalculadas: {n} series")
+    conn.commit()
+
     conn.close()
 
 
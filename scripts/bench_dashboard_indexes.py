@@ -0,0 +1,187 @@
+"""
+scripts/bench_dashboard_indexes.py
+Comprueba con EXPLAIN ANALYZE qué índices usan las consultas principales del dashboard.
+
+Para cada consulta (mismos predicados que dashboard/db.py) muestra el tiempo, el tipo
+de recorrido de cada tabla (Index Only Scan / Index Scan / Bitmap / Seq Scan), el
+índice y los Heap Fetches. Un Index Only Scan con muchos Heap Fetches indica que falta
+VACUUM (el mapa de visibilidad está desactualizado tras una carga): usar --vacuum.
+
+Uso:
+    python scripts/bench_dashboard_indexes.py                       # primera pool registrada
+    python scripts/bench_dashboard_indexes.py --pool season --min 1 --vacuum
+    python scripts/bench_dashboard_indexes.py --only streaks ego --plan
+"""
+import sys
+import json
+import argparse
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+SRC_DIR = BASE_DIR / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+import psycopg2
+
+from utils.config import QUEUE_FLEX
+from load.populate_pg import _PG_DSN
+
+_F = "pool_id = %(pool)s AND queue_id = %(queue)s AND friends_count >= %(min)s"
+
+# Nombre → SQL con los predicados y columnas de la función equivalente de dashboard/db.py
+QUERIES = {
+    "winrate_by_account": f"""
+        SELECT puuid, persona, COUNT(*), SUM(CASE WHEN win THEN 1 ELSE 0 END)
+        FROM player_performances
+        WHERE is_friend = TRUE AND persona IS NOT NULL AND {_F}
+        GROUP BY puuid, persona""",
+    "streaks": """
+        SELECT persona, max_win_streak, max_lose_streak,
+               CASE WHEN current_win THEN current_len ELSE -current_len END, last_game_at
+        FROM streaks
+        WHERE pool_id = %(pool)s AND queue_id = %(queue)s AND min_friends = %(min)s AND position = 'Todos'
+        ORDER BY max_win_streak DESC""",
+    "champions_by_role": f"""
+        SELECT persona, champion_name, COUNT(*), SUM(CASE WHEN win THEN 1 ELSE 0 END)
+        FROM player_performances
+        WHERE is_friend = TRUE AND persona IS NOT NULL AND {_F}
+          AND (role = 'TOP' OR (role IS NULL AND lane = 'TOP'))
+        GROUP BY persona, champion_name""",
+    "all_personas": f"""
+        SELECT DISTINCT persona FROM player_performances
+        WHERE is_friend = TRUE AND persona IS NOT NULL AND {_F}""",
+    "matches_per_day_persona": f"""
+        SELECT persona, DATE(game_start_at), COUNT(*)
+        FROM player_performances
+        WHERE is_friend = TRUE AND persona IS NOT NULL AND {_F}
+        GROUP BY 1, 2""",
+    "network_edges": f"""
+        WITH tp AS (
+            SELECT match_id, team_id, persona, win FROM player_performances
+            WHERE {_F} AND persona IS NOT NULL
+        )
+        SELECT LEAST(a.persona, b.persona), GREATEST(a.persona, b.persona), COUNT(*)
+        FROM tp a JOIN tp b ON a.match_id = b.match_id AND a.team_id = b.team_id
+        WHERE a.persona < b.persona
+        GROUP BY 1, 2""",
+    "enemy_comps": f"""
+        SELECT match_id, team_id, champion_name, win, is_friend
+        FROM player_performances WHERE {_F}""",
+    "ego": """
+        SELECT f.persona, AVG(f.damage_dealt * 100.0 / NULLIF(t.damage_dealt, 0))
+        FROM player_performances f
+        JOIN team_performances t
+          ON t.match_id = f.match_id AND t.pool_id = f.pool_id AND t.team_id = f.team_id
+        WHERE f.is_friend = TRUE AND f.persona IS NOT NULL
+          AND f.pool_id = %(pool)s AND f.queue_id = %(queue)s AND f.friends_count >= %(min)s
+          AND t.pool_id = %(pool)s AND t.queue_id = %(queue)s AND t.friends_count >= %(min)s
+        GROUP BY f.persona""",
+    "fiesta": f"""
+        SELECT match_id, MAX(duration_s), SUM(kills), SUM(damage_dealt),
+               SUM(COALESCE(dragon_kills, 0) + COALESCE(tower_kills, 0) + COALESCE(horde_kills, 0)
+                   + COALESCE(herald_kills, 0) + COALESCE(baron_kills, 0))
+        FROM team_performances WHERE {_F}
+        GROUP BY match_id""",
+    "matches_per_day": """
+        SELECT DATE(game_start_at), COUNT(*) FROM matches
+        WHERE pool_id = %(pool)s AND queue_id = %(queue)s AND friends_count >= %(min)s
+        GROUP BY 1""",
+    "player_stats_agg": f"""
+        SELECT persona, SUM(games), SUM(wins), SUM(sum_kills)::numeric / GREATEST(SUM(games), 1)
+        FROM metric_agg_persona WHERE {_F}
+        GROUP BY persona""",
+}
+
+SCAN_TABLES = ("player_performances", "team_performances", "matches", "metric_agg_", "streaks")
+
+
+def _walk(node: dict):
+    yield node
+    for child in node.get("Plans", []):
+        yield from _walk(child)
+
+
+def scans(plan: dict) -> list[dict]:
+    """Nodos de recorrido sobre las tablas del dashboard (particiones incluidas)."""
+    found = []
+    for node in _walk(plan):
+        rel = node.get("Relation Name")
+        if rel and rel.startswith(SCAN_TABLES):
+            found.append({
+                "table": rel,
+                "type": node["Node Type"],
+                "index": node.get("Index Name", ""),
+                "heap_fetches": node.get("Heap Fetches"),
+            })
+    return found
+
+
+def explain(pg_conn, sql: str, params: dict) -> tuple[float, list[dict], dict]:
+    with pg_conn.cursor() as cur:
+        cur.execute(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}", params)
+        result = cur.fetchone()[0]
+    doc = result[0] if isinstance(result, list) else json.loads(result)[0]
+    return doc["Execution Time"], scans(doc["Plan"]), doc["Plan"]
+
+
+def default_pool(pg_conn) -> tuple[str, int] | None:
+    with pg_conn.cursor() as cur:
+        cur.execute("SELECT pool_id, MIN(min_friends) FROM pools GROUP BY pool_id ORDER BY pool_id LIMIT 1")
+        return cur.fetchone()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EXPLAIN ANALYZE de las consultas principales del dashboard")
+    parser.add_argument("--pool", type=str, default=None)
+    parser.add_argument("--queue", type=int, default=QUEUE_FLEX)
+    parser.add_argument("--min", type=int, default=None)
+    parser.add_argument("--only", nargs="+", choices=sorted(QUERIES), default=None)
+    parser.add_argument("--vacuum", action="store_true",
+                        help="VACUUM ANALYZE de las tablas antes de medir (mapa de visibilidad al día)")
+    parser.add_argument("--plan", action="store_true", help="Mostrar el plan JSON completo")
+    args = parser.parse_args()
+
+    pg_conn = psycopg2.connect(_PG_DSN)
+    pg_conn.autocommit = True
+    try:
+        pool_id, min_friends = args.pool, args.min
+        if pool_id is None:
+            row = default_pool(pg_conn)
+            if row is None:
+                print("[BENCH] ⚠️  No hay pools en PostgreSQL")
+                return
+            pool_id, min_friends = row[0], min_friends or row[1]
+        min_friends = min_friends or 1
+
+        if args.vacuum:
+            with pg_conn.cursor() as cur:
+                for table in ("matches", "player_performances", "team_performances"):
+                    print(f"[BENCH] VACUUM ANALYZE {table}")
+                    cur.execute(f"VACUUM ANALYZE {table}")
+
+        params = {"pool": pool_id, "queue": args.queue, "min": min_friends}
+        print(f"[BENCH] pool={pool_id} | queue={args.queue} | min={min_friends}")
+
+        not_ios = []
+        for name in args.only or QUERIES:
+            elapsed, found, plan = explain(pg_conn, QUERIES[name], params)
+            print(f"[BENCH] {name:<24} {elapsed:9.1f} ms")
+            for s in found:
+                fetches = f" heap_fetches={s['heap_fetches']}" if s["heap_fetches"] is not None else ""
+                print(f"[BENCH]     {s['type']:<18} {s['table']:<34} {s['index']}{fetches}")
+            if any(s["type"] != "Index Only Scan" for s in found):
+                not_ios.append(name)
+            if args.plan:
+                print(json.dumps(plan, indent=2))
+
+        if not_ios:
+            print(f"[BENCH] Sin Index Only Scan en todas sus tablas: {', '.join(not_ios)}")
+        else:
+            print("[BENCH] ✅ Todas las consultas usan Index Only Scan")
+    finally:
+        pg_conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+scripts/bench_loaders.py
+Compara los loaders de populate_pg (batch / values / copy) sobre una pool sintética.
+
+Genera N partidas L1 falsas (10 participantes cada una), las transforma con
+populate_pg.build_rows y las carga con cada loader en una pool temporal
+`bench_<loader>` (con su partición de player_performances), que se borra al terminar.
+
+Uso:
+    python scripts/bench_loaders.py                     # 2000 partidas, todos los loaders
+    python scripts/bench_loaders.py --matches 10000 --loaders copy values
+"""
+import sys
+import time
+import random
+import argparse
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+SRC_DIR = BASE_DIR / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+import psycopg2
+
+from utils.pg_loaders import LOADERS
+from utils.pool_manager import make_pool_accounts
+from load.populate_pg import (
+    _PG_DSN, build_rows, flush_rows, ensure_pool, ensure_pp_partition, pp_partition, now_utc,
+)
+
+BATCH = 500
+CHAMPIONS = ["Malphite", "Ahri", "Jinx", "Thresh", "LeeSin", "Garen", "Lux", "Ezreal", "Leona", "Vi"]
+POSITIONS = ["TOP", "JUNGLE", "MIDDLE", "BOTTOM", "UTILITY"]
+
+
+def synthetic_doc(i: int, friends: list[str]) -> dict:
+    start_ts = 1731422914270 + i * 3_600_000
+    participants = []
+    for slot in range(10):
+        puuid = friends[slot] if slot < len(friends) else f"bench-puuid-{i}-{slot}"
+        participants.append({
+            "puuid": puuid,
+            "riotIdGameName": f"Bench{slot}",
+            "riotIdTagLine": "EUW",
+            "championName": random.choice(CHAMPIONS),
+            "teamId": 100 if slot < 5 else 200,
+            "win": slot < 5,
+            "lane": POSITIONS[slot % 5],
+            "teamPosition": POSITIONS[slot % 5],
+            "kills": random.randint(0, 15),
+            "deaths": random.randint(0, 12),
+            "assists": random.randint(0, 25),
+            "goldEarned": random.randint(6000, 18000),
+            "totalDamageDealtToChampions": random.randint(5000, 50000),
+            "totalDamageTaken": random.randint(8000, 45000),
+            "visionScore": random.randint(5, 80),
+            "damageSelfMitigated": random.randint(2000, 100000),
+            "totalMinionsKilled": random.randint(0, 250),
+            "neutralMinionsKilled": random.randint(0, 150),
+            "challenges": {
+                "goldPerMinute": random.uniform(250, 550),
+                "damagePerMinute": random.uniform(300, 1500),
+                "visionScorePerMinute": random.uniform(0.2, 3),
+                "takedownsFirstXMinutes": random.randint(0, 8),
+                "laneMinionsFirst10Minutes": random.randint(0, 90),
+            },
+        })
+    return {
+        "_id": f"BENCH_{i}",
+        "friends_present": friends,
+        "personas_present": friends,
+        "data": {"info": {
+            "gameStartTimestamp": start_ts,
+            "gameEndTimestamp": start_ts + 1_800_000,
+            "gameDuration": 1800,
+            "participants": participants,
+            "teams": [{"teamId": 100, "win": True}, {"teamId": 200, "win": False}],
+        }},
+    }
+
+
+def cleanup(pg_conn, pool_id: str):
+    with pg_conn.cursor() as cur:
+        cur.execute(f"DROP TABLE IF EXISTS {pp_partition(pool_id)}")
+        cur.execute("DELETE FROM team_performances WHERE pool_id = %s", (pool_id,))
+        cur.execute("DELETE FROM matches WHERE pool_id = %s", (pool_id,))
+        cur.execute("DELETE FROM pools WHERE pool_id = %s", (pool_id,))
+    pg_conn.commit()
+
+
+def bench(pg_conn, loader: str, docs: list[dict], queue_id: int) -> float:
+    pool_id = f"bench_{loader}"
+    friends = docs[0]["friends_present"]
+    accounts = make_pool_accounts({p: p for p in friends})
+    cleanup(pg_conn, pool_id)
+    ensure_pool(pg_conn, pool_id, friends, queue_id, len(friends))
+    pg_conn.commit()
+    ensure_pp_partition(pg_conn, pool_id)
+
+    filtered_at = now_utc()
+    t0 = time.perf_counter()
+    for i in range(0, len(docs), BATCH):
+        match_rows, pp_rows, team_rows = [], [], []
+        for doc in docs[i:i + BATCH]:
+            m, pp, teams = build_rows(doc, pool_id, queue_id, len(friends), accounts, filtered_at)
+            match_rows.append(m)
+            pp_rows.extend(pp)
+            team_rows.extend(teams)
+        flush_rows(pg_conn, match_rows, pp_rows, team_rows, loader)
+    elapsed = time.perf_counter() - t0
+
+    cleanup(pg_conn, pool_id)
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de loaders PG sobre una pool sintética")
+    parser.add_argument("--matches", type=int, default=2000)
+    parser.add_argument("--friends", type=int, default=5)
+    parser.add_argument("--queue", type=int, default=440)
+    parser.add_argument("--loaders", nargs="+", choices=sorted(LOADERS), default=["batch", "values", "copy"])
+    args = parser.parse_args()
+
+    random.seed(42)
+    friends = [f"bench-friend-{k}" for k in range(args.friends)]
+    docs = [synthetic_doc(i, friends) for i in range(args.matches)]
+    rows = args.matches * 13
+
+    pg_conn = psycopg2.connect(_PG_DSN)
+    try:
+        print(f"[BENCH] {args.matches} partidas sintéticas ({rows} filas)")
+        results = {}
+        for loader in args.loaders:
+            elapsed = bench(pg_conn, loader, docs, args.queue)
+            results[loader] = elapsed
+            print(f"[BENCH] {loader:<7} {elapsed:8.2f}s  {rows / elapsed:10.0f} filas/s")
+
+        base = results.get("batch")
+        if base:
+            for loader, elapsed in results.items():
+                print(f"[BENCH] {loader:<7} x{base / elapsed:.1f} vs batch")
+    finally:
+        pg_conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,118 +1,58 @@
 -- scripts/create_metric_views.sql
--- Métricas en tiempo real sobre PostgreSQL mediante Vistas.
--- Estas vistas incluyen friends_count para permitir filtrado dinámico en el dashboard.
+-- Métricas pre-agregadas sobre PostgreSQL mediante vistas materializadas.
+-- Incluyen friends_count para permitir filtrado dinámico en el dashboard.
+--
+-- populate_pg.py las refresca al final de cada carga con REFRESH MATERIALIZED VIEW
+-- CONCURRENTLY (utils/metric_views.py), que exige un índice único sin expresiones:
+-- cada vista lleva el suyo sobre sus columnas de agrupación.
+--
+-- apply_schema.py ejecuta este fichero entero: borra las metric_* existentes
+-- (vistas normales de versiones anteriores o materializadas) y las recrea.
+--
+-- Las métricas 01/02/05/07/08/10/11/14/15 ya no son vistas: viven en las tablas
+-- metric_agg_* (init_db.sql), que el ETL mantiene sumando solo las partidas nuevas
+-- (utils/metric_aggregates.py). Aquí quedan 09 y 12 (pares ADC/SUP por partida),
+-- que se recalculan enteras en cada refresco.
 
-DROP VIEW IF EXISTS metric_01_players_winrate CASCADE;
-DROP VIEW IF EXISTS metric_02_13_champions_winrate CASCADE;
-DROP VIEW IF EXISTS metric_05_player_stats CASCADE;
-DROP VIEW IF EXISTS metric_07_troll_index CASCADE;
-DROP VIEW IF EXISTS metric_08_first_metrics CASCADE;
-DROP VIEW IF EXISTS metric_10_stats_by_role CASCADE;
-DROP VIEW IF EXISTS metric_11_records CASCADE;
-DROP VIEW IF EXISTS metric_12_botlane_synergy CASCADE;
-DROP VIEW IF EXISTS metric_14_community_champions CASCADE;
-DROP VIEW IF EXISTS metric_15_enemy_champions CASCADE;
+DO $$
+DECLARE
+    r RECORD;
+BEGIN
+    FOR r IN
+        SELECT c.relname, c.relkind
+        FROM pg_class c
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE n.nspname = current_schema()
+          AND c.relname LIKE 'metric\_%'
+          AND c.relkind IN ('v', 'm')
+    LOOP
+        IF r.relkind = 'm' THEN
+            EXECUTE format('DROP MATERIALIZED VIEW IF EXISTS %I CASCADE', r.relname);
+        ELSE
+            EXECUTE format('DROP VIEW IF EXISTS %I CASCADE', r.relname);
+        END IF;
+    END LOOP;
+END $$;
 
--- 1. Winrates por jugador
-CREATE VIEW metric_01_players_winrate AS
-SELECT pool_id, queue_id, friends_count, persona,
-       COUNT(*) AS total_matches,
-       SUM(CASE WHEN win THEN 1 ELSE 0 END) AS wins,
-       SUM(CASE WHEN NOT win THEN 1 ELSE 0 END) AS losses,
-       ROUND((SUM(CASE WHEN win THEN 1 ELSE 0 END)::numeric / COUNT(*)) * 100, 2) AS winrate
-FROM player_performances
-WHERE is_friend = TRUE AND persona IS NOT NULL
-GROUP BY pool_id, queue_id, friends_count, persona;
-
--- 2 & 13. Winrates por campeón y jugador
-CREATE VIEW metric_02_13_champions_winrate AS
-SELECT pool_id, queue_id, friends_count, persona, champion_name,
-       COUNT(*) AS total_matches,
-       SUM(CASE WHEN win THEN 1 ELSE 0 END) AS wins,
-       SUM(CASE WHEN NOT win THEN 1 ELSE 0 END) AS losses,
-       ROUND((SUM(CASE WHEN win THEN 1 ELSE 0 END)::numeric / COUNT(*)) * 100, 2) AS winrate
-FROM player_performances
-WHERE is_friend = TRUE AND persona IS NOT NULL
-GROUP BY pool_id, queue_id, friends_count, persona, champion_name;
-
--- 5. Estadísticas promedio por jugador
-CREATE VIEW metric_05_player_stats AS
-SELECT pool_id, queue_id, friends_count, persona,
-       COUNT(*) AS games,
-       SUM(CASE WHEN win THEN 1 ELSE 0 END) AS wins,
-       ROUND((SUM(CASE WHEN win THEN 1 ELSE 0 END)::numeric / COUNT(*)) * 100, 2) AS winrate,
-       ROUND(AVG(kills), 2) AS avg_kills,
-       ROUND(AVG(deaths), 2) AS avg_deaths,
-       ROUND(AVG(assists), 2) AS avg_assists,
-       ROUND(AVG(damage_dealt), 2) AS avg_damage,
-       ROUND(AVG(damage_taken), 2) AS avg_damage_taken,
-       ROUND(AVG(vision_score), 2) AS avg_vision,
-       ROUND(AVG(gold_earned), 2) AS avg_gold,
-       ROUND(AVG(cs_total), 2) AS avg_cs
-FROM player_performances
-WHERE is_friend = TRUE AND persona IS NOT NULL
-GROUP BY pool_id, queue_id, friends_count, persona;
-
--- 7. Troll Index
-CREATE VIEW metric_07_troll_index AS
+-- 9. Uso de habilidades (Q/W/E/R)
+CREATE MATERIALIZED VIEW metric_09_skills AS
 SELECT pool_id, queue_id, friends_count, persona,
        COUNT(*) AS games,
-       SUM(CASE WHEN game_ended_surrender AND NOT win THEN 1 ELSE 0 END) AS early_surrenders,
-       SUM(CASE WHEN cs_total < 10 AND (kills+assists) = 0 AND duration_s > 600 THEN 1 ELSE 0 END) AS afks
-FROM player_performances
-WHERE is_friend = TRUE AND persona IS NOT NULL
-GROUP BY pool_id, queue_id, friends_count, persona;
-
--- 8. First Metrics e Inicio de partida
-CREATE VIEW metric_08_first_metrics AS
-SELECT pool_id, queue_id, friends_count, persona,
-       COUNT(*) AS games,
-       SUM(CASE WHEN first_blood_kill THEN 1 ELSE 0 END) AS total_fb_kills,
-       SUM(CASE WHEN first_blood_assist THEN 1 ELSE 0 END) AS total_fb_assists,
-       ROUND(AVG(takedowns_first_x_minutes), 2) AS avg_early_takedowns,
-       ROUND(AVG(gold_per_minute), 2) AS avg_early_gold_per_min,
-       ROUND(AVG(damage_per_minute), 2) AS avg_early_dmg_per_min,
-       ROUND(AVG(vision_score_per_minute), 2) AS avg_early_vision_per_min,
-       ROUND(AVG(lane_minions_first_10_minutes), 2) AS avg_early_cs_10m
-FROM player_performances
-WHERE is_friend = TRUE AND persona IS NOT NULL
-GROUP BY pool_id, queue_id, friends_count, persona;
-
--- 10. Stats by Role
-CREATE VIEW metric_10_stats_by_role AS
-SELECT pool_id, queue_id, friends_count, persona, COALESCE(role, lane, 'UNKNOWN') AS position,
-       COUNT(*) AS games,
-       SUM(CASE WHEN win THEN 1 ELSE 0 END) AS wins,
-       ROUND((SUM(CASE WHEN win THEN 1 ELSE 0 END)::numeric / COUNT(*)) * 100, 2) AS winrate,
-       ROUND(AVG(kills), 2) AS avg_kills,
-       ROUND(AVG(deaths), 2) AS avg_deaths,
-       ROUND(AVG(assists), 2) AS avg_assists,
-       ROUND(AVG(damage_dealt), 2) AS avg_damage,
-       ROUND(AVG(damage_taken), 2) AS avg_damage_taken,
-       ROUND(AVG(vision_score), 2) AS avg_vision,
-       ROUND(AVG(gold_earned), 2) AS avg_gold,
-       ROUND(AVG(cs_total), 2) AS avg_cs
-FROM player_performances
-WHERE is_friend = TRUE AND persona IS NOT NULL
-GROUP BY pool_id, queue_id, friends_count, persona, COALESCE(role, lane, 'UNKNOWN');
-
--- 11. Records personales
-CREATE VIEW metric_11_records AS
-SELECT pool_id, queue_id, friends_count, persona,
-       MAX(kills) AS max_kills,
-       MAX(deaths) AS max_deaths,
-       MAX(assists) AS max_assists,
-       MAX(vision_score) AS max_vision_score,
-       MAX(cs_total) AS max_cs,
-       MAX(damage_dealt) AS max_damage_dealt,
-       MAX(gold_earned) AS max_gold,
-       MAX(duration_s) AS max_duration_s
+       ROUND(AVG(spell1_casts), 2) AS avg_q_casts,
+       ROUND(AVG(spell2_casts), 2) AS avg_w_casts,
+       ROUND(AVG(spell3_casts), 2) AS avg_e_casts,
+       ROUND(AVG(spell4_casts), 2) AS avg_r_casts,
+       MAX(spell1_casts) AS max_q_casts,
+       MAX(spell2_casts) AS max_w_casts,
+       MAX(spell3_casts) AS max_e_casts,
+       MAX(spell4_casts) AS max_r_casts
 FROM player_performances
 WHERE is_friend = TRUE AND persona IS NOT NULL
 GROUP BY pool_id, queue_id, friends_count, persona;
+CREATE UNIQUE INDEX ux_metric_09_skills ON metric_09_skills (pool_id, queue_id, friends_count, persona);
 
 -- 12. Botlane Synergy
-CREATE VIEW metric_12_botlane_synergy AS
+CREATE MATERIALIZED VIEW metric_12_botlane_synergy AS
 WITH adcs AS (
     SELECT match_id, team_id, pool_id, queue_id, friends_count, persona, win, kills, deaths, assists, damage_dealt, vision_score, gold_earned, cs_total
     FROM player_performances
@@ -140,25 +80,4 @@ FROM adcs a
 JOIN sups s ON a.match_id = s.match_id AND a.team_id = s.team_id AND a.pool_id = s.pool_id
 WHERE a.persona <> s.persona
 GROUP BY a.pool_id, a.queue_id, a.friends_count, LEAST(a.persona, s.persona), GREATEST(a.persona, s.persona);
-
--- 14. Campeones jugados (Comunidad)
-CREATE VIEW metric_14_community_champions AS
-SELECT pool_id, queue_id, friends_count, champion_name,
-       COUNT(*) AS games,
-       SUM(CASE WHEN win THEN 1 ELSE 0 END) AS wins,
-       SUM(CASE WHEN NOT win THEN 1 ELSE 0 END) AS losses,
-       ROUND((SUM(CASE WHEN win THEN 1 ELSE 0 END)::numeric / COUNT(*)) * 100, 2) AS winrate
-FROM player_performances
-WHERE is_friend = TRUE 
-GROUP BY pool_id, queue_id, friends_count, champion_name;
-
--- 15. Campeones jugados por el enemigo
-CREATE VIEW metric_15_enemy_champions AS
-SELECT pool_id, queue_id, friends_count, champion_name,
-       COUNT(*) AS games,
-       SUM(CASE WHEN win THEN 1 ELSE 0 END) AS wins,
-       SUM(CASE WHEN NOT win THEN 1 ELSE 0 END) AS losses,
-       ROUND((SUM(CASE WHEN win THEN 1 ELSE 0 END)::numeric / COUNT(*)) * 100, 2) AS winrate
-FROM player_performances
-WHERE is_friend = FALSE 
-GROUP BY pool_id, queue_id, friends_count, champion_name;
+CREATE UNIQUE INDEX ux_metric_12_botlane_synergy ON metric_12_botlane_synergy (pool_id, queue_id, friends_count, p1, p2);
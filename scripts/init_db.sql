@@ -1,6 +1,9 @@
 -- LoL Analytics — PostgreSQL Schema
 -- Ejecutar con: python scripts/apply_schema.py
--- O directamente: psql -U lol_user -d lol_analytics -f scripts/init_db.sql
+--
+-- Este fichero describe siempre el esquema actual completo. Los cambios sobre
+-- BDs existentes van además como migración en scripts/migrations/NNN_*.sql
+-- (apply_schema.py las aplica y registra en schema_version).
 
 -- ======================================================
 -- DIMENSIÓN: pools
@@ -20,7 +23,7 @@ CREATE TABLE IF NOT EXISTS pools (
 -- ======================================================
 CREATE TABLE IF NOT EXISTS matches (
     match_id          VARCHAR(30)  NOT NULL,
-    pool_id           VARCHAR(30)  REFERENCES pools(pool_id) ON DELETE CASCADE,
+    pool_id           VARCHAR(30)  NOT NULL,  -- referencia lógica a pools (PK compuesta)
     queue_id          INTEGER      NOT NULL,
     min_friends       INTEGER      NOT NULL,
     duration_s        INTEGER,
@@ -31,66 +34,228 @@ CREATE TABLE IF NOT EXISTS matches (
     personas_present  TEXT[]       NOT NULL DEFAULT '{}',
     winning_team      INTEGER,                -- 100 o 200
     filtered_at       TIMESTAMPTZ  NOT NULL DEFAULT NOW(),
+    aggregated        BOOLEAN      NOT NULL DEFAULT FALSE,  -- sumada a metric_agg_*
+    friends_count     INTEGER,                -- cardinality(friends_present)
+    friends_team_id   INTEGER,                -- equipo con más amigos (team_performances.is_friends_team)
+    group_win         BOOLEAN,                -- team_performances.win de ese equipo (NULL sin equipo de amigos)
     PRIMARY KEY (match_id, pool_id)
 );
 
 CREATE INDEX IF NOT EXISTS idx_matches_pool_queue ON matches (pool_id, queue_id);
 CREATE INDEX IF NOT EXISTS idx_matches_start     ON matches (game_start_at);
 CREATE INDEX IF NOT EXISTS idx_matches_pool_start ON matches (pool_id, game_start_at);
+CREATE INDEX IF NOT EXISTS idx_matches_pool_queue_start ON matches (pool_id, queue_id, game_start_at);
+CREATE INDEX IF NOT EXISTS idx_matches_pending ON matches (pool_id) WHERE NOT aggregated;
+CREATE INDEX IF NOT EXISTS idx_matches_pool_queue_friends_start ON matches (pool_id, queue_id, friends_count, game_start_at)
+    INCLUDE (match_id, group_win);
 
 -- ======================================================
 -- L2: player_performances
 -- Una fila por jugador x partida. Fusiona L2_players_flat y L2_enemies_flat
+-- Particionada por pool_id: las consultas del dashboard (siempre por pool) leen una sola partición
+-- Generado desde src/utils/pp_columns.py (python src/utils/pp_columns.py)
 -- ======================================================
 CREATE TABLE IF NOT EXISTS player_performances (
-    id              BIGSERIAL    PRIMARY KEY,
-    match_id        VARCHAR(30)  NOT NULL,
-    puuid           VARCHAR(100) NOT NULL,
-    persona         VARCHAR(100),             -- NULL si es rival
-    is_friend       BOOLEAN      NOT NULL,
-    champion_name   VARCHAR(60),
-    team_id         INTEGER,                  -- 100 o 200
-    win             BOOLEAN,
-    lane            VARCHAR(20),
-    role            VARCHAR(20),
-    kills           INTEGER,
-    deaths          INTEGER,
-    assists         INTEGER,
-    gold_earned     INTEGER,
-    damage_dealt    INTEGER,
-    damage_taken    INTEGER,
-    vision_score    INTEGER,
-    damage_mitigated INTEGER,
-    cs_total        INTEGER,                  -- totalMinionsKilled + neutralMinionsKilled
-    riot_id_name    VARCHAR(100),             -- Nombre visible (GameName#Tag)
+    id                   BIGSERIAL    NOT NULL,
+    match_id             VARCHAR(30)  NOT NULL,
+    puuid                VARCHAR(100) NOT NULL,
+    persona              VARCHAR(100),             -- NULL si es rival
+    is_friend            BOOLEAN      NOT NULL,
+    champion_name        VARCHAR(60),
+    team_id              INTEGER,                  -- 100 o 200
+    win                  BOOLEAN,
+    lane                 VARCHAR(20),
+    role                 VARCHAR(20),              -- teamPosition, o role si falta
+    kills                INTEGER,
+    deaths               INTEGER,
+    assists              INTEGER,
+    gold_earned          INTEGER,
+    damage_dealt         INTEGER,
+    damage_taken         INTEGER,
+    vision_score         INTEGER,
+    damage_mitigated     INTEGER,
+    cs_total             INTEGER,                  -- totalMinionsKilled + neutralMinionsKilled
+    riot_id_name         VARCHAR(100),             -- Nombre visible (GameName#Tag)
     game_ended_surrender BOOLEAN DEFAULT FALSE,
-    pool_id         VARCHAR(30),
-    queue_id        INTEGER,
-    game_start_at   TIMESTAMPTZ,
-    duration_s      INTEGER,
-    friends_count   INTEGER,                  -- Número real de amigos en esta partida
-
-    -- Metrics 08 & 09 fields
-    first_blood_kill        BOOLEAN DEFAULT FALSE,
-    first_blood_assist      BOOLEAN DEFAULT FALSE,
+    pool_id              VARCHAR(30)  NOT NULL,    -- Clave de partición
+    queue_id             INTEGER,
+    game_start_at        TIMESTAMPTZ,
+    duration_s           INTEGER,
+    friends_count        INTEGER,                  -- Número real de amigos en esta partida
+    first_blood_kill     BOOLEAN DEFAULT FALSE,
+    first_blood_assist   BOOLEAN DEFAULT FALSE,
     longest_time_spent_living INTEGER,
     takedowns_first_x_minutes NUMERIC,
-    gold_per_minute         NUMERIC,
-    damage_per_minute       NUMERIC,
-    vision_score_per_minute   NUMERIC,
+    gold_per_minute      NUMERIC,
+    damage_per_minute    NUMERIC,
+    vision_score_per_minute NUMERIC,
     lane_minions_first_10_minutes INTEGER,
-    spell1_casts            INTEGER DEFAULT 0,
-    spell2_casts            INTEGER DEFAULT 0,
-    spell3_casts            INTEGER DEFAULT 0,
-    spell4_casts            INTEGER DEFAULT 0,
-
+    spell1_casts         INTEGER DEFAULT 0,
+    spell2_casts         INTEGER DEFAULT 0,
+    spell3_casts         INTEGER DEFAULT 0,
+    spell4_casts         INTEGER DEFAULT 0,
+    PRIMARY KEY (id, pool_id),
     UNIQUE (match_id, pool_id, puuid)
-);
+) PARTITION BY LIST (pool_id);
+
+-- Particiones: una por pool (player_performances_<pool>), creadas por el ETL.
+-- La DEFAULT recoge filas de pools sin partición propia.
+CREATE TABLE IF NOT EXISTS player_performances_default PARTITION OF player_performances DEFAULT;
 
 CREATE INDEX IF NOT EXISTS idx_pp_puuid_pool   ON player_performances (puuid, pool_id);
-CREATE INDEX IF NOT EXISTS idx_pp_persona_pool ON player_performances (persona, pool_id);
 CREATE INDEX IF NOT EXISTS idx_pp_match        ON player_performances (match_id);
 CREATE INDEX IF NOT EXISTS idx_pp_champion     ON player_performances (champion_name);
 CREATE INDEX IF NOT EXISTS idx_pp_start        ON player_performances (game_start_at);
-CREATE INDEX IF NOT EXISTS idx_pp_friend       ON player_performances (is_friend, pool_id);
-CREATE INDEX IF NOT EXISTS idx_pp_lane         ON player_performances (lane, pool_id);
+CREATE INDEX IF NOT EXISTS idx_pp_pool_queue_friends_cover ON player_performances (pool_id, queue_id, friends_count)
+    INCLUDE (is_friend, match_id, team_id, champion_name, win);
+CREATE INDEX IF NOT EXISTS idx_pp_match_pool_friend  ON player_performances (match_id, pool_id) WHERE is_friend;
+CREATE INDEX IF NOT EXISTS idx_pp_pool_persona       ON player_performances (pool_id, persona) WHERE is_friend;
+-- Consultas de amigos del dashboard (persona IS NOT NULL ⇔ is_friend): Index Only Scan
+CREATE INDEX IF NOT EXISTS idx_pp_persona_cover ON player_performances (pool_id, queue_id, friends_count)
+    INCLUDE (persona, is_friend, puuid, match_id, team_id, win, game_start_at, champion_name, role, lane)
+    WHERE persona IS NOT NULL;
+
+-- ======================================================
+-- L2: team_performances
+-- Una fila por equipo x partida: totales, resultado, lado de los amigos y objetivos.
+-- Generado desde src/utils/team_columns.py (cd src && python -m utils.team_columns)
+-- ======================================================
+CREATE TABLE IF NOT EXISTS team_performances (
+    match_id             VARCHAR(30)  NOT NULL,
+    pool_id              VARCHAR(30)  NOT NULL,
+    team_id              INTEGER      NOT NULL,    -- 100 o 200
+    queue_id             INTEGER,
+    game_start_at        TIMESTAMPTZ,
+    duration_s           INTEGER,
+    friends_count        INTEGER,                  -- Amigos en la partida (ambos equipos)
+    friends_on_team      INTEGER,
+    is_friends_team      BOOLEAN      NOT NULL,    -- Equipo con más amigos (empate: el de menor team_id)
+    win                  BOOLEAN,
+    kills                INTEGER,
+    deaths               INTEGER,
+    assists              INTEGER,
+    damage_dealt         INTEGER,
+    damage_taken         INTEGER,
+    gold_earned          INTEGER,
+    vision_score         INTEGER,
+    cs_total             INTEGER,
+    first_blood          BOOLEAN,
+    first_tower          BOOLEAN,
+    first_inhibitor      BOOLEAN,
+    first_dragon         BOOLEAN,
+    first_herald         BOOLEAN,
+    first_horde          BOOLEAN,                  -- Larvas del vacío
+    first_baron          BOOLEAN,
+    tower_kills          INTEGER,
+    inhibitor_kills      INTEGER,
+    dragon_kills         INTEGER,
+    herald_kills         INTEGER,
+    horde_kills          INTEGER,
+    baron_kills          INTEGER,
+    PRIMARY KEY (match_id, pool_id, team_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_tp_pool_queue_friends_cover ON team_performances (pool_id, queue_id, friends_count)
+    INCLUDE (match_id, team_id, is_friends_team, win, duration_s, kills, assists, damage_dealt,
+             gold_earned, tower_kills, dragon_kills, herald_kills, horde_kills, baron_kills);
+CREATE INDEX IF NOT EXISTS idx_tp_friends_team       ON team_performances (pool_id, match_id) WHERE is_friends_team;
+
+-- ======================================================
+-- Agregados del dashboard: metric_agg_*
+-- Contadores, sumas y máximos por grupo; el ETL suma las partidas nuevas (matches.aggregated).
+-- Generado desde src/utils/metric_aggregates.py (cd src && python -m utils.metric_aggregates)
+-- ======================================================
+CREATE TABLE IF NOT EXISTS metric_agg_persona (
+    pool_id                  VARCHAR(30)  NOT NULL,
+    queue_id                 INTEGER      NOT NULL,
+    friends_count            INTEGER      NOT NULL,
+    persona                  VARCHAR(100) NOT NULL,
+    games                    BIGINT NOT NULL,
+    wins                     BIGINT NOT NULL,
+    sum_kills                BIGINT,
+    sum_deaths               BIGINT,
+    sum_assists              BIGINT,
+    sum_damage_dealt         BIGINT,
+    sum_damage_taken         BIGINT,
+    sum_vision_score         BIGINT,
+    sum_gold_earned          BIGINT,
+    sum_cs_total             BIGINT,
+    early_surrenders         BIGINT,
+    afks                     BIGINT,
+    fb_kills                 BIGINT,
+    fb_assists               BIGINT,
+    sum_early_takedowns      NUMERIC,
+    sum_gold_per_minute      NUMERIC,
+    sum_damage_per_minute    NUMERIC,
+    sum_vision_per_minute    NUMERIC,
+    sum_cs_10m               BIGINT,
+    max_kills                INTEGER,
+    max_deaths               INTEGER,
+    max_assists              INTEGER,
+    max_vision_score         INTEGER,
+    max_cs                   INTEGER,
+    max_damage_dealt         INTEGER,
+    max_gold                 INTEGER,
+    max_duration_s           INTEGER,
+    PRIMARY KEY (pool_id, queue_id, friends_count, persona)
+);
+
+CREATE TABLE IF NOT EXISTS metric_agg_persona_champion (
+    pool_id                  VARCHAR(30)  NOT NULL,
+    queue_id                 INTEGER      NOT NULL,
+    friends_count            INTEGER      NOT NULL,
+    persona                  VARCHAR(100) NOT NULL,
+    champion_name            VARCHAR(60)  NOT NULL,
+    games                    BIGINT NOT NULL,
+    wins                     BIGINT NOT NULL,
+    PRIMARY KEY (pool_id, queue_id, friends_count, persona, champion_name)
+);
+
+CREATE TABLE IF NOT EXISTS metric_agg_persona_role (
+    pool_id                  VARCHAR(30)  NOT NULL,
+    queue_id                 INTEGER      NOT NULL,
+    friends_count            INTEGER      NOT NULL,
+    persona                  VARCHAR(100) NOT NULL,
+    position                 VARCHAR(20)  NOT NULL,
+    games                    BIGINT NOT NULL,
+    wins                     BIGINT NOT NULL,
+    sum_kills                BIGINT,
+    sum_deaths               BIGINT,
+    sum_assists              BIGINT,
+    sum_damage_dealt         BIGINT,
+    sum_damage_taken         BIGINT,
+    sum_vision_score         BIGINT,
+    sum_gold_earned          BIGINT,
+    sum_cs_total             BIGINT,
+    PRIMARY KEY (pool_id, queue_id, friends_count, persona, position)
+);
+
+CREATE TABLE IF NOT EXISTS metric_agg_champion (
+    pool_id                  VARCHAR(30)  NOT NULL,
+    queue_id                 INTEGER      NOT NULL,
+    friends_count            INTEGER      NOT NULL,
+    is_friend                BOOLEAN      NOT NULL,
+    champion_name            VARCHAR(60)  NOT NULL,
+    games                    BIGINT NOT NULL,
+    wins                     BIGINT NOT NULL,
+    PRIMARY KEY (pool_id, queue_id, friends_count, is_friend, champion_name)
+);
+
+-- ======================================================
+-- Rachas por (pool, cola, umbral min_friends, persona, posición)
+-- Estado incremental mantenido por el ETL (src/utils/streaks.py)
+-- ======================================================
+CREATE TABLE IF NOT EXISTS streaks (
+    pool_id          VARCHAR(30)  NOT NULL,
+    queue_id         INTEGER      NOT NULL,
+    min_friends      INTEGER      NOT NULL,   -- serie: partidas con friends_count >= min_friends
+    persona          VARCHAR(100) NOT NULL,
+    position         VARCHAR(20)  NOT NULL,   -- 'Todos' o TOP/JUNGLE/MID/ADC/SUPPORT
+    max_win_streak   INTEGER      NOT NULL,
+    max_lose_streak  INTEGER      NOT NULL,
+    current_win      BOOLEAN,                 -- resultado de la racha actual
+    current_len      INTEGER      NOT NULL,
+    last_game_at     TIMESTAMPTZ,             -- última partida contada (orden: game_start_at, match_id)
+    last_match_id    VARCHAR(30),
+    PRIMARY KEY (pool_id, queue_id, min_friends, persona, position)
+);
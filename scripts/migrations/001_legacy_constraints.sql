@@ -0,0 +1,78 @@
+-- 001_legacy_constraints.sql
+-- Lleva una BD anterior a schema_version al esquema de init_db.sql.
+-- Sustituye a migrate_pools_pk.sql, migrate_full_v2.sql y al ALTER de riot_id_name
+-- que hacía populate_pg en cada ejecución. Idempotente.
+
+-- 1. Columnas añadidas a player_performances después de la primera versión
+ALTER TABLE player_performances ADD COLUMN IF NOT EXISTS riot_id_name VARCHAR(100);
+ALTER TABLE player_performances ADD COLUMN IF NOT EXISTS game_ended_surrender BOOLEAN DEFAULT FALSE;
+ALTER TABLE player_performances ADD COLUMN IF NOT EXISTS pool_id VARCHAR(30);
+ALTER TABLE player_performances ADD COLUMN IF NOT EXISTS queue_id INTEGER;
+ALTER TABLE player_performances ADD COLUMN IF NOT EXISTS game_start_at TIMESTAMPTZ;
+ALTER TABLE player_performances ADD COLUMN IF NOT EXISTS duration_s INTEGER;
+ALTER TABLE player_performances ADD COLUMN IF NOT EXISTS friends_count INTEGER;
+ALTER TABLE player_performances ADD COLUMN IF NOT EXISTS first_blood_kill BOOLEAN DEFAULT FALSE;
+ALTER TABLE player_performances ADD COLUMN IF NOT EXISTS first_blood_assist BOOLEAN DEFAULT FALSE;
+ALTER TABLE player_performances ADD COLUMN IF NOT EXISTS longest_time_spent_living INTEGER;
+ALTER TABLE player_performances ADD COLUMN IF NOT EXISTS takedowns_first_x_minutes NUMERIC;
+ALTER TABLE player_performances ADD COLUMN IF NOT EXISTS gold_per_minute NUMERIC;
+ALTER TABLE player_performances ADD COLUMN IF NOT EXISTS damage_per_minute NUMERIC;
+ALTER TABLE player_performances ADD COLUMN IF NOT EXISTS vision_score_per_minute NUMERIC;
+ALTER TABLE player_performances ADD COLUMN IF NOT EXISTS lane_minions_first_10_minutes INTEGER;
+ALTER TABLE player_performances ADD COLUMN IF NOT EXISTS spell1_casts INTEGER DEFAULT 0;
+ALTER TABLE player_performances ADD COLUMN IF NOT EXISTS spell2_casts INTEGER DEFAULT 0;
+ALTER TABLE player_performances ADD COLUMN IF NOT EXISTS spell3_casts INTEGER DEFAULT 0;
+ALTER TABLE player_performances ADD COLUMN IF NOT EXISTS spell4_casts INTEGER DEFAULT 0;
+
+UPDATE player_performances pp
+SET friends_count = cardinality(m.friends_present)
+FROM matches m
+WHERE pp.friends_count IS NULL
+  AND pp.match_id = m.match_id AND pp.pool_id = m.pool_id;
+
+-- 2. matches.pool_id no puede referenciar la PK compuesta de pools
+ALTER TABLE matches DROP CONSTRAINT IF EXISTS matches_pool_id_fkey;
+
+-- 3. PKs compuestas: pools (pool_id, min_friends) y matches (match_id, pool_id)
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_index i
+        JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = ANY (i.indkey)
+        WHERE i.indrelid = 'pools'::regclass AND i.indisprimary AND a.attname = 'min_friends'
+    ) THEN
+        ALTER TABLE pools DROP CONSTRAINT IF EXISTS pools_pkey CASCADE;
+        ALTER TABLE pools ADD PRIMARY KEY (pool_id, min_friends);
+    END IF;
+
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_index i
+        JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = ANY (i.indkey)
+        WHERE i.indrelid = 'matches'::regclass AND i.indisprimary AND a.attname = 'pool_id'
+    ) THEN
+        ALTER TABLE matches DROP CONSTRAINT IF EXISTS matches_pkey CASCADE;
+        ALTER TABLE matches ADD PRIMARY KEY (match_id, pool_id);
+    END IF;
+END $$;
+
+-- 4. Unicidad (match_id, pool_id, puuid) en player_performances, que usa el ON CONFLICT del ETL
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_index i
+        WHERE i.indrelid = 'player_performances'::regclass AND i.indisunique AND i.indnatts = 3
+          AND (SELECT array_agg(a.attname::text ORDER BY a.attname) FROM pg_attribute a
+               WHERE a.attrelid = i.indrelid AND a.attnum = ANY (i.indkey))
+              = ARRAY['match_id', 'pool_id', 'puuid']
+    ) THEN
+        DELETE FROM player_performances pp1
+        USING player_performances pp2
+        WHERE pp1.id > pp2.id
+          AND pp1.match_id = pp2.match_id
+          AND pp1.pool_id = pp2.pool_id
+          AND pp1.puuid = pp2.puuid;
+
+        ALTER TABLE player_performances
+            ADD CONSTRAINT player_performances_match_id_pool_id_puuid_key UNIQUE (match_id, pool_id, puuid);
+    END IF;
+END $$;
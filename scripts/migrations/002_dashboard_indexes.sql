@@ -0,0 +1,18 @@
+-- 002_dashboard_indexes.sql
+-- Índices para los filtros del dashboard y las consultas del ETL.
+
+-- Filtro común de todas las vistas/consultas: pool_id + queue_id + friends_count >= N
+CREATE INDEX IF NOT EXISTS idx_pp_pool_queue_friends
+    ON player_performances (pool_id, queue_id, friends_count);
+
+-- Subconsultas "resultado del grupo": primer amigo de cada partida
+CREATE INDEX IF NOT EXISTS idx_pp_match_pool_friend
+    ON player_performances (match_id, pool_id) WHERE is_friend;
+
+-- Estadísticas por persona dentro de una pool
+CREATE INDEX IF NOT EXISTS idx_pp_pool_persona
+    ON player_performances (pool_id, persona) WHERE is_friend;
+
+-- Listados de partidas por pool/cola ordenados por fecha (y carga incremental por pool)
+CREATE INDEX IF NOT EXISTS idx_matches_pool_queue_start
+    ON matches (pool_id, queue_id, game_start_at);
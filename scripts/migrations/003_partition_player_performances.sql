@@ -0,0 +1,51 @@
+-- 003_partition_player_performances.sql
+-- player_performances pasa a estar particionada por LIST (pool_id): una partición
+-- por pool (player_performances_<pool>) más una DEFAULT de seguridad.
+-- La PK pasa de (id) a (id, pool_id): en tablas particionadas las claves únicas
+-- deben incluir la clave de partición. El ETL crea las particiones de pools nuevas.
+
+DO $$
+DECLARE
+    pool TEXT;
+BEGIN
+    IF (SELECT relkind FROM pg_class WHERE oid = 'player_performances'::regclass) = 'p' THEN
+        RETURN;
+    END IF;
+
+    ALTER TABLE player_performances RENAME TO player_performances_legacy;
+    -- La secuencia del BIGSERIAL sobrevive al DROP de la tabla antigua
+    ALTER SEQUENCE player_performances_id_seq OWNED BY NONE;
+
+    CREATE TABLE player_performances (LIKE player_performances_legacy INCLUDING DEFAULTS)
+        PARTITION BY LIST (pool_id);
+    ALTER TABLE player_performances ALTER COLUMN pool_id SET NOT NULL;
+    ALTER SEQUENCE player_performances_id_seq OWNED BY player_performances.id;
+
+    CREATE TABLE player_performances_default PARTITION OF player_performances DEFAULT;
+    FOR pool IN SELECT DISTINCT pool_id FROM player_performances_legacy WHERE pool_id IS NOT NULL LOOP
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF player_performances FOR VALUES IN (%L)',
+            'player_performances_' || regexp_replace(lower(pool), '[^a-z0-9_]', '_', 'g'),
+            pool
+        );
+    END LOOP;
+
+    INSERT INTO player_performances SELECT * FROM player_performances_legacy WHERE pool_id IS NOT NULL;
+    -- Las vistas de métricas dependen de la tabla; apply_schema.py las recrea después
+    DROP TABLE player_performances_legacy CASCADE;
+
+    ALTER TABLE player_performances ADD PRIMARY KEY (id, pool_id);
+    ALTER TABLE player_performances ADD UNIQUE (match_id, pool_id, puuid);
+END $$;
+
+-- Índices (se propagan a todas las particiones)
+CREATE INDEX IF NOT EXISTS idx_pp_puuid_pool   ON player_performances (puuid, pool_id);
+CREATE INDEX IF NOT EXISTS idx_pp_persona_pool ON player_performances (persona, pool_id);
+CREATE INDEX IF NOT EXISTS idx_pp_match        ON player_performances (match_id);
+CREATE INDEX IF NOT EXISTS idx_pp_champion     ON player_performances (champion_name);
+CREATE INDEX IF NOT EXISTS idx_pp_start        ON player_performances (game_start_at);
+CREATE INDEX IF NOT EXISTS idx_pp_friend       ON player_performances (is_friend, pool_id);
+CREATE INDEX IF NOT EXISTS idx_pp_lane         ON player_performances (lane, pool_id);
+CREATE INDEX IF NOT EXISTS idx_pp_pool_queue_friends ON player_performances (pool_id, queue_id, friends_count);
+CREATE INDEX IF NOT EXISTS idx_pp_match_pool_friend  ON player_performances (match_id, pool_id) WHERE is_friend;
+CREATE INDEX IF NOT EXISTS idx_pp_pool_persona       ON player_performances (pool_id, persona) WHERE is_friend;
@@ -0,0 +1,69 @@
+-- 004_team_performances.sql
+-- Tabla de hechos por equipo: una fila por (partida, pool, equipo) con totales de
+-- jugadores, resultado, lado de los amigos y objetivos de info.teams.
+-- La escribe populate_pg junto a matches / player_performances.
+
+CREATE TABLE IF NOT EXISTS team_performances (
+    match_id             VARCHAR(30)  NOT NULL,
+    pool_id              VARCHAR(30)  NOT NULL,
+    team_id              INTEGER      NOT NULL,    -- 100 o 200
+    queue_id             INTEGER,
+    game_start_at        TIMESTAMPTZ,
+    duration_s           INTEGER,
+    friends_count        INTEGER,                  -- Amigos en la partida (ambos equipos)
+    friends_on_team      INTEGER,
+    is_friends_team      BOOLEAN      NOT NULL,    -- Equipo con más amigos (empate: el de menor team_id)
+    win                  BOOLEAN,
+    kills                INTEGER,
+    deaths               INTEGER,
+    assists              INTEGER,
+    damage_dealt         INTEGER,
+    damage_taken         INTEGER,
+    gold_earned          INTEGER,
+    vision_score         INTEGER,
+    cs_total             INTEGER,
+    first_blood          BOOLEAN,
+    first_tower          BOOLEAN,
+    first_inhibitor      BOOLEAN,
+    first_dragon         BOOLEAN,
+    first_herald         BOOLEAN,
+    first_horde          BOOLEAN,                  -- Larvas del vacío
+    first_baron          BOOLEAN,
+    tower_kills          INTEGER,
+    inhibitor_kills      INTEGER,
+    dragon_kills         INTEGER,
+    herald_kills         INTEGER,
+    horde_kills          INTEGER,
+    baron_kills          INTEGER,
+    PRIMARY KEY (match_id, pool_id, team_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_tp_pool_queue_friends ON team_performances (pool_id, queue_id, friends_count);
+CREATE INDEX IF NOT EXISTS idx_tp_friends_team       ON team_performances (pool_id, match_id) WHERE is_friends_team;
+
+-- Relleno inicial desde player_performances. Los objetivos no están en PostgreSQL:
+-- quedan NULL hasta la siguiente recarga de la pool (populate_pg --swap).
+INSERT INTO team_performances (
+    match_id, pool_id, team_id, queue_id, game_start_at, duration_s, friends_count,
+    friends_on_team, is_friends_team, win,
+    kills, deaths, assists, damage_dealt, damage_taken, gold_earned, vision_score, cs_total
+)
+SELECT match_id, pool_id, team_id,
+       MAX(queue_id), MAX(game_start_at), MAX(duration_s), MAX(friends_count),
+       COUNT(*) FILTER (WHERE is_friend), FALSE, bool_or(win),
+       SUM(kills), SUM(deaths), SUM(assists), SUM(damage_dealt), SUM(damage_taken),
+       SUM(gold_earned), SUM(vision_score), SUM(cs_total)
+FROM player_performances
+WHERE team_id IS NOT NULL
+GROUP BY match_id, pool_id, team_id
+ON CONFLICT (match_id, pool_id, team_id) DO NOTHING;
+
+UPDATE team_performances t
+SET is_friends_team = TRUE
+FROM (
+    SELECT DISTINCT ON (match_id, pool_id) match_id, pool_id, team_id
+    FROM team_performances
+    WHERE friends_on_team > 0
+    ORDER BY match_id, pool_id, friends_on_team DESC, team_id
+) f
+WHERE t.match_id = f.match_id AND t.pool_id = f.pool_id AND t.team_id = f.team_id;
@@ -0,0 +1,84 @@
+-- 005_metric_aggregates.sql
+-- Tablas metric_agg_* con los agregados del dashboard (metric_01/02/05/07/08/10/11/14/15),
+-- mantenidas con deltas aditivos por populate_pg (utils/metric_aggregates.py).
+-- matches.aggregated marca las partidas ya sumadas; las existentes quedan pendientes y
+-- apply_schema.py las agrega al terminar (o el siguiente populate_pg).
+
+ALTER TABLE matches ADD COLUMN IF NOT EXISTS aggregated BOOLEAN NOT NULL DEFAULT FALSE;
+CREATE INDEX IF NOT EXISTS idx_matches_pending ON matches (pool_id) WHERE NOT aggregated;
+
+CREATE TABLE IF NOT EXISTS metric_agg_persona (
+    pool_id                  VARCHAR(30)  NOT NULL,
+    queue_id                 INTEGER      NOT NULL,
+    friends_count            INTEGER      NOT NULL,
+    persona                  VARCHAR(100) NOT NULL,
+    games                    BIGINT NOT NULL,
+    wins                     BIGINT NOT NULL,
+    sum_kills                BIGINT,
+    sum_deaths               BIGINT,
+    sum_assists              BIGINT,
+    sum_damage_dealt         BIGINT,
+    sum_damage_taken         BIGINT,
+    sum_vision_score         BIGINT,
+    sum_gold_earned          BIGINT,
+    sum_cs_total             BIGINT,
+    early_surrenders         BIGINT,
+    afks                     BIGINT,
+    fb_kills                 BIGINT,
+    fb_assists               BIGINT,
+    sum_early_takedowns      NUMERIC,
+    sum_gold_per_minute      NUMERIC,
+    sum_damage_per_minute    NUMERIC,
+    sum_vision_per_minute    NUMERIC,
+    sum_cs_10m               BIGINT,
+    max_kills                INTEGER,
+    max_deaths               INTEGER,
+    max_assists              INTEGER,
+    max_vision_score         INTEGER,
+    max_cs                   INTEGER,
+    max_damage_dealt         INTEGER,
+    max_gold                 INTEGER,
+    max_duration_s           INTEGER,
+    PRIMARY KEY (pool_id, queue_id, friends_count, persona)
+);
+
+CREATE TABLE IF NOT EXISTS metric_agg_persona_champion (
+    pool_id                  VARCHAR(30)  NOT NULL,
+    queue_id                 INTEGER      NOT NULL,
+    friends_count            INTEGER      NOT NULL,
+    persona                  VARCHAR(100) NOT NULL,
+    champion_name            VARCHAR(60)  NOT NULL,
+    games                    BIGINT NOT NULL,
+    wins                     BIGINT NOT NULL,
+    PRIMARY KEY (pool_id, queue_id, friends_count, persona, champion_name)
+);
+
+CREATE TABLE IF NOT EXISTS metric_agg_persona_role (
+    pool_id                  VARCHAR(30)  NOT NULL,
+    queue_id                 INTEGER      NOT NULL,
+    friends_count            INTEGER      NOT NULL,
+    persona                  VARCHAR(100) NOT NULL,
+    position                 VARCHAR(20)  NOT NULL,
+    games                    BIGINT NOT NULL,
+    wins                     BIGINT NOT NULL,
+    sum_kills                BIGINT,
+    sum_deaths               BIGINT,
+    sum_assists              BIGINT,
+    sum_damage_dealt         BIGINT,
+    sum_damage_taken         BIGINT,
+    sum_vision_score         BIGINT,
+    sum_gold_earned          BIGINT,
+    sum_cs_total             BIGINT,
+    PRIMARY KEY (pool_id, queue_id, friends_count, persona, position)
+);
+
+CREATE TABLE IF NOT EXISTS metric_agg_champion (
+    pool_id                  VARCHAR(30)  NOT NULL,
+    queue_id                 INTEGER      NOT NULL,
+    friends_count            INTEGER      NOT NULL,
+    is_friend                BOOLEAN      NOT NULL,
+    champion_name            VARCHAR(60)  NOT NULL,
+    games                    BIGINT NOT NULL,
+    wins                     BIGINT NOT NULL,
+    PRIMARY KEY (pool_id, queue_id, friends_count, is_friend, champion_name)
+);
@@ -0,0 +1,40 @@
+-- 006_covering_indexes.sql
+-- Índices compuestos / parciales con INCLUDE diseñados desde las consultas de
+-- dashboard/db.py, para que las principales se resuelvan con Index Only Scan.
+-- Comprobar con: python scripts/bench_dashboard_indexes.py --vacuum
+--
+-- Todas filtran por pool_id = ? AND queue_id = ? AND friends_count >= ? (rango al final).
+
+-- Amigos: persona IS NOT NULL ⇔ is_friend (el ETL solo asigna persona a cuentas de la pool).
+-- Rachas, récords por rol, campeones por persona, personas, partidas por día, red, ego, troll.
+CREATE INDEX IF NOT EXISTS idx_pp_persona_cover
+    ON player_performances (pool_id, queue_id, friends_count)
+    INCLUDE (persona, is_friend, puuid, match_id, team_id, win, game_start_at, champion_name, role, lane)
+    WHERE persona IS NOT NULL;
+
+-- Los 10 participantes: combinaciones enemigas, heatmap enemigo, aliados externos.
+-- Sustituye a idx_pp_pool_queue_friends (mismas claves, sin INCLUDE).
+CREATE INDEX IF NOT EXISTS idx_pp_pool_queue_friends_cover
+    ON player_performances (pool_id, queue_id, friends_count)
+    INCLUDE (is_friend, match_id, team_id, champion_name, win);
+DROP INDEX IF EXISTS idx_pp_pool_queue_friends;
+
+-- Totales por equipo: ego, troll, fiesta, anomalías. Sustituye a idx_tp_pool_queue_friends.
+CREATE INDEX IF NOT EXISTS idx_tp_pool_queue_friends_cover
+    ON team_performances (pool_id, queue_id, friends_count)
+    INCLUDE (match_id, team_id, is_friends_team, win, duration_s, kills, assists, damage_dealt,
+             gold_earned, tower_kills, dragon_kills, herald_kills, horde_kills, baron_kills);
+DROP INDEX IF EXISTS idx_tp_pool_queue_friends;
+
+-- matches se filtra por cardinality(friends_present): índice de expresión. PostgreSQL no
+-- hace Index Only Scan sobre expresiones (necesitaría friends_present), pero evita el
+-- recorrido completo de la pool en estadísticas generales, partidas por día y heatmap.
+CREATE INDEX IF NOT EXISTS idx_matches_pool_queue_nfriends
+    ON matches (pool_id, queue_id, (cardinality(friends_present)))
+    INCLUDE (match_id, game_start_at);
+
+-- Con booleano o persona como primera columna no las usa ninguna consulta por pool:
+-- solo encarecían la carga.
+DROP INDEX IF EXISTS idx_pp_friend;
+DROP INDEX IF EXISTS idx_pp_persona_pool;
+DROP INDEX IF EXISTS idx_pp_lane;
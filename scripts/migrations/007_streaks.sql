@@ -0,0 +1,19 @@
+-- 007_streaks.sql
+-- Estado de las rachas de victorias/derrotas por (pool, cola, umbral, persona, posición).
+-- Lo mantiene populate_pg junto a metric_agg_* (utils/streaks.py). La tabla nace vacía:
+-- apply_schema.py la recalcula desde player_performances al terminar.
+
+CREATE TABLE IF NOT EXISTS streaks (
+    pool_id          VARCHAR(30)  NOT NULL,
+    queue_id         INTEGER      NOT NULL,
+    min_friends      INTEGER      NOT NULL,   -- serie: partidas con friends_count >= min_friends
+    persona          VARCHAR(100) NOT NULL,
+    position         VARCHAR(20)  NOT NULL,   -- 'Todos' o TOP/JUNGLE/MID/ADC/SUPPORT
+    max_win_streak   INTEGER      NOT NULL,
+    max_lose_streak  INTEGER      NOT NULL,
+    current_win      BOOLEAN,                 -- resultado de la racha actual
+    current_len      INTEGER      NOT NULL,
+    last_game_at     TIMESTAMPTZ,             -- última partida contada (orden: game_start_at, match_id)
+    last_match_id    VARCHAR(30),
+    PRIMARY KEY (pool_id, queue_id, min_friends, persona, position)
+);
@@ -0,0 +1,26 @@
+-- 008_matches_group_result.sql
+-- Resultado del grupo desnormalizado en matches: el dashboard deja de buscar, por cada
+-- partida, la fila de un amigo en player_performances.
+--   friends_count    = cardinality(friends_present)
+--   friends_team_id  = equipo con más amigos (el mismo que team_performances.is_friends_team)
+--   group_win        = team_performances.win de ese equipo; NULL si no hay equipo de amigos
+-- Los escribe populate_pg (build_rows); aquí se rellenan desde las tablas existentes.
+
+ALTER TABLE matches ADD COLUMN IF NOT EXISTS friends_count   INTEGER;
+ALTER TABLE matches ADD COLUMN IF NOT EXISTS friends_team_id INTEGER;
+ALTER TABLE matches ADD COLUMN IF NOT EXISTS group_win       BOOLEAN;
+
+UPDATE matches SET friends_count = cardinality(friends_present);
+
+UPDATE matches m
+SET friends_team_id = t.team_id, group_win = t.win
+FROM team_performances t
+WHERE t.match_id = m.match_id AND t.pool_id = m.pool_id AND t.is_friends_team;
+
+-- Filtro común de las consultas sobre matches, con la fecha para los listados ordenados
+CREATE INDEX IF NOT EXISTS idx_matches_pool_queue_friends_start
+    ON matches (pool_id, queue_id, friends_count, game_start_at)
+    INCLUDE (match_id, group_win);
+
+-- Sustituido por el anterior: el filtro ya no usa cardinality(friends_present)
+DROP INDEX IF EXISTS idx_matches_pool_queue_nfriends;
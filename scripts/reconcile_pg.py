@@ -0,0 +1,213 @@
+"""
+scripts/reconcile_pg.py
+Reconciliación Mongo L1 ↔ PostgreSQL para una pool.
+
+Compara por día (UTC, gameStartTimestamp) el número de partidas y un digest de sus
+IDs (md5 de los match_id ordenados). PostgreSQL solo devuelve los digests por día;
+los IDs se piden únicamente para los días que no cuadran, y de ellos salen las
+partidas que faltan en PostgreSQL y las que sobran.
+
+El lado PostgreSQL se filtra como el dashboard: `friends_count >= --min`,
+así que una pool cargada con --all-mins desde min 1 se compara bien con cualquier L1.
+
+Uso:
+    python scripts/reconcile_pg.py                          # pool auto-detectada
+    python scripts/reconcile_pg.py --pool season --min 1
+    python scripts/reconcile_pg.py --pool ca879f16 --from-raw   # pools cargadas sin L1
+    python scripts/reconcile_pg.py --pool ca879f16 --ids-file diff.txt
+
+Sale con código 1 si hay diferencias. Las que faltan se cargan con
+`populate_pg.py --incremental`; las sobrantes requieren recargar la pool (--swap).
+Sale con código 2 si la colección L1 no existe (pool cargada con --from-raw o --min
+sin L1): sin ella todas las partidas de PostgreSQL saldrían como sobrantes.
+"""
+import sys
+import hashlib
+import argparse
+from collections import defaultdict
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+SRC_DIR = BASE_DIR / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+import psycopg2
+
+from utils.config import (
+    MONGO_DB, COLLECTION_RAW_MATCHES, COLLECTION_USERS_INDEX, COLLECTION_USERS_INDEX_SEASON,
+    QUEUE_FLEX, MIN_FRIENDS_IN_MATCH, SEASON_START_TS,
+)
+from utils.db import get_mongo_client
+from utils.friend_index import raw_match_query, friends_in_match
+from load.populate_pg import _PG_DSN, resolve_pool, pool_accounts, ts_ms_to_dt
+
+NO_DATE = "sin fecha"
+
+
+def ids_digest(ids) -> str:
+    return hashlib.md5(",".join(sorted(ids)).encode("utf-8")).hexdigest()
+
+
+def _day(ts_ms: int | None) -> str:
+    dt = ts_ms_to_dt(ts_ms)
+    return dt.date().isoformat() if dt else NO_DATE
+
+
+# =============================================================
+# MONGO
+# =============================================================
+
+def mongo_ids_by_day(mongo_db, pool_id: str, l1_name: str, queue_id: int, min_friends: int,
+                     users_collection: str, from_raw: bool) -> dict[str, set[str]]:
+    """{día: {match_id}} de la L1 de la pool, o del filtro L1 aplicado sobre raw."""
+    by_day: dict[str, set[str]] = defaultdict(set)
+
+    if not from_raw:
+        print(f"[RECONCILE] Mongo: {l1_name}")
+        for doc in mongo_db[l1_name].find({}, {"_id": 1, "data.info.gameStartTimestamp": 1}):
+            by_day[_day(doc.get("data", {}).get("info", {}).get("gameStartTimestamp"))].add(doc["_id"])
+        return by_day
+
+    _, accounts = pool_accounts(mongo_db, pool_id, users_collection, use_registry=False)
+    since_ts = SEASON_START_TS if pool_id == "season" else None
+    query = raw_match_query(mongo_db, queue_id, min_friends, accounts.friend_puuids, since_ts)
+    print(f"[RECONCILE] Mongo: {COLLECTION_RAW_MATCHES} filtrado en memoria ({len(accounts.friend_puuids)} cuentas)")
+    projection = {"_id": 1, "data.metadata.participants": 1, "data.info.gameStartTimestamp": 1}
+    for doc in mongo_db[COLLECTION_RAW_MATCHES].find(query, projection):
+        data = doc.get("data", {})
+        friends_present, _ = friends_in_match(data, accounts.friend_puuids, accounts.puuid_to_persona)
+        if len(friends_present) >= min_friends:
+            by_day[_day(data.get("info", {}).get("gameStartTimestamp"))].add(doc["_id"])
+    return by_day
+
+
+# =============================================================
+# POSTGRESQL
+# =============================================================
+
+_PG_DAY = "COALESCE(((game_start_at AT TIME ZONE 'UTC')::date)::text, %s)"
+
+
+def pg_digests_by_day(pg_conn, pool_id: str, queue_id: int, min_friends: int) -> dict[str, tuple[int, str]]:
+    """{día: (partidas, digest)} calculado en PostgreSQL, sin traer los IDs."""
+    with pg_conn.cursor() as cur:
+        cur.execute(f"""
+            SELECT {_PG_DAY} AS day, COUNT(*),
+                   md5(string_agg(match_id, ',' ORDER BY match_id COLLATE "C"))
+            FROM matches
+            WHERE pool_id = %s AND queue_id = %s AND friends_count >= %s
+            GROUP BY 1
+        """, (NO_DATE, pool_id, queue_id, min_friends))
+        return {day: (n, digest) for day, n, digest in cur.fetchall()}
+
+
+def pg_ids_for_days(pg_conn, pool_id: str, queue_id: int, min_friends: int, days: list[str]) -> set[str]:
+    with pg_conn.cursor() as cur:
+        cur.execute(f"""
+            SELECT match_id FROM matches
+            WHERE pool_id = %s AND queue_id = %s AND friends_count >= %s
+              AND {_PG_DAY} = ANY(%s)
+        """, (pool_id, queue_id, min_friends, NO_DATE, days))
+        return {r[0] for r in cur.fetchall()}
+
+
+# =============================================================
+# RECONCILIACIÓN
+# =============================================================
+
+def reconcile(mongo_db, pg_conn, pool_id: str, l1_name: str, queue_id: int, min_friends: int,
+              users_collection: str = COLLECTION_USERS_INDEX, from_raw: bool = False) -> dict:
+    """
+    Devuelve {"days": [(día, n_mongo, n_pg)], "missing": [...], "extra": [...], "total_mongo", "total_pg"}
+    con solo los días que no cuadran.
+    """
+    mongo = mongo_ids_by_day(mongo_db, pool_id, l1_name, queue_id, min_friends, users_collection, from_raw)
+    pg = pg_digests_by_day(pg_conn, pool_id, queue_id, min_friends)
+
+    bad_days = []
+    for day in sorted(set(mongo) | set(pg)):
+        ids = mongo.get(day, set())
+        n_pg, digest_pg = pg.get(day, (0, None))
+        if len(ids) != n_pg or (ids and ids_digest(ids) != digest_pg):
+            bad_days.append((day, len(ids), n_pg))
+
+    missing, extra = [], []
+    if bad_days:
+        days = [d for d, _, _ in bad_days]
+        pg_ids = pg_ids_for_days(pg_conn, pool_id, queue_id, min_friends, days)
+        mongo_ids = set().union(*(mongo.get(d, set()) for d in days))
+        missing = sorted(mongo_ids - pg_ids)
+        extra = sorted(pg_ids - mongo_ids)
+
+    return {
+        "days": bad_days,
+        "missing": missing,
+        "extra": extra,
+        "total_mongo": sum(len(ids) for ids in mongo.values()),
+        "total_pg": sum(n for n, _ in pg.values()),
+        "n_days": len(set(mongo) | set(pg)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara partidas por día entre Mongo L1 y PostgreSQL")
+    parser.add_argument("--pool", type=str, default=None)
+    parser.add_argument("--queue", type=int, default=QUEUE_FLEX)
+    parser.add_argument("--min", type=int, default=MIN_FRIENDS_IN_MATCH)
+    parser.add_argument("--users-collection", type=str, default=None,
+                        help="Colección de usuarios (por defecto la de la pool; solo con --from-raw)")
+    parser.add_argument("--from-raw", action="store_true",
+                        help="Comparar con el filtro L1 aplicado sobre raw (pools cargadas con --from-raw)")
+    parser.add_argument("--show", type=int, default=20, help="IDs a mostrar por lista")
+    parser.add_argument("--ids-file", type=Path, default=None,
+                        help="Escribir todos los IDs que faltan / sobran en este fichero")
+    args = parser.parse_args()
+
+    users_collection = args.users_collection or (
+        COLLECTION_USERS_INDEX_SEASON if args.pool == "season" else COLLECTION_USERS_INDEX)
+
+    pg_conn = psycopg2.connect(_PG_DSN)
+    try:
+        with get_mongo_client() as mongo_client:
+            mongo_db = mongo_client[MONGO_DB]
+            pool_id, l1_name = resolve_pool(mongo_db, args.pool, args.queue, args.min,
+                                            use_registry=not args.from_raw)
+            print(f"[RECONCILE] pool={pool_id} | queue={args.queue} | min={args.min}")
+            if not args.from_raw and l1_name not in mongo_db.list_collection_names():
+                print(f"[RECONCILE] ❌ {l1_name} no existe en MongoDB. Si la pool se cargó sin L1 "
+                      f"(populate_pg --from-raw), usar --from-raw; si no, revisar --pool/--min")
+                sys.exit(2)
+            result = reconcile(mongo_db, pg_conn, pool_id, l1_name, args.queue, args.min,
+                               users_collection, args.from_raw)
+    finally:
+        pg_conn.close()
+
+    print(f"[RECONCILE] Mongo={result['total_mongo']} | PG={result['total_pg']} "
+          f"| días={result['n_days']} | días con diferencias={len(result['days'])}")
+    for day, n_mongo, n_pg in result["days"]:
+        print(f"[RECONCILE]   {day}  mongo={n_mongo:<5} pg={n_pg:<5}")
+
+    for label, ids in (("faltan en PG", result["missing"]), ("sobran en PG", result["extra"])):
+        if ids:
+            shown = ", ".join(ids[:args.show]) + (" ..." if len(ids) > args.show else "")
+            print(f"[RECONCILE] {len(ids)} {label}: {shown}")
+
+    if args.ids_file and (result["missing"] or result["extra"]):
+        lines = [f"missing\t{m}" for m in result["missing"]] + [f"extra\t{m}" for m in result["extra"]]
+        args.ids_file.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        print(f"[RECONCILE] IDs escritos en {args.ids_file}")
+
+    if not result["days"]:
+        print("[RECONCILE] ✅ Mongo y PostgreSQL coinciden")
+        return
+    if result["missing"]:
+        print(f"[RECONCILE] Cargar las que faltan: python src/load/populate_pg.py --pool {pool_id} "
+              f"--min {args.min} --incremental{' --from-raw' if args.from_raw else ''}")
+    if result["extra"]:
+        print("[RECONCILE] Las sobrantes se eliminan recargando la pool con --swap")
+    sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -23,23 +23,24 @@ def main():
     print("Procesando L1-L2 y Season (min 1 a 5)")
     print("="*50)
 
+    # L1 min1 es superconjunto de min2..5: una sola pasada con --all-mins
+    # registra todas las pools (pool_id, min_friends) en PostgreSQL.
+    # --swap: cada pool se recarga aparte y se publica en una transacción,
+    # así el dashboard puede seguir abierto durante la recarga.
+
     # 1. Pipeline Normal (L1-L2)
     print("\n>>> MODO: L1-L2 (Normal)")
-    for min_f in range(1, 6):
-        print(f"\n--- Procesando min_friends={min_f} ---")
-        cmd = [sys.executable, str(PIPELINE), "--mode", "l1-l2", "--min", str(min_f), "--run-in-terminal"]
-        if not run_command(cmd):
-            print("Abortando por error en modo l1-l2")
-            sys.exit(1)
+    cmd = [sys.executable, str(PIPELINE), "--mode", "l1-l2", "--min", "1", "--all-mins", "--swap", "--run-in-terminal"]
+    if not run_command(cmd):
+        print("Abortando por error en modo l1-l2")
+        sys.exit(1)
 
     # 2. Pipeline Season
     print("\n>>> MODO: SEASON")
-    for min_f in range(1, 6):
-        print(f"\n--- Procesando min_friends={min_f} (Season) ---")
-        cmd = [sys.executable, str(PIPELINE), "--mode", "season", "--min", str(min_f), "--run-in-terminal"]
-        if not run_command(cmd):
-            print("Abortando por error en modo season")
-            sys.exit(1)
+    cmd = [sys.executable, str(PIPELINE), "--mode", "season", "--min", "1", "--all-mins", "--swap", "--run-in-terminal"]
+    if not run_command(cmd):
+        print("Abortando por error en modo season")
+        sys.exit(1)
 
     print("\n" + "="*50)
     print("¡PIPELINE COMPLETO FINALIZADO CON ÉXITO!")
@@ -43,6 +43,7 @@ from utils.config import (
     MAX_RETRIES
 )
 from utils.db import get_mongo_client
+from utils.friend_index import load_known_puuids, known_version, upsert_entry
 
 # ============================
 # LOGGING Y UTILIDADES
@@ -124,7 +125,8 @@ def upsert_account(db, riot_id, puuid, region):
     except Exception as e:
         log(f"[WARN] Error guardando cuenta en Mongo: {e}")
 
-def insert_match(db, match_json, region, source_info):
+def insert_match(db, match_json, region, source_info, known=None, version=None):
+    """Inserta la partida raw y, si se pasa `known`, su entrada en el índice de amigos."""
     match_id = match_json.get("metadata", {}).get("matchId")
     if not match_id:
         return False
@@ -139,6 +141,8 @@ def insert_match(db, match_json, region, source_info):
     }
     try:
         coll_matches.insert_one(doc)
+        if known is not None:
+            upsert_entry(db, match_id, match_json, known, version)
         return True
     except errors.DuplicateKeyError:
         return False
@@ -193,6 +197,9 @@ def ingest_from_api(db):
 
     lol = LolWatcher(get_api_key(REGIONAL_ROUTING), timeout=REQUEST_TIMEOUT)
 
+    known = load_known_puuids(db)
+    version = known_version(known)
+
     # Identificar de quién vamos a descargar
     L0_index = db[COLLECTION_USERS_INDEX]
     all_user_docs = list(L0_index.find({}, {"puuids": 1, "persona": 1}))
@@ -221,7 +228,7 @@ def ingest_from_api(db):
             if not match_json:
                 continue
 
-            if insert_match(db, match_json, match_id.split("_", 1)[0], "riot_api"):
+            if insert_match(db, match_json, match_id.split("_", 1)[0], "riot_api", known, version):
                 total_inserted += 1
                 log(f"✔ Insertada {match_id}")
             else:
@@ -260,6 +267,8 @@ def ingest_from_file(db):
 
     riotid_map = sync_accounts_from_local(db)
     known_puuids = set(riotid_map.keys())
+    known = load_known_puuids(db)
+    version = known_version(known)
 
     total_files = 0
     inserted = 0
@@ -280,7 +289,7 @@ def ingest_from_file(db):
             skipped += 1
             continue
 
-        if insert_match(db, data, region, str(file_path)):
+        if insert_match(db, data, region, str(file_path), known, version):
             inserted += 1
         else:
             skipped += 1
@@ -12,9 +12,11 @@ _SRC_DIR = _FILE_SELF.parents[1]  # src/
 if str(_SRC_DIR) not in sys.path:
     sys.path.insert(0, str(_SRC_DIR))
 
-from utils.pool_manager import build_pool_version
-from utils.config import MONGO_DB, COLLECTION_RAW_MATCHES, QUEUE_FLEX, MIN_FRIENDS_IN_MATCH
+from utils.pool_manager import build_pool_version, register_pool, load_users_accounts
+from utils.config import MONGO_DB, COLLECTION_RAW_MATCHES, QUEUE_FLEX, MIN_FRIENDS_IN_MATCH, SEASON_START_TS
 from utils.db import get_mongo_client
+from utils.partitioned_scan import run_partitioned, resolve_workers
+from utils.friend_index import raw_match_query, friends_in_match
 
 
 
@@ -28,6 +30,56 @@ def now_utc():
 # build_pool_version importado desde utils.pool_manager (fuente de verdad única)
 
 
+# ============================
+# PARTITION WORKER
+# ============================
+def filter_partition(query, coll_name, friend_puuids, persona_por_puuid,
+                     queue_id, min_friends, pool_version, run_id, filtered_at):
+    """
+    Filtra las partidas raw que cumplen `query` y las escribe en `coll_name`.
+    Abre su propia conexión para poder ejecutarse en un proceso del pool.
+    Devuelve el número de partidas insertadas.
+    """
+    with get_mongo_client() as client:
+        db = client[MONGO_DB]
+        coll_dest = db[coll_name]
+        cursor = db[COLLECTION_RAW_MATCHES].find(query, {"_id": 1, "data": 1})
+
+        ops = []
+        total_inserted = 0
+
+        for doc in cursor:
+            mid = doc["_id"]
+            data = doc.get("data", {})
+            friends_present, personas_present = friends_in_match(data, friend_puuids, persona_por_puuid)
+
+            if len(friends_present) >= min_friends:
+
+                record = {
+                    "_id": mid,
+                    "queue": queue_id,
+                    "min_friends": min_friends,
+                    "pool_version": pool_version,
+                    "friends_present": friends_present,
+                    "personas_present": personas_present,
+                    "filtered_at": filtered_at,
+                    "run_id": run_id,
+                    "data": data
+                }
+
+                ops.append(UpdateOne({"_id": mid}, {"$set": record}, upsert=True))
+                total_inserted += 1
+
+                if len(ops) >= 500:
+                    coll_dest.bulk_write(ops, ordered=False)
+                    ops = []
+
+        if ops:
+            coll_dest.bulk_write(ops, ordered=False)
+
+    return total_inserted
+
+
 # ============================
 # MAIN
 # ============================
@@ -38,6 +90,8 @@ def main():
     parser.add_argument("--min", type=int, default=MIN_FRIENDS_IN_MATCH)
     parser.add_argument("--pool", type=str, default=None, help="Pool ID to use (if not provided, auto-calculate from users index)")
     parser.add_argument("--users-collection", type=str, default="L0_users_index", help="Users index collection to read from")
+    parser.add_argument("--workers", type=int, default=1, help="Parallel partitions over raw matches (0 = all CPU cores)")
+    parser.add_argument("--no-friend-index", action="store_true", help="Scan every raw match instead of using the friend-presence index")
     args = parser.parse_args()
 
     queue_id = args.queue
@@ -53,30 +107,19 @@ def main():
     # ============================
     with get_mongo_client() as client:
         db = client[MONGO_DB]
-        coll_users = db[users_collection]
-        
-        friend_puuids = set()
-        persona_por_puuid = {}
-        personas = set()
 
-        cursor_users = coll_users.find({}, {"persona": 1, "puuids": 1})
-
-        for doc in cursor_users:
-            persona = doc.get("persona")
-            if persona:
-                personas.add(persona)
-            
-            puuids = doc.get("puuids", [])
-            for p in puuids:
-                friend_puuids.add(p)
-                persona_por_puuid[p] = doc["_id"]
+        # frozenset / dict construidos una vez: pertenencia O(1) en el filtro
+        accounts = load_users_accounts(db, users_collection)
+        friend_puuids = accounts.friend_puuids
+        persona_por_puuid = accounts.puuid_to_persona
+        personas = accounts.personas
 
         # Use provided pool ID or calculate from personas
         if pool_id_arg:
             pool_version = f"pool_{pool_id_arg}"
             print(f"[POOL] Using specified pool: {pool_version}")
         else:
-            pool_version = build_pool_version(sorted(list(personas)))
+            pool_version = build_pool_version(list(personas))
             print(f"[POOL] Auto-calculated pool from {len(personas)} personas: {pool_version}")
         
         print(f"[POOL] total_puuids={len(friend_puuids)}")
@@ -94,60 +137,30 @@ def main():
         # FILTER MATCHES
         # ============================
             
-        query = {"data.info.queueId": queue_id}
-            
         # [SEASON LOGIC] If pool is 'season', enforce start date
+        since_ts = None
         if pool_id_arg == "season":
-            # 2026-01-08 00:00:00 UTC = 1767830400000 approx
-            # Using exact timestamp for 2026-01-08
-            TIMESTAMP_2026_01_08 = 1767830400000
-            query["data.info.gameStartTimestamp"] = {"$gte": TIMESTAMP_2026_01_08}
-            print(f"[FILTER] Pool 'season' detected. Enforcing gameStartTimestamp >= {TIMESTAMP_2026_01_08} (2026-01-08)")
-
-        coll_src = db[COLLECTION_RAW_MATCHES]
-        cursor = coll_src.find(
-            query,
-            {"_id": 1, "data": 1}
-        )
-
-        ops = []
-        total_inserted = 0
+            since_ts = SEASON_START_TS
+            print(f"[FILTER] Pool 'season' detected. Enforcing gameStartTimestamp >= {SEASON_START_TS} (2026-01-08)")
 
-        for doc in cursor:
-            mid = doc["_id"]
-            data = doc.get("data", {})
-            metadata = data.get("metadata", {})
-            participants = metadata.get("participants", [])
+        # Friend index (candidates) salvo --no-friend-index
+        query = raw_match_query(db, queue_id, min_friends, friend_puuids, since_ts,
+                                use_index=not args.no_friend_index)
 
-            friends_present = [p for p in participants if p in friend_puuids]
+        filtered_at = now_utc()
+        run_id = filtered_at.strftime('%Y%m%d_%H%M%S')
+        workers = resolve_workers(args.workers)
 
-            if len(friends_present) >= min_friends:
-
-                personas_present = list({
-                    persona_por_puuid[p] for p in friends_present if p in persona_por_puuid
-                })
-
-                record = {
-                    "_id": mid,
-                    "queue": queue_id,
-                    "min_friends": min_friends,
-                    "pool_version": pool_version,
-                    "friends_present": friends_present,
-                    "personas_present": personas_present,
-                    "filtered_at": now_utc(),
-                    "run_id": f"{now_utc().strftime('%Y%m%d_%H%M%S')}",
-                    "data": data
-                }
-
-                ops.append(UpdateOne({"_id": mid}, {"$set": record}, upsert=True))
-                total_inserted += 1
-
-                if len(ops) >= 500:
-                    coll_dest.bulk_write(ops, ordered=False)
-                    ops = []
+        results = run_partitioned(
+            filter_partition, db[COLLECTION_RAW_MATCHES], query, workers,
+            coll_name, friend_puuids, persona_por_puuid,
+            queue_id, min_friends, pool_version, run_id, filtered_at,
+        )
+        total_inserted = sum(results)
 
-        if ops:
-            coll_dest.bulk_write(ops, ordered=False)
+        # Registro de la pool para los pasos siguientes (L2, ETL PG)
+        register_pool(db, pool_version, persona_por_puuid, users_collection,
+                      auto=not pool_id_arg, collection=coll_name)
 
         print(f"[DONE] inserted={total_inserted}")
         print(f"[CHECK] total_docs={coll_dest.count_documents({})}")
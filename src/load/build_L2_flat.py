@@ -12,12 +12,13 @@ _SRC_DIR = _FILE_SELF.parents[1]  # src/
 if str(_SRC_DIR) not in sys.path:
     sys.path.insert(0, str(_SRC_DIR))
 
-from utils.pool_manager import build_pool_version
+from utils.pool_manager import build_pool_version, get_registered_pool, add_pool_collections
 from utils.config import MONGO_DB, QUEUE_FLEX, MIN_FRIENDS_IN_MATCH
 from utils.db import get_mongo_client
 
 DEFAULT_MIN = MIN_FRIENDS_IN_MATCH
 DEFAULT_QUEUE = QUEUE_FLEX
+DEFAULT_BATCH_SIZE = 1000
 
 
 def now_utc():
@@ -30,11 +31,20 @@ def auto_select_l1(queue_id: int, min_friends: int, pool_id: str = None):
     """
     Select L1 collection for the given queue and min_friends.
     If pool_id is provided, use it directly.
-    Otherwise, calculate pool from L0_users_index using personas (same as L1).
+    Otherwise, read the pool written by L1 in the pool registry; without a
+    registry entry, calculate pool from L0_users_index using personas (same as L1).
     """
-    # Auto-calculate pool from L0_users_index using PERSONAS (not PUUIDs)
     with get_mongo_client() as client:
         db = client[MONGO_DB]
+
+        entry = get_registered_pool(db, pool_id)
+        if entry:
+            l1_name = f"L1_q{queue_id}_min{min_friends}_{entry['_id']}"
+            if l1_name not in entry.get("collections", []):
+                print(f"[WARN] L1 collection {l1_name} is not registered for {entry['_id']}.")
+                return None
+            print(f"[INFO] Using registered pool: {entry['pool_id']}")
+            return l1_name
         
         if pool_id:
             # Use provided pool ID
@@ -47,6 +57,7 @@ def auto_select_l1(queue_id: int, min_friends: int, pool_id: str = None):
             print(f"[INFO] Using specified pool: {pool_id}")
             return l1_name
 
+        # Auto-calculate pool from L0_users_index using PERSONAS (not PUUIDs)
         coll_users = db["L0_users_index"]
         personas = set()
     
@@ -70,9 +81,47 @@ def auto_select_l1(queue_id: int, min_friends: int, pool_id: str = None):
     return l1_name
 
 
-def build_l2_from_l1(l1_name):
+def flush_batch(coll, docs: list):
+    if docs:
+        coll.insert_many(docs, ordered=False)
+        docs.clear()
+
+
+_CONTENT_PROJECTION = {"_id": 1, "friends_present": 1, "personas_present": 1}
+
+
+def _l1_content(doc: dict) -> tuple:
+    """Lo que un re-filtrado de L1 puede cambiar de una partida (el summary de L2 lo copia)."""
+    return tuple(doc.get("friends_present", [])), tuple(sorted(doc.get("personas_present", [])))
+
+
+def diff_match_ids(coll_src, coll_summary) -> tuple[list, list, list]:
+    """
+    Devuelve (ids en L1 que faltan en L2, ids en L2 que ya no están en L1, ids cuyo
+    friends_present / personas_present en L1 ya no coincide con el de L2).
+    """
+    l1 = {d["_id"]: _l1_content(d) for d in coll_src.find({}, _CONTENT_PROJECTION)}
+    l2 = {d["_id"]: _l1_content(d) for d in coll_summary.find({}, _CONTENT_PROJECTION)}
+    changed = sorted(i for i in l1.keys() & l2.keys() if l1[i] != l2[i])
+    return sorted(l1.keys() - l2.keys()), sorted(l2.keys() - l1.keys()), changed
+
+
+def iter_source(coll_src, projection: dict, added: list, whole: bool, batch_size: int):
+    """
+    Documentos L1 a procesar: toda la colección si `whole` (build completo o L2 vacía),
+    si no las partidas de `added`, pedidas en trozos de `batch_size` como los borrados.
+    """
+    if whole:
+        yield from coll_src.find({}, projection)
+        return
+    for i in range(0, len(added), batch_size):
+        yield from coll_src.find({"_id": {"$in": added[i:i + batch_size]}}, projection)
+
+
+def build_l2_from_l1(l1_name, batch_size: int = DEFAULT_BATCH_SIZE, full: bool = False):
 
     suffix = l1_name.replace("L1_", "")
+    run_at = now_utc()
 
     with get_mongo_client() as client:
         db = client[MONGO_DB]
@@ -81,14 +130,38 @@ def build_l2_from_l1(l1_name):
         coll_enemies = db[f"L2_enemies_flat_{suffix}"]
         coll_summary = db[f"L2_matches_summary_{suffix}"]
     
-        coll_players.drop()
-        coll_enemies.drop()
-        coll_summary.drop()
-    
-        print(f"[PROCESS] L2 from {l1_name}")
+        if full:
+            coll_players.drop()
+            coll_enemies.drop()
+            coll_summary.drop()
+
+        registry_id = "pool_" + l1_name.split("_pool_", 1)[1]
+        add_pool_collections(db, registry_id, coll_players.name, coll_enemies.name, coll_summary.name)
+
+        coll_players.create_index("match_id")
+        coll_enemies.create_index("match_id")
+
+        whole = full or coll_summary.find_one({}, {"_id": 1}) is None
+        added, removed, changed = diff_match_ids(coll_src, coll_summary)
+        print(f"[PROCESS] L2 from {l1_name} | added={len(added)} removed={len(removed)} "
+              f"changed={len(changed)}")
+        # Las re-filtradas se borran de L2 y se vuelven a emitir como nuevas
+        removed = sorted(removed + changed)
+        added = sorted(added + changed)
+
+        # Borrar partidas que han salido de L1 o cambiado, y restos de cargas interrumpidas de las nuevas
+        for i in range(0, len(removed), batch_size):
+            chunk = removed[i:i + batch_size]
+            coll_summary.delete_many({"_id": {"$in": chunk}})
+            coll_players.delete_many({"match_id": {"$in": chunk}})
+            coll_enemies.delete_many({"match_id": {"$in": chunk}})
+        for i in range(0, len(added), batch_size):
+            chunk = added[i:i + batch_size]
+            coll_players.delete_many({"match_id": {"$in": chunk}})
+            coll_enemies.delete_many({"match_id": {"$in": chunk}})
     
-        cursor = coll_src.find(
-            {},
+        cursor = iter_source(
+            coll_src,
             {
                 "_id": 1,
                 "data": 1,
@@ -98,11 +171,13 @@ def build_l2_from_l1(l1_name):
                 "min_friends": 1,
                 "pool_version": 1,
             },
+            added, whole, batch_size,
         )
     
         total_matches = 0
         total_players = 0
         total_enemies = 0
+        summary_buf, players_buf, enemies_buf = [], [], []
     
         for doc in cursor:
             total_matches += 1
@@ -122,6 +197,7 @@ def build_l2_from_l1(l1_name):
             min_friends = doc.get("min_friends")
             pool_version = doc.get("pool_version")
             friends_present = doc.get("friends_present", [])
+            friends_set = set(friends_present)
     
             summary_doc = {
                 "_id": match_id,
@@ -134,10 +210,10 @@ def build_l2_from_l1(l1_name):
                 "personas_present": doc.get("personas_present", []),
                 "gameStartTimestamp": game_start,
                 "gameEndTimestamp": game_end,
-                "filtered_at": now_utc(),
+                "filtered_at": run_at,
             }
     
-            coll_summary.insert_one(summary_doc)
+            summary_buf.append(summary_doc)
     
             for p in participants:
                 puuid = p.get("puuid")
@@ -163,16 +239,26 @@ def build_l2_from_l1(l1_name):
                     "pool_version": pool_version,
                     "gameStartTimestamp": game_start,
                     "gameEndTimestamp": game_end,
-                    "filtered_at": now_utc(),
+                    "filtered_at": run_at,
                 }
     
-                if puuid in friends_present:
-                    coll_players.insert_one(base_doc)
+                if puuid in friends_set:
+                    players_buf.append(base_doc)
                     total_players += 1
                 else:
-                    coll_enemies.insert_one(base_doc)
+                    enemies_buf.append(base_doc)
                     total_enemies += 1
 
+            # Summary se escribe al final: su presencia marca la partida como completa en L2
+            if len(players_buf) >= batch_size or len(enemies_buf) >= batch_size:
+                flush_batch(coll_players, players_buf)
+                flush_batch(coll_enemies, enemies_buf)
+                flush_batch(coll_summary, summary_buf)
+
+        flush_batch(coll_players, players_buf)
+        flush_batch(coll_enemies, enemies_buf)
+        flush_batch(coll_summary, summary_buf)
+
     print(f"[DONE] matches={total_matches}, players={total_players}, enemies={total_enemies}")
 
 
@@ -182,6 +268,9 @@ def main():
     parser.add_argument("--min", type=int, help="min friends filter")
     parser.add_argument("--pool", type=str, default=None, help="pool ID (8 chars del hash). Si no se indica, se auto-calcula desde L0_users_index.")
     parser.add_argument("--users-collection", type=str, default="L0_users_index", help="Users collection (for compatibility)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Docs per insert_many call")
+    parser.add_argument("--full", action="store_true", help="Drop and rebuild the L2 collections instead of applying the L1 diff "
+                             "(the diff re-emits matches whose friends/personas changed in L1)")
     args = parser.parse_args()
 
 
@@ -196,7 +285,7 @@ def main():
 
     print(f"[AUTO] selected: {l1_name}")
 
-    build_l2_from_l1(l1_name)
+    build_l2_from_l1(l1_name, args.batch_size, args.full)
 
 
 if __name__ == "__main__":
@@ -9,12 +9,24 @@ Uso:
     python load/populate_pg.py                      # auto-detecta pool de L0_users_index
     python load/populate_pg.py --pool ca879f16      # pool específica
     python load/populate_pg.py --pool season        # pool season
+    python load/populate_pg.py --workers 0          # carga particionada con todos los núcleos
+    python load/populate_pg.py --loader values      # INSERT multi-fila si COPY no está permitido
+    python load/populate_pg.py --incremental        # solo partidas que faltan en PostgreSQL
+    python load/populate_pg.py --pipeline 2         # lectura/transformación/escritura solapadas
+    python load/populate_pg.py --min 1 --all-mins   # una carga de L1 min1 registra las pools min 1..5
+    python load/populate_pg.py --swap               # recarga en tablas shadow + swap atómico
+    python load/populate_pg.py --from-raw           # sin L1: filtra L0_all_raw_matches en memoria
+    python load/populate_pg.py --pools ca879f16 season   # un solo escaneo raw para varias pools
+    python load/populate_pg.py --no-refresh         # sin refrescar las vistas metric_* al final
 """
 
+import re
 import sys
 import argparse
 import datetime
 from pathlib import Path
+from typing import NamedTuple
+from concurrent.futures import ThreadPoolExecutor
 
 sys.stdout.reconfigure(encoding='utf-8')
 
@@ -24,18 +36,33 @@ if str(SRC_DIR) not in sys.path:
     sys.path.insert(0, str(SRC_DIR))
 
 import psycopg2
-import psycopg2.extras
 
 from utils.config import (
-    MONGO_DB, COLLECTION_USERS_INDEX,
-    QUEUE_FLEX, MIN_FRIENDS_IN_MATCH, POSTGRES_URI
+    MONGO_DB, COLLECTION_USERS_INDEX, COLLECTION_USERS_INDEX_SEASON, COLLECTION_RAW_MATCHES,
+    QUEUE_FLEX, MIN_FRIENDS_IN_MATCH, MAX_MIN_FRIENDS, SEASON_START_TS, POSTGRES_URI
 )
 from utils.db import get_mongo_client
-from utils.pool_manager import build_pool_version
+from utils.pool_manager import (
+    build_pool_version, get_registered_pool, PoolAccounts, make_pool_accounts, load_users_accounts,
+)
+from utils.partitioned_scan import run_partitioned, resolve_workers
+from utils.friend_index import raw_match_query, friends_in_match
+from utils.pg_loaders import TableTarget, LOADERS
+from utils.pp_columns import PP_COLUMNS_NAMES, compile_extractor
+from utils.team_columns import TEAM_COLUMNS_NAMES, TEAM_TOTALS, team_extractor
+from utils.migrations import check_schema
+from utils.metric_views import refresh_metric_views
+from utils.metric_aggregates import (
+    apply_metric_deltas, reset_pool_aggregates, rebuild_pool_aggregates, _in_transaction,
+)
+from utils.stage_pipeline import run_pipeline
 
 # psycopg2 necesita DSN sin el prefijo SQLAlchemy
 _PG_DSN = POSTGRES_URI.replace("postgresql+psycopg2://", "postgresql://")
 
+DEFAULT_LOADER = "copy"
+FLUSH_MATCHES = 500
+
 
 def now_utc():
     return datetime.datetime.now(datetime.timezone.utc)
@@ -54,24 +81,30 @@ def ts_ms_to_dt(ts_ms: int | None):
 # POOL helpers
 # =============================================================
 
-def resolve_pool(mongo_db, pool_arg: str | None, queue_id: int, min_friends: int) -> tuple[str, str]:
-    """Devuelve (pool_id_str, l1_collection_name)."""
+def resolve_pool(mongo_db, pool_arg: str | None, queue_id: int, min_friends: int,
+                 use_registry: bool = True) -> tuple[str, str]:
+    """
+    Devuelve (pool_id_str, l1_collection_name).
+    Sin `use_registry` (modo raw, que no pasa por build_L1_filtered) la pool auto se
+    calcula siempre desde L0_users_index.
+    """
     if pool_arg:
         pool_id = pool_arg
         l1_name = f"L1_q{queue_id}_min{min_friends}_pool_{pool_id}"
         return pool_id, l1_name
 
-    # Auto-calcular desde L0_users_index
-    personas = set()
-    for doc in mongo_db[COLLECTION_USERS_INDEX].find({}, {"persona": 1}):
-        p = doc.get("persona")
-        if p:
-            personas.add(p)
+    # Pool registrada por build_L1_filtered
+    entry = get_registered_pool(mongo_db) if use_registry else None
+    if entry:
+        return entry["pool_id"], f"L1_q{queue_id}_min{min_friends}_{entry['_id']}"
+
+    # Auto-calcular desde L0_users_index (la lectura queda cacheada para pool_accounts)
+    personas = load_users_accounts(mongo_db, COLLECTION_USERS_INDEX).personas
 
     if not personas:
         raise RuntimeError("No se encontraron personas en L0_users_index")
 
-    pool_version = build_pool_version(sorted(list(personas)))  # 'pool_ca879f16'
+    pool_version = build_pool_version(list(personas))  # 'pool_ca879f16'
     pool_id = pool_version.replace("pool_", "")
     l1_name = f"L1_q{queue_id}_min{min_friends}_{pool_version}"
     return pool_id, l1_name
@@ -95,257 +128,844 @@ def ensure_pool(pg_conn, pool_id: str, personas: list[str], queue_id: int, min_f
         """, (pool_id, min_friends, personas, queue_id))
 
 
-MATCH_UPSERT = """
-    INSERT INTO matches (
-        match_id, pool_id, queue_id, min_friends,
-        duration_s, game_start_ts, game_start_at, game_end_at,
-        friends_present, personas_present, winning_team, filtered_at
-    ) VALUES (
-        %(match_id)s, %(pool_id)s, %(queue_id)s, %(min_friends)s,
-        %(duration_s)s, %(game_start_ts)s, %(game_start_at)s, %(game_end_at)s,
-        %(friends_present)s, %(personas_present)s, %(winning_team)s, %(filtered_at)s
-    )
-    ON CONFLICT (match_id, pool_id) DO UPDATE SET
-        friends_present  = EXCLUDED.friends_present,
-        personas_present = EXCLUDED.personas_present,
-        winning_team     = EXCLUDED.winning_team,
-        filtered_at      = EXCLUDED.filtered_at
-"""
+MATCHES_TARGET = TableTarget(
+    table="matches",
+    columns=(
+        "match_id", "pool_id", "queue_id", "min_friends",
+        "duration_s", "game_start_ts", "game_start_at", "game_end_at",
+        "friends_present", "personas_present", "winning_team", "filtered_at",
+        "friends_count", "friends_team_id", "group_win",
+    ),
+    conflict=("match_id", "pool_id"),
+    updates=("friends_present", "personas_present", "winning_team", "filtered_at",
+             "friends_count", "friends_team_id", "group_win"),
+)
 
-PP_UPSERT = """
-    INSERT INTO player_performances (
-        match_id, puuid, persona, is_friend,
-        champion_name, team_id, win, lane, role,
-        kills, deaths, assists, gold_earned,
-        damage_dealt, damage_taken, vision_score,
-        damage_mitigated, cs_total, riot_id_name, game_ended_surrender,
-        pool_id, queue_id, game_start_at, duration_s,
-        friends_count,
-        first_blood_kill, first_blood_assist, longest_time_spent_living,
-        takedowns_first_x_minutes, gold_per_minute, damage_per_minute,
-        vision_score_per_minute, lane_minions_first_10_minutes,
-        spell1_casts, spell2_casts, spell3_casts, spell4_casts
-    ) VALUES (
-        %(match_id)s, %(puuid)s, %(persona)s, %(is_friend)s,
-        %(champion_name)s, %(team_id)s, %(win)s, %(lane)s, %(role)s,
-        %(kills)s, %(deaths)s, %(assists)s, %(gold_earned)s,
-        %(damage_dealt)s, %(damage_taken)s, %(vision_score)s,
-        %(damage_mitigated)s, %(cs_total)s, %(riot_id_name)s, %(game_ended_surrender)s,
-        %(pool_id)s, %(queue_id)s, %(game_start_at)s, %(duration_s)s,
-        %(friends_count)s,
-        %(first_blood_kill)s, %(first_blood_assist)s, %(longest_time_spent_living)s,
-        %(takedowns_first_x_minutes)s, %(gold_per_minute)s, %(damage_per_minute)s,
-        %(vision_score_per_minute)s, %(lane_minions_first_10_minutes)s,
-        %(spell1_casts)s, %(spell2_casts)s, %(spell3_casts)s, %(spell4_casts)s
-    )
-    ON CONFLICT (match_id, pool_id, puuid) DO UPDATE SET
-        persona = EXCLUDED.persona,
-        is_friend = EXCLUDED.is_friend,
-        win = EXCLUDED.win,
-        friends_count = EXCLUDED.friends_count,
-        riot_id_name = EXCLUDED.riot_id_name,
-        role = EXCLUDED.role,
-        lane = EXCLUDED.lane
-"""
+PP_TARGET = TableTarget(
+    table="player_performances",
+    columns=PP_COLUMNS_NAMES,
+    conflict=("match_id", "pool_id", "puuid"),
+    updates=("persona", "is_friend", "win", "friends_count", "riot_id_name", "role", "lane"),
+)
+
+TEAM_TARGET = TableTarget(
+    table="team_performances",
+    columns=TEAM_COLUMNS_NAMES,
+    conflict=("match_id", "pool_id", "team_id"),
+    updates=tuple(c for c in TEAM_COLUMNS_NAMES if c not in ("match_id", "pool_id", "team_id")),
+)
+
+# Orden de las filas que devuelve build_rows
+LIVE_TARGETS = (MATCHES_TARGET, PP_TARGET, TEAM_TARGET)
 
 
 # =============================================================
-# ETL MAIN
+# TRANSFORM
 # =============================================================
 
-def populate(pool_id: str, l1_name: str, queue_id: int, min_friends: int,
-             mongo_db, pg_conn, users_collection: str = "L0_users_index"):
-
-    print(f"[ETL] pool={pool_id} | l1={l1_name}")
+L1_PROJECTION = {
+    "_id": 1, "data": 1, "friends_present": 1, "personas_present": 1,
+    "queue": 1, "min_friends": 1, "pool_version": 1,
+}
+
+RAW_PROJECTION = {"_id": 1, "data": 1}
+
+# Filas como tuplas, generadas desde utils/pp_columns y utils/team_columns
+extract_pp_row = compile_extractor()
+extract_team_row = team_extractor()
+
+
+def build_rows(doc: dict, pool_id: str, queue_id: int, min_friends: int,
+               accounts: PoolAccounts, filtered_at) -> tuple[tuple, list[tuple], list[tuple]]:
+    """
+    Transforma un documento L1 en (fila de matches, filas de player_performances,
+    filas de team_performances), como tuplas en el orden de columnas de LIVE_TARGETS.
+
+    Los amigos son los `friends_present` del documento, los mismos que cuenta
+    friends_count: en modo L1 vienen del filtrado de esa colección y en modo raw de
+    raw_to_l1 con `accounts`. `accounts` solo da la persona de cada amigo.
+    """
+    match_id = doc["_id"]
+    data = doc.get("data", {})
+    info = data.get("info", {})
+    participants = info.get("participants", [])
+    teams = info.get("teams", [])
+
+    game_start_ts = info.get("gameStartTimestamp")
+    game_end_ts = info.get("gameEndTimestamp")
+    duration_s = info.get("gameDuration")
+    friends_present = doc.get("friends_present", [])
+    friend_puuids = set(friends_present)
+    game_start_dt = ts_ms_to_dt(game_start_ts)
+
+    # winning team
+    winning_team = None
+    for t in teams:
+        if t.get("win"):
+            winning_team = t.get("teamId")
+            break
+
+    # Contexto común a las filas de la partida (columnas "match.*" de pp_columns)
+    ctx = {
+        "match_id": match_id,
+        "pool_id": pool_id,
+        "queue_id": queue_id,
+        "game_start_at": game_start_dt,
+        "duration_s": duration_s,
+        "friends_count": len(friends_present),
+    }
+
+    # Track personas already inserted for this match (multi-cuenta dedup)
+    personas_in_match: set = set()
+    pp_rows = []
+    # Totales por equipo sobre sus 5 participantes (antes del dedup multi-cuenta)
+    team_totals: dict[int, dict] = {}
+
+    for p in participants:
+        puuid = p.get("puuid")
+        is_friend = puuid in friend_puuids
+        persona = accounts.puuid_to_persona.get(puuid) if is_friend else None
+        cs_total = (p.get("totalMinionsKilled") or 0) + (p.get("neutralMinionsKilled") or 0)
+
+        team_id = p.get("teamId")
+        if team_id is not None:
+            totals = team_totals.get(team_id)
+            if totals is None:
+                totals = team_totals[team_id] = dict.fromkeys(TEAM_TOTALS, 0)
+                totals["cs_total"] = 0
+                totals["friends_on_team"] = 0
+            for col, key in TEAM_TOTALS.items():
+                totals[col] += p.get(key) or 0
+            totals["cs_total"] += cs_total
+            totals["friends_on_team"] += is_friend
+
+        # Skip if we already have a row for this persona in this match
+        if persona is not None:
+            if persona in personas_in_match:
+                continue
+            personas_in_match.add(persona)
+
+        # Riot ID Name (GameName#TagLine)
+        game_name = p.get("riotIdGameName")
+        if game_name and p.get("riotIdTagLine"):
+            riot_id_name = f"{game_name}#{p['riotIdTagLine']}"
+        elif game_name:
+            riot_id_name = game_name
+        else:
+            riot_id_name = p.get("summonerName") or "Unknown"
+
+        pp_rows.append(extract_pp_row(
+            p, ctx,
+            persona=persona,
+            is_friend=is_friend,
+            # Uso de teamPosition prioritario sobre role (MatchV5)
+            role=p.get("teamPosition") or p.get("role"),
+            cs_total=cs_total,
+            riot_id_name=riot_id_name,
+            game_ended_surrender=p.get("gameEndedInSurrender", False) or p.get("gameEndedInEarlySurrender", False),
+        ))
+
+    # Lado de los amigos: el equipo con más amigos (empate → menor team_id)
+    friends_team = None
+    ranked = sorted(team_totals.items(), key=lambda kv: (-kv[1]["friends_on_team"], kv[0]))
+    if ranked and ranked[0][1]["friends_on_team"] > 0:
+        friends_team = ranked[0][0]
+
+    # group_win: el mismo valor que team_performances.win del equipo de amigos (NULL sin él)
+    team_rows = []
+    group_win = None
+    for t in teams:
+        if t.get("teamId") == friends_team:
+            group_win = t.get("win")
+        totals = team_totals.get(t.get("teamId"))
+        if totals is not None:
+            team_rows.append(extract_team_row(t, ctx, is_friends_team=t.get("teamId") == friends_team, **totals))
+
+    match_row = (
+        match_id,
+        pool_id,
+        doc.get("queue", queue_id),
+        doc.get("min_friends", min_friends),
+        duration_s,
+        game_start_ts,
+        game_start_dt,
+        ts_ms_to_dt(game_end_ts),
+        friends_present,
+        doc.get("personas_present", []),
+        winning_team,
+        filtered_at,
+        len(friends_present),
+        friends_team,
+        group_win,
+    )
 
-    if l1_name not in mongo_db.list_collection_names():
-        print(f"[ETL] ⚠️  L1 collection {l1_name} no existe en MongoDB, saltando.")
-        return
+    return match_row, pp_rows, team_rows
 
-    # Mapa puuid → persona
-    puuid_to_persona: dict[str, str] = {}
-    for doc in mongo_db[users_collection].find({}, {"persona": 1, "puuids": 1}):
-        for p in doc.get("puuids", []):
-            puuid_to_persona[p] = doc["persona"]
 
-    personas_list = list(set(puuid_to_persona.values()))
-    ensure_pool(pg_conn, pool_id, personas_list, queue_id, min_friends)
+def flush_rows(pg_conn, match_rows: list[tuple], pp_rows: list[tuple], team_rows: list[tuple],
+               loader: str = DEFAULT_LOADER,
+               targets: tuple[TableTarget, TableTarget, TableTarget] = LIVE_TARGETS):
+    if not match_rows:
+        return
+    load = LOADERS[loader]
+    matches_target, pp_target, team_target = targets
+    with pg_conn.cursor() as cur:
+        load(cur, matches_target, match_rows)
+        load(cur, pp_target, pp_rows)
+        load(cur, team_target, team_rows)
     pg_conn.commit()
 
-    coll = mongo_db[l1_name]
+
+def load_cursor(cursor, pg_conn, pool_id: str, queue_id: int, min_friends: int,
+                accounts: PoolAccounts, filtered_at,
+                loader: str = DEFAULT_LOADER, targets=LIVE_TARGETS) -> tuple[int, int]:
+    """Consume un cursor L1 y lo vuelca en PostgreSQL por lotes. Devuelve (partidas, filas pp)."""
     total_matches = 0
     total_pp = 0
     match_rows = []
     pp_rows = []
-
-    cursor = coll.find({}, {
-        "_id": 1, "data": 1, "friends_present": 1, "personas_present": 1,
-        "queue": 1, "min_friends": 1, "pool_version": 1,
-    })
+    team_rows = []
 
     for doc in cursor:
-        match_id = doc["_id"]
-        data = doc.get("data", {})
-        info = data.get("info", {})
-        participants = info.get("participants", [])
-        teams = info.get("teams", [])
-
-        game_start_ts = info.get("gameStartTimestamp")
-        game_end_ts = info.get("gameEndTimestamp")
-        duration_s = info.get("gameDuration")
-        friends_present = doc.get("friends_present", [])
-
-        # winning team
-        winning_team = None
-        for t in teams:
-            if t.get("win"):
-                winning_team = t.get("teamId")
-                break
-
-        match_rows.append({
-            "match_id": match_id,
-            "pool_id": pool_id,
-            "queue_id": doc.get("queue", queue_id),
-            "min_friends": doc.get("min_friends", min_friends),
-            "duration_s": duration_s,
-            "game_start_ts": game_start_ts,
-            "game_start_at": ts_ms_to_dt(game_start_ts),
-            "game_end_at": ts_ms_to_dt(game_end_ts),
-            "friends_present": friends_present,
-            "personas_present": doc.get("personas_present", []),
-            "winning_team": winning_team,
-            "filtered_at": now_utc(),
-        })
+        match_row, rows, teams = build_rows(doc, pool_id, queue_id, min_friends, accounts, filtered_at)
+        match_rows.append(match_row)
+        pp_rows.extend(rows)
+        team_rows.extend(teams)
         total_matches += 1
-
-        game_start_dt = ts_ms_to_dt(game_start_ts)
-        # Track personas already inserted for this match (multi-cuenta dedup)
-        personas_in_match: set = set()
-
-        for p in participants:
-            puuid = p.get("puuid")
-            is_friend = puuid in friends_present
-            persona = puuid_to_persona.get(puuid) if is_friend else None
-
-            # Riot ID Name (GameName#TagLine)
-            # Name resolution
-            if p.get("riotIdGameName") and p.get("riotIdTagLine"):
-                riot_id_name = f"{p['riotIdGameName']}#{p['riotIdTagLine']}"
-            elif p.get("riotIdGameName"):
-                riot_id_name = p["riotIdGameName"]
-            else:
-                riot_id_name = p.get("summonerName") or "Unknown"
-
-            # Skip if we already have a row for this persona in this match
-            if persona is not None and persona in personas_in_match:
-                continue
-            if persona is not None:
-                personas_in_match.add(persona)
-
-            cs = (p.get("totalMinionsKilled") or 0) + (p.get("neutralMinionsKilled") or 0)
-            surrender = p.get("gameEndedInSurrender", False) or p.get("gameEndedInEarlySurrender", False)
-            
-            challenges = p.get("challenges", {})
-
-            pp_rows.append({
-                "match_id": match_id,
-                "puuid": puuid,
-                "persona": persona,
-                "is_friend": is_friend,
-                "champion_name": p.get("championName"),
-                "team_id": p.get("teamId"),
-                "win": p.get("win"),
-                "lane": p.get("lane"),
-                # Uso de teamPosition prioritario sobre role (MatchV5)
-                "role": p.get("teamPosition") or p.get("role"),
-                "kills": p.get("kills"),
-                "deaths": p.get("deaths"),
-                "assists": p.get("assists"),
-                "gold_earned": p.get("goldEarned"),
-                "damage_dealt": p.get("totalDamageDealtToChampions"),
-                "damage_taken": p.get("totalDamageTaken"),
-                "vision_score": p.get("visionScore"),
-                "damage_mitigated": p.get("damageSelfMitigated"),
-                "cs_total": cs,
-                "riot_id_name": riot_id_name,
-                "game_ended_surrender": surrender,
-                "pool_id": pool_id,
-                "queue_id": queue_id,
-                "game_start_at": game_start_dt,
-                "duration_s": duration_s,
-                "friends_count": len(friends_present),
-                "first_blood_kill": p.get("firstBloodKill", False),
-                "first_blood_assist": p.get("firstBloodAssist", False),
-                "longest_time_spent_living": p.get("longestTimeSpentLiving", 0),
-                "takedowns_first_x_minutes": challenges.get("takedownsFirstXMinutes", 0),
-                "gold_per_minute": challenges.get("goldPerMinute", 0),
-                "damage_per_minute": challenges.get("damagePerMinute", 0),
-                "vision_score_per_minute": challenges.get("visionScorePerMinute", 0),
-                "lane_minions_first_10_minutes": challenges.get("laneMinionsFirst10Minutes", 0),
-                "spell1_casts": p.get("spell1Casts", 0),
-                "spell2_casts": p.get("spell2Casts", 0),
-                "spell3_casts": p.get("spell3Casts", 0),
-                "spell4_casts": p.get("spell4Casts", 0),
-            })
-            total_pp += 1
+        total_pp += len(rows)
 
         # Flush in batches
-        if len(match_rows) >= 500:
-            with pg_conn.cursor() as cur:
-                psycopg2.extras.execute_batch(cur, MATCH_UPSERT, match_rows, page_size=500)
-                psycopg2.extras.execute_batch(cur, PP_UPSERT, pp_rows, page_size=500)
-            pg_conn.commit()
+        if len(match_rows) >= FLUSH_MATCHES:
+            flush_rows(pg_conn, match_rows, pp_rows, team_rows, loader, targets)
             match_rows.clear()
             pp_rows.clear()
+            team_rows.clear()
 
     # Final flush
-    if match_rows:
+    flush_rows(pg_conn, match_rows, pp_rows, team_rows, loader, targets)
+    return total_matches, total_pp
+
+
+def load_cursor_pipelined(cursor, pg_conn, pool_id: str, queue_id: int, min_friends: int,
+                          accounts: PoolAccounts, filtered_at,
+                          loader: str = DEFAULT_LOADER, transform_workers: int = 1,
+                          targets=LIVE_TARGETS) -> tuple[int, int]:
+    """
+    Igual que load_cursor, pero lectura Mongo, transformación y escritura PG van en
+    hilos distintos (utils.stage_pipeline), así la espera de red de ambos lados se solapa.
+    """
+    totals = [0, 0]
+
+    def transform(docs):
+        match_rows, pp_rows, team_rows = [], [], []
+        for doc in docs:
+            match_row, rows, teams = build_rows(doc, pool_id, queue_id, min_friends, accounts, filtered_at)
+            match_rows.append(match_row)
+            pp_rows.extend(rows)
+            team_rows.extend(teams)
+        return match_rows, pp_rows, team_rows
+
+    def write(batch):
+        match_rows, pp_rows, team_rows = batch
+        flush_rows(pg_conn, match_rows, pp_rows, team_rows, loader, targets)
+        totals[0] += len(match_rows)
+        totals[1] += len(pp_rows)
+
+    run_pipeline(cursor, transform, write, batch_size=FLUSH_MATCHES,
+                 transform_workers=transform_workers)
+    return totals[0], totals[1]
+
+
+def raw_to_l1(doc: dict, accounts: PoolAccounts, queue_id: int, min_friends: int) -> dict | None:
+    """
+    Aplica a una partida raw el filtro de build_L1_filtered. Devuelve un documento con la
+    forma de L1 (los campos que lee build_rows), o None si no tiene bastantes amigos.
+    """
+    data = doc.get("data", {})
+    friends_present, personas_present = friends_in_match(data, accounts.friend_puuids,
+                                                         accounts.puuid_to_persona)
+    if len(friends_present) < min_friends:
+        return None
+    return {
+        "_id": doc["_id"],
+        "queue": queue_id,
+        "min_friends": min_friends,
+        "friends_present": friends_present,
+        "personas_present": personas_present,
+        "data": data,
+    }
+
+
+def filter_raw(cursor, accounts: PoolAccounts, queue_id: int, min_friends: int,
+               skip: frozenset = frozenset()):
+    """Filtro L1 en memoria sobre un cursor raw, sin escribir nada en Mongo. Omite los `_id` de `skip`."""
+    for doc in cursor:
+        if doc["_id"] in skip:
+            continue
+        l1_doc = raw_to_l1(doc, accounts, queue_id, min_friends)
+        if l1_doc is not None:
+            yield l1_doc
+
+
+def populate_partition(query: dict, l1_name: str, pool_id: str, queue_id: int, min_friends: int,
+                       accounts: PoolAccounts, filtered_at,
+                       loader: str = DEFAULT_LOADER, pipeline: int = 0,
+                       targets=LIVE_TARGETS, from_raw: bool = False,
+                       skip: frozenset = frozenset()) -> tuple[int, int]:
+    """
+    Worker de run_partitioned: carga un rango de `_id` de L1 con conexiones propias.
+    `pipeline` > 0 usa lectura/transformación/escritura en hilos con ese número de transformadores.
+    `targets` son las tablas destino (las live, o las shadow de una recarga con swap).
+    Con `from_raw`, el rango es de L0_all_raw_matches y el filtro L1 se aplica en memoria,
+    omitiendo las partidas de `skip` (ya cargadas, --incremental).
+    """
+    pg_conn = psycopg2.connect(_PG_DSN)
+    try:
+        with get_mongo_client() as mongo_client:
+            if from_raw:
+                cursor = filter_raw(mongo_client[MONGO_DB][COLLECTION_RAW_MATCHES].find(query, RAW_PROJECTION),
+                                    accounts, queue_id, min_friends, skip)
+            else:
+                cursor = mongo_client[MONGO_DB][l1_name].find(query, L1_PROJECTION)
+            if pipeline:
+                return load_cursor_pipelined(cursor, pg_conn, pool_id, queue_id, min_friends,
+                                             accounts, filtered_at, loader, pipeline, targets)
+            return load_cursor(cursor, pg_conn, pool_id, queue_id, min_friends,
+                               accounts, filtered_at, loader, targets)
+    finally:
+        pg_conn.close()
+
+
+# =============================================================
+# VARIAS POOLS en un solo escaneo raw
+# =============================================================
+
+class PoolLoad(NamedTuple):
+    """Una pool dentro de un escaneo compartido (ver populate_pools)."""
+    pool_id: str
+    accounts: PoolAccounts
+    since_ts: int | None                # inicio mínimo (pool season), None = sin límite
+    targets: tuple                      # LIVE_TARGETS o las shadow de la pool
+    skip: frozenset = frozenset()       # match_ids ya cargados (--incremental)
+
+
+def populate_pools_partition(query: dict, loads: list[PoolLoad], queue_id: int, min_friends: int,
+                             filtered_at, loader: str = DEFAULT_LOADER,
+                             transform_workers: int = 1) -> dict[str, tuple[int, int]]:
+    """
+    Worker de run_partitioned para populate_pools: lee un rango de `_id` de raw una vez y
+    enruta cada partida a todas las pools en las que pasa el filtro L1. Cada pool escribe
+    por su propia conexión PG; las escrituras de un lote van en paralelo (un hilo por pool).
+    Devuelve {pool_id: (partidas, filas pp)}.
+    """
+    totals = {l.pool_id: [0, 0] for l in loads}
+    conns = {l.pool_id: psycopg2.connect(_PG_DSN) for l in loads}
+
+    def transform(docs):
+        out = {l.pool_id: ([], [], []) for l in loads}
+        for doc in docs:
+            start_ts = doc.get("data", {}).get("info", {}).get("gameStartTimestamp") or 0
+            for l in loads:
+                if doc["_id"] in l.skip or (l.since_ts is not None and start_ts < l.since_ts):
+                    continue
+                l1_doc = raw_to_l1(doc, l.accounts, queue_id, min_friends)
+                if l1_doc is None:
+                    continue
+                match_rows, pp_rows, team_rows = out[l.pool_id]
+                match_row, rows, teams = build_rows(l1_doc, l.pool_id, queue_id, min_friends,
+                                                    l.accounts, filtered_at)
+                match_rows.append(match_row)
+                pp_rows.extend(rows)
+                team_rows.extend(teams)
+        return out
+
+    def write_pool(load: PoolLoad, rows):
+        match_rows, pp_rows, team_rows = rows
+        flush_rows(conns[load.pool_id], match_rows, pp_rows, team_rows, loader, load.targets)
+        totals[load.pool_id][0] += len(match_rows)
+        totals[load.pool_id][1] += len(pp_rows)
+
+    try:
+        with get_mongo_client() as mongo_client, ThreadPoolExecutor(max_workers=len(loads)) as writers:
+            cursor = mongo_client[MONGO_DB][COLLECTION_RAW_MATCHES].find(query, RAW_PROJECTION)
+
+            def write(batch):
+                for f in [writers.submit(write_pool, l, batch[l.pool_id]) for l in loads]:
+                    f.result()
+
+            run_pipeline(cursor, transform, write, batch_size=FLUSH_MATCHES,
+                         transform_workers=transform_workers)
+    finally:
+        for conn in conns.values():
+            conn.close()
+    return {pool_id: tuple(t) for pool_id, t in totals.items()}
+
+
+# =============================================================
+# PARTICIONES de player_performances (LIST por pool_id)
+# =============================================================
+
+def _table_suffix(pool_id: str) -> str:
+    return re.sub(r"[^a-z0-9_]", "_", pool_id.lower())
+
+
+def pp_partition(pool_id: str) -> str:
+    return f"player_performances_{_table_suffix(pool_id)}"
+
+
+def _move_to_partition(cur, pool_id: str, name: str):
+    cur.execute("SELECT to_regclass(%s)", (name,))
+    if cur.fetchone()[0] is None:
+        print(f"[ETL] Creando partición {name}")
+        cur.execute(f"CREATE TABLE {name} (LIKE player_performances INCLUDING DEFAULTS)")
+    else:
+        print(f"[ETL] Adjuntando partición {name} (creada por una ejecución anterior sin ATTACH)")
+    cur.execute(f"INSERT INTO {name} SELECT * FROM player_performances_default WHERE pool_id = %s",
+                (pool_id,))
+    cur.execute("DELETE FROM player_performances_default WHERE pool_id = %s", (pool_id,))
+    cur.execute(f"ALTER TABLE player_performances ATTACH PARTITION {name} FOR VALUES IN (%s)",
+                (pool_id,))
+
+
+def ensure_pp_partition(pg_conn, pool_id: str):
+    """
+    Crea la partición de la pool si no está adjunta. Las filas que hubiera en la partición
+    DEFAULT para esa pool (cargas anteriores a la partición) se mueven a la nueva, todo
+    en una transacción: el dashboard nunca ve la pool sin filas y un fallo no deja filas
+    en una tabla sin adjuntar. Una tabla suelta con ese nombre (de versiones anteriores,
+    que no lo hacían atómico) se reutiliza y se adjunta.
+    """
+    name = pp_partition(pool_id)
+    with pg_conn.cursor() as cur:
+        cur.execute("""
+            SELECT 1 FROM pg_inherits
+            WHERE inhrelid = to_regclass(%s) AND inhparent = 'player_performances'::regclass
+        """, (name,))
+        if cur.fetchone() is not None:
+            return
+    _in_transaction(pg_conn, _move_to_partition, pool_id, name)
+
+
+# =============================================================
+# SHADOW + SWAP (recarga sin estados intermedios visibles)
+# =============================================================
+
+def shadow_targets(pool_id: str) -> tuple[TableTarget, ...]:
+    """TableTargets equivalentes a LIVE_TARGETS sobre tablas shadow_<tabla>_<pool>."""
+    suffix = _table_suffix(pool_id)
+    return tuple(t._replace(table=f"shadow_{t.table}_{suffix}") for t in LIVE_TARGETS)
+
+
+def create_shadow(pg_conn, pool_id: str, shadows: tuple[TableTarget, ...]):
+    """
+    - matches / team_performances: tablas UNLOGGED con la estructura de la live y solo
+      el índice único del ON CONFLICT; en el swap sus filas se copian a la live.
+    - player_performances: futura partición de la pool, con los índices del padre y un
+      CHECK sobre pool_id para que el ATTACH del swap no tenga que escanearla.
+    Son tablas normales, no TEMP, para que los workers de --workers escriban en ellas.
+    """
+    matches_shadow, pp_shadow, team_shadow = shadows
+    with pg_conn.cursor() as cur:
+        for shadow in shadows:
+            cur.execute(f"DROP TABLE IF EXISTS {shadow.table}")
+        for live, shadow in ((MATCHES_TARGET, matches_shadow), (TEAM_TARGET, team_shadow)):
+            cur.execute(f"CREATE UNLOGGED TABLE {shadow.table} (LIKE {live.table} INCLUDING DEFAULTS)")
+            cur.execute(f"CREATE UNIQUE INDEX ON {shadow.table} ({', '.join(shadow.conflict)})")
+        cur.execute(f"CREATE TABLE {pp_shadow.table} "
+                    f"(LIKE player_performances INCLUDING DEFAULTS INCLUDING INDEXES)")
+        cur.execute(f"ALTER TABLE {pp_shadow.table} ADD CONSTRAINT {pp_shadow.table}_pool_check "
+                    f"CHECK (pool_id = %s)", (pool_id,))
+    pg_conn.commit()
+
+
+def drop_shadow(pg_conn, shadows: tuple[TableTarget, ...]):
+    with pg_conn.cursor() as cur:
+        for shadow in shadows:
+            cur.execute(f"DROP TABLE IF EXISTS {shadow.table}")
+    pg_conn.commit()
+
+
+def swap_shadow(pg_conn, pool_id: str, shadows: tuple[TableTarget, ...],
+                personas: list[str], queue_id: int, thresholds: list[int]):
+    """
+    Publica la recarga en UNA transacción, junto con las filas de `pools`:
+      - matches / team_performances: DELETE de la pool + INSERT desde la shadow.
+      - player_performances: DETACH + DROP de la partición antigua y ATTACH de la
+        shadow renombrada (solo metadatos, sin copiar filas).
+      - metric_agg_* / streaks: se borran los de la pool; las filas nuevas entran con
+        matches.aggregated = FALSE.
+    Las consultas del dashboard ven la pool anterior completa o la nueva completa; el
+    DETACH va al final para que esperen solo lo que dura el intercambio de metadatos.
+    El llamador recalcula después los agregados de la pool con apply_metric_deltas, en
+    su propia transacción (si se interrumpe, las partidas siguen pendientes).
+    """
+    matches_shadow, pp_shadow, team_shadow = shadows
+    live_part = pp_partition(pool_id)
+
+    autocommit = pg_conn.autocommit
+    pg_conn.autocommit = False
+    try:
         with pg_conn.cursor() as cur:
-            psycopg2.extras.execute_batch(cur, MATCH_UPSERT, match_rows, page_size=500)
-            psycopg2.extras.execute_batch(cur, PP_UPSERT, pp_rows, page_size=500)
+            for threshold in thresholds:
+                ensure_pool(pg_conn, pool_id, personas, queue_id, threshold)
+            reset_pool_aggregates(cur, pool_id)
+
+            for live, shadow in ((MATCHES_TARGET, matches_shadow), (TEAM_TARGET, team_shadow)):
+                cols = ", ".join(live.columns)
+                cur.execute(f"DELETE FROM {live.table} WHERE pool_id = %s", (pool_id,))
+                cur.execute(f"INSERT INTO {live.table} ({cols}) SELECT {cols} FROM {shadow.table}")
+                cur.execute(f"DROP TABLE {shadow.table}")
+
+            cur.execute("SELECT to_regclass(%s)", (live_part,))
+            if cur.fetchone()[0] is not None:
+                cur.execute(f"ALTER TABLE player_performances DETACH PARTITION {live_part}")
+                cur.execute(f"DROP TABLE {live_part}")
+            cur.execute("DELETE FROM player_performances_default WHERE pool_id = %s", (pool_id,))
+            cur.execute(f"ALTER TABLE {pp_shadow.table} RENAME TO {live_part}")
+            cur.execute(f"ALTER TABLE player_performances ATTACH PARTITION {live_part} FOR VALUES IN (%s)",
+                        (pool_id,))
+            cur.execute(f"ALTER TABLE {live_part} DROP CONSTRAINT {pp_shadow.table}_pool_check")
+        pg_conn.commit()
+    except Exception:
+        pg_conn.rollback()
+        raise
+    finally:
+        pg_conn.autocommit = autocommit
+
+
+def get_loaded_match_ids(pg_conn, pool_id: str) -> set[str]:
+    with pg_conn.cursor() as cur:
+        cur.execute("SELECT match_id FROM matches WHERE pool_id = %s", (pool_id,))
+        return {r[0] for r in cur.fetchall()}
+
+
+def missing_match_query(mongo_db, l1_name: str, pg_conn, pool_id: str) -> dict | None:
+    """
+    Query L1 restringida a las partidas que aún no están en PostgreSQL para la pool.
+    Compara solo los `_id` (proyección mínima); None si no falta ninguna.
+    """
+    loaded = get_loaded_match_ids(pg_conn, pool_id)
+    l1_ids = {d["_id"] for d in mongo_db[l1_name].find({}, {"_id": 1})}
+    missing = sorted(l1_ids - loaded)
+    print(f"[ETL] incremental: L1={len(l1_ids)} | en PG={len(loaded)} | nuevas={len(missing)}")
+    if not missing:
+        return None
+    return {"_id": {"$in": missing}}
+
+
+def missing_raw_query(query: dict, pg_conn, pool_id: str) -> tuple[dict, frozenset] | None:
+    """
+    Igual que missing_match_query para --from-raw: devuelve (query, skip). Con candidatos
+    del índice de amigos les resta lo ya cargado; si se escanea raw completo, la query no
+    cambia y lo ya cargado va en `skip`, que los workers descartan en memoria (como
+    PoolLoad.skip), en lugar de un $nin que crecería con la pool.
+    """
+    loaded = get_loaded_match_ids(pg_conn, pool_id)
+    if "_id" not in query:
+        print(f"[ETL] incremental: en PG={len(loaded)} (se omiten en el escaneo raw)")
+        return query, frozenset(loaded)
+    missing = sorted(set(query["_id"]["$in"]) - loaded)
+    print(f"[ETL] incremental: candidatas={len(query['_id']['$in'])} | en PG={len(loaded)} "
+          f"| nuevas={len(missing)}")
+    if not missing:
+        return None
+    return {**query, "_id": {"$in": missing}}, frozenset()
+
+
+# =============================================================
+# ETL MAIN
+# =============================================================
+
+def min_friends_thresholds(min_friends: int, all_mins: bool) -> list[int]:
+    return list(range(min_friends, max(min_friends, MAX_MIN_FRIENDS) + 1)) if all_mins else [min_friends]
+
+
+_POOL_ACCOUNTS: dict[tuple[str, str, bool], tuple[dict | None, PoolAccounts]] = {}
+
+
+def pool_accounts(mongo_db, pool_id: str, users_collection: str,
+                  use_registry: bool = True) -> tuple[dict | None, PoolAccounts]:
+    """
+    (entrada del registro o None, cuentas de la pool). Se calcula una vez por ejecución:
+    las demás pools y pasadas de la misma ejecución reutilizan el resultado.
+
+    El registro guarda las cuentas de la última build_L1_filtered; el modo raw no
+    reconstruye L1, así que pasa `use_registry=False` y lee las cuentas actuales de
+    `users_collection` (incluidas las añadidas después de esa build).
+    """
+    key = (pool_id, users_collection, use_registry)
+    if key not in _POOL_ACCOUNTS:
+        entry = get_registered_pool(mongo_db, pool_id) if use_registry else None
+        if entry and entry.get("users_collection") != users_collection:
+            entry = None
+        if entry:
+            accounts = make_pool_accounts({acc["puuid"]: acc["persona"] for acc in entry.get("accounts", [])})
+        else:
+            accounts = load_users_accounts(mongo_db, users_collection)
+        _POOL_ACCOUNTS[key] = (entry, accounts)
+    return _POOL_ACCOUNTS[key]
+
+
+def populate(pool_id: str, l1_name: str, queue_id: int, min_friends: int,
+             mongo_db, pg_conn, users_collection: str = "L0_users_index", workers: int = 1,
+             loader: str = DEFAULT_LOADER, incremental: bool = False, pipeline: int = 0,
+             all_mins: bool = False, swap: bool = False, from_raw: bool = False):
+    """
+    Carga `l1_name` en PostgreSQL bajo `pool_id`.
+
+    Con `from_raw` no se lee L1: se escanea L0_all_raw_matches (candidatos del índice de
+    amigos si lo cubre) y el filtro de build_L1_filtered se aplica en memoria, así que
+    no hace falta construir la colección L1 antes.
+
+    Con `swap`, la pool se recarga entera en tablas shadow y se intercambia con los
+    datos live en una sola transacción al final (ver swap_shadow). Sin `swap`, las
+    filas se confirman en las tablas live cada FLUSH_MATCHES partidas; si además no es
+    `incremental`, los agregados de la pool se recalculan enteros al terminar, en una
+    transacción (la recarga reescribe filas ya agregadas).
+
+    Con `all_mins`, la colección L1 de `min_friends` se trata como superconjunto:
+    se carga una vez y se registran en `pools` todos los umbrales min_friends..MAX_MIN_FRIENDS.
+    El dashboard filtra por `friends_count` (en matches y player_performances), así que
+    cada umbral ve exactamente las partidas que tendría su propia L1.
+    """
+    if swap and incremental:
+        raise ValueError("swap recarga la pool completa; no es compatible con incremental")
+    thresholds = min_friends_thresholds(min_friends, all_mins)
+
+    print(f"[ETL] pool={pool_id} | {'raw' if from_raw else f'l1={l1_name}'} | loader={loader} "
+          f"| incremental={incremental} | thresholds={thresholds} | swap={swap}")
+
+    entry, accounts = pool_accounts(mongo_db, pool_id, users_collection, use_registry=not from_raw)
+
+    if from_raw:
+        l1_exists = True
+    elif entry:
+        l1_exists = l1_name in entry.get("collections", [])
+    else:
+        l1_exists = l1_name in mongo_db.list_collection_names()
+    if not l1_exists:
+        print(f"[ETL] ⚠️  L1 collection {l1_name} no existe en MongoDB, saltando.")
+        return
+
+    if from_raw and not accounts.friend_puuids:
+        print(f"[ETL] ⚠️  {users_collection} no tiene cuentas para la pool {pool_id}, saltando.")
+        return
+
+    personas_list = list(accounts.personas)
+    if not swap:
+        for threshold in thresholds:
+            ensure_pool(pg_conn, pool_id, personas_list, queue_id, threshold)
         pg_conn.commit()
+        ensure_pp_partition(pg_conn, pool_id)
+
+    if from_raw:
+        source = mongo_db[COLLECTION_RAW_MATCHES]
+        since_ts = SEASON_START_TS if pool_id == "season" else None
+        query = raw_match_query(mongo_db, queue_id, min_friends, accounts.friend_puuids, since_ts)
+    else:
+        source = mongo_db[l1_name]
+        query = {}
+    skip = frozenset()
+    if incremental:
+        if from_raw:
+            missing = missing_raw_query(query, pg_conn, pool_id)
+            query, skip = missing or (None, skip)
+        else:
+            query = missing_match_query(mongo_db, l1_name, pg_conn, pool_id)
+        if query is None:
+            print("[ETL] ✅ Sin partidas nuevas")
+            return
+
+    targets = LIVE_TARGETS
+    if swap:
+        targets = shadow_targets(pool_id)
+        create_shadow(pg_conn, pool_id, targets)
+        print(f"[ETL] Cargando en {', '.join(t.table for t in targets)}")
+
+    try:
+        results = run_partitioned(
+            populate_partition, source, query, workers,
+            l1_name, pool_id, queue_id, min_friends, accounts, now_utc(), loader, pipeline,
+            targets, from_raw, skip,
+        )
+    except Exception:
+        if swap:
+            drop_shadow(pg_conn, targets)
+        raise
+    total_matches = sum(r[0] for r in results)
+    total_pp = sum(r[1] for r in results)
+
+    if swap:
+        swap_shadow(pg_conn, pool_id, targets, personas_list, queue_id, thresholds)
+        print(f"[ETL] 🔁 Pool {pool_id} intercambiada en una transacción")
+        apply_metric_deltas(pg_conn, pool_id)
+    elif not incremental:
+        rebuild_pool_aggregates(pg_conn, pool_id)
 
     print(f"[ETL] ✅ {total_matches} partidas | {total_pp} player_performances cargados")
 
 
+def populate_pools(pools: list[tuple[str, str]], queue_id: int, min_friends: int,
+                   mongo_db, pg_conn, workers: int = 1, loader: str = DEFAULT_LOADER,
+                   incremental: bool = False, pipeline: int = 0,
+                   all_mins: bool = False, swap: bool = False):
+    """
+    Carga varias pools [(pool_id, users_collection)] con UN escaneo de L0_all_raw_matches:
+    cada partida se enruta a todas las pools en las que pasa el filtro L1 (ver
+    populate_pools_partition). Mismo significado de `incremental`, `all_mins` y `swap`
+    que en populate, aplicado a cada pool.
+    """
+    if swap and incremental:
+        raise ValueError("swap recarga la pool completa; no es compatible con incremental")
+    thresholds = min_friends_thresholds(min_friends, all_mins)
+
+    loads: list[PoolLoad] = []
+    personas: dict[str, list[str]] = {}
+    for pool_id, users_collection in pools:
+        _, accounts = pool_accounts(mongo_db, pool_id, users_collection, use_registry=False)
+        if not accounts.friend_puuids:
+            print(f"[ETL] ⚠️  {users_collection} no tiene cuentas para la pool {pool_id}, saltando.")
+            continue
+        personas[pool_id] = list(accounts.personas)
+
+        targets = LIVE_TARGETS
+        if swap:
+            targets = shadow_targets(pool_id)
+            create_shadow(pg_conn, pool_id, targets)
+        else:
+            for threshold in thresholds:
+                ensure_pool(pg_conn, pool_id, personas[pool_id], queue_id, threshold)
+            pg_conn.commit()
+            ensure_pp_partition(pg_conn, pool_id)
+
+        skip = frozenset(get_loaded_match_ids(pg_conn, pool_id)) if incremental else frozenset()
+        since_ts = SEASON_START_TS if pool_id == "season" else None
+        loads.append(PoolLoad(pool_id, accounts, since_ts, targets, skip))
+        print(f"[ETL] pool={pool_id} | cuentas={len(accounts.friend_puuids)} | en PG={len(skip)} "
+              f"| targets={', '.join(t.table for t in targets)}")
+
+    if not loads:
+        return
+
+    # Query común: la unión de amigos y el inicio más temprano; cada pool filtra lo suyo en memoria
+    friend_puuids = frozenset().union(*(l.accounts.friend_puuids for l in loads))
+    since = [l.since_ts for l in loads]
+    since_ts = None if None in since else min(since)
+    query = raw_match_query(mongo_db, queue_id, min_friends, friend_puuids, since_ts)
+    print(f"[ETL] {len(loads)} pools en un escaneo raw | loader={loader} | thresholds={thresholds} | swap={swap}")
+
+    try:
+        results = run_partitioned(
+            populate_pools_partition, mongo_db[COLLECTION_RAW_MATCHES], query, workers,
+            loads, queue_id, min_friends, now_utc(), loader, max(1, pipeline),
+        )
+    except Exception:
+        if swap:
+            for l in loads:
+                drop_shadow(pg_conn, l.targets)
+        raise
+
+    # Cada swap es su propia transacción: si uno falla, las pools anteriores ya están
+    # publicadas y las shadow de las que faltan se descartan
+    published: list[str] = []
+    try:
+        for l in loads:
+            if swap:
+                swap_shadow(pg_conn, l.pool_id, l.targets, personas[l.pool_id], queue_id, thresholds)
+                published.append(l.pool_id)
+                apply_metric_deltas(pg_conn, l.pool_id)
+            elif not incremental:
+                rebuild_pool_aggregates(pg_conn, l.pool_id)
+            total_matches = sum(r[l.pool_id][0] for r in results)
+            total_pp = sum(r[l.pool_id][1] for r in results)
+            print(f"[ETL] ✅ pool={l.pool_id}: {total_matches} partidas | {total_pp} player_performances"
+                  f"{' (intercambiada)' if swap else ''}")
+    except Exception:
+        if not swap:
+            raise
+        pending = [l for l in loads if l.pool_id not in published]
+        for l in pending:
+            drop_shadow(pg_conn, l.targets)
+        print(f"[ETL] ❌ Swap fallido | publicadas: {', '.join(published) or 'ninguna'} "
+              f"| descartadas: {', '.join(l.pool_id for l in pending)}")
+        raise
+
+
 def main():
     parser = argparse.ArgumentParser(description="ETL MongoDB L1 → PostgreSQL")
     parser.add_argument("--pool", type=str, default=None)
     parser.add_argument("--queue", type=int, default=QUEUE_FLEX)
     parser.add_argument("--min", type=int, default=MIN_FRIENDS_IN_MATCH)
     parser.add_argument("--users-collection", type=str, default="L0_users_index")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Particiones L1 cargadas en paralelo (0 = todos los núcleos)")
+    parser.add_argument("--loader", choices=sorted(LOADERS), default=DEFAULT_LOADER,
+                        help="Estrategia de escritura en PG: copy (COPY + staging), "
+                             "values (execute_values multi-fila) o batch (execute_batch)")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--incremental", action="store_true",
+                      help="Cargar solo las partidas de L1 que aún no están en PostgreSQL")
+    mode.add_argument("--swap", action="store_true",
+                      help="Recargar la pool en tablas shadow e intercambiarla en una transacción "
+                           "(el dashboard nunca ve una carga a medias)")
+    parser.add_argument("--pipeline", type=int, default=0, metavar="N",
+                        help="Lectura Mongo / transformación / escritura PG en hilos solapados, "
+                             "con N hilos de transformación (0 = secuencial)")
+    parser.add_argument("--all-mins", action="store_true",
+                        help=f"Cargar la L1 de --min una sola vez y registrar las pools "
+                             f"min_friends=--min..{MAX_MIN_FRIENDS} (usar con --min 1)")
+    parser.add_argument("--from-raw", action="store_true",
+                        help="Leer L0_all_raw_matches y filtrar en memoria, sin colección L1 "
+                             "(no hace falta ejecutar build_L1_filtered)")
+    parser.add_argument("--pools", nargs="+", default=None, metavar="POOL",
+                        help="Varias pools en un solo escaneo raw (implica --from-raw). "
+                             "'season' usa L0_users_index_season")
+    parser.add_argument("--no-refresh", action="store_true",
+                        help="No refrescar las vistas materializadas metric_* al terminar "
+                             "(p.ej. si se encadenan varias cargas)")
     args = parser.parse_args()
+    workers = resolve_workers(args.workers)
 
     print(f"[ETL] Arrancando populate_pg.py | queue={args.queue} min={args.min} pool={args.pool}")
 
     pg_conn = psycopg2.connect(_PG_DSN)
     pg_conn.autocommit = True
 
-    # AUTO-FIX: Asegurar que la columna riot_id_name existe
-    with pg_conn.cursor() as cur:
-        cur.execute("""
-            SELECT column_name 
-            FROM information_schema.columns 
-            WHERE table_name='player_performances' AND column_name='riot_id_name'
-        """)
-        if not cur.fetchone():
-            print("[ETL] 🔧 Añadiendo columna 'riot_id_name' a player_performances...")
-            cur.execute("ALTER TABLE player_performances ADD COLUMN riot_id_name VARCHAR(100)")
-            print("[ETL] ✅ Columna añadida.")
-
     try:
+        # Sin DDL en el ETL: el esquema lo gestiona scripts/apply_schema.py
+        check_schema(pg_conn)
+
         with get_mongo_client() as mongo_client:
             mongo_db = mongo_client[MONGO_DB]
 
-            # Pool normal
-            pool_id, l1_name = resolve_pool(mongo_db, args.pool, args.queue, args.min)
-            populate(pool_id, l1_name, args.queue, args.min, mongo_db, pg_conn, args.users_collection)
-
-            # Si no se especificó pool, también cargar season
-            if not args.pool:
-                season_l1 = f"L1_q{args.queue}_min{args.min}_pool_season"
-                if season_l1 in mongo_db.list_collection_names():
-                    populate("season", season_l1, args.queue, args.min, mongo_db, pg_conn, "L0_users_index_season")
+            # Varias pools (o pool auto + season desde raw): un solo escaneo compartido
+            if args.pools or (args.from_raw and not args.pool):
+                names = args.pools or [resolve_pool(mongo_db, None, args.queue, args.min,
+                                                    use_registry=False)[0], "season"]
+                pools = [(p, COLLECTION_USERS_INDEX_SEASON if p == "season" else args.users_collection)
+                         for p in dict.fromkeys(names)]
+                populate_pools(pools, args.queue, args.min, mongo_db, pg_conn, workers, args.loader,
+                               args.incremental, args.pipeline, args.all_mins, args.swap)
+            else:
+                # Pool normal
+                pool_id, l1_name = resolve_pool(mongo_db, args.pool, args.queue, args.min)
+                populate(pool_id, l1_name, args.queue, args.min, mongo_db, pg_conn,
+                         args.users_collection, workers, args.loader, args.incremental, args.pipeline,
+                         args.all_mins, args.swap, args.from_raw)
+
+                # Si no se especificó pool, también cargar season (populate comprueba que exista L1)
+                if not args.pool:
+                    season_l1 = f"L1_q{args.queue}_min{args.min}_pool_season"
+                    populate("season", season_l1, args.queue, args.min, mongo_db, pg_conn,
+                             "L0_users_index_season", workers, args.loader, args.incremental, args.pipeline,
+                             args.all_mins, args.swap)
+
+        # Sumar a metric_agg_* las partidas nuevas (también las de cargas interrumpidas)
+        apply_metric_deltas(pg_conn)
+
+        # Vistas materializadas que no se mantienen por deltas: recalcularlas enteras
+        if not args.no_refresh:
+            refresh_metric_views(pg_conn)
     finally:
         pg_conn.close()
 
@@ -11,6 +11,8 @@ Ejemplos:
   python src/pipeline.py --mode full --run-in-terminal
   python src/pipeline.py --mode l1-l3 --min 5
   python src/pipeline.py --mode season --run-in-terminal
+  python src/pipeline.py --mode l1-l2 --min 1 --all-mins   # una pasada para min 1..5
+  python src/pipeline.py --mode l1-l2 --direct             # raw → PostgreSQL sin colección L1
 """
 
 import sys
@@ -108,17 +110,26 @@ def run_l0(run_in_terminal: bool, queue: Queue) -> bool:
     return True
 
 
+def _etl_flags(all_mins: bool, swap: bool, direct: bool = False) -> list[str]:
+    return ((["--all-mins"] if all_mins else []) + (["--swap"] if swap else [])
+            + (["--from-raw"] if direct else []))
+
+
 def run_l1_to_l2(min_friends: int, pool_id: str | None,
-                  run_in_terminal: bool, queue: Queue) -> bool:
-    """Filtrado L1 (Mongo) → ETL L2 a PostgreSQL."""
-    base_args = ["--min", str(min_friends)]
+                  run_in_terminal: bool, queue: Queue, workers: int = 1,
+                  all_mins: bool = False, swap: bool = False, direct: bool = False) -> bool:
+    """Filtrado L1 (Mongo) → ETL L2 a PostgreSQL. Con `direct`, raw → PostgreSQL sin L1."""
+    base_args = ["--min", str(min_friends), "--workers", str(workers)]
     if pool_id:
         base_args += ["--pool", pool_id]
+    etl_args = base_args + _etl_flags(all_mins, swap, direct)
 
     steps = [
         ("L1 — Colecciones filtradas (Mongo)",  LOAD / "build_L1_filtered.py",  base_args),
-        ("L2 — ETL: Mongo L1 → PostgreSQL",     LOAD / "populate_pg.py",         base_args),
+        ("L2 — ETL: Mongo L1 → PostgreSQL",     LOAD / "populate_pg.py",         etl_args),
     ]
+    if direct:
+        steps = [("L2 — ETL: Mongo raw → PostgreSQL", LOAD / "populate_pg.py", etl_args)]
     for name, script, args in steps:
         if not run_step(name, script, *args, run_in_terminal=run_in_terminal, queue=queue):
             _abort(name, run_in_terminal, queue)
@@ -128,18 +139,20 @@ def run_l1_to_l2(min_friends: int, pool_id: str | None,
 
 
 def run_full(min_friends: int, pool_id: str | None,
-             run_in_terminal: bool, queue: Queue) -> bool:
+             run_in_terminal: bool, queue: Queue, workers: int = 1,
+             all_mins: bool = False, swap: bool = False, direct: bool = False) -> bool:
     """Pipeline completo L0 (Mongo) → L2 (PostgreSQL)."""
     if not run_l0(run_in_terminal, queue):
         return False
-    return run_l1_to_l2(min_friends, pool_id, run_in_terminal, queue)
+    return run_l1_to_l2(min_friends, pool_id, run_in_terminal, queue, workers, all_mins, swap, direct)
 
 
-def run_season(min_friends: int, run_in_terminal: bool, queue: Queue) -> bool:
+def run_season(min_friends: int, run_in_terminal: bool, queue: Queue, workers: int = 1,
+               all_mins: bool = False, swap: bool = False, direct: bool = False) -> bool:
     """Pipeline de temporada con fechas fijas."""
     end_date = date.today().isoformat()
     common = ["--min", str(min_friends), "--pool", SEASON_POOL_ID,
-              "--users-collection", SEASON_USERS_COLLECTION]
+              "--users-collection", SEASON_USERS_COLLECTION, "--workers", str(workers)]
 
     # Primero índice de usuarios Season
     if not run_step("L0 — Índice usuarios Season",
@@ -151,8 +164,11 @@ def run_season(min_friends: int, run_in_terminal: bool, queue: Queue) -> bool:
     # Luego L1 → ETL PG con parámetros season
     steps = [
         ("L1 Season — Filtrado (Mongo)",        LOAD / "build_L1_filtered.py",  common),
-        ("L2 Season — ETL: Mongo L1 → PG",      LOAD / "populate_pg.py",         common + ["--users-collection", SEASON_USERS_COLLECTION]),
+        ("L2 Season — ETL: Mongo L1 → PG",      LOAD / "populate_pg.py",
+         common + ["--users-collection", SEASON_USERS_COLLECTION] + _etl_flags(all_mins, swap, direct)),
     ]
+    if direct:
+        steps = steps[1:]
     for name, script, args in steps:
         if not run_step(name, script, *args, run_in_terminal=run_in_terminal, queue=queue):
             _abort(name, run_in_terminal, queue)
@@ -180,6 +196,14 @@ if __name__ == "__main__":
                         help="Pool ID (hash 8 chars, o 'season')")
     parser.add_argument("--run-in-terminal", action="store_true",
                         help="Mostrar output en tiempo real")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Particiones en paralelo para L1 y ETL (0 = todos los núcleos)")
+    parser.add_argument("--all-mins", action="store_true",
+                        help="El ETL carga la L1 de --min como superconjunto y registra todos los umbrales")
+    parser.add_argument("--swap", action="store_true",
+                        help="El ETL recarga cada pool en tablas shadow y la intercambia en una transacción")
+    parser.add_argument("--direct", action="store_true",
+                        help="Sin colecciones L1: el ETL filtra las partidas raw en memoria")
     args = parser.parse_args()
 
     q = PIPELINE_QUEUE
@@ -188,8 +212,8 @@ if __name__ == "__main__":
     if args.mode == "l0":
         run_l0(rt, q)
     elif args.mode == "l1-l2":
-        run_l1_to_l2(args.min, args.pool, rt, q)
+        run_l1_to_l2(args.min, args.pool, rt, q, args.workers, args.all_mins, args.swap, args.direct)
     elif args.mode == "season":
-        run_season(args.min, rt, q)
+        run_season(args.min, rt, q, args.workers, args.all_mins, args.swap, args.direct)
     else:
-        run_full(args.min, args.pool, rt, q)
+        run_full(args.min, args.pool, rt, q, args.workers, args.all_mins, args.swap, args.direct)
@@ -24,6 +24,9 @@ MONGO_DB = os.getenv("MONGO_DB", "lol_data")
 COLLECTION_RAW_MATCHES = os.getenv("MONGO_COLLECTION_RAW_MATCHES", "L0_all_raw_matches")
 COLLECTION_ACCOUNTS = "riot_accounts"
 COLLECTION_USERS_INDEX = "L0_users_index"
+COLLECTION_USERS_INDEX_SEASON = "L0_users_index_season"
+COLLECTION_MATCH_FRIENDS = "L0_match_friends"
+COLLECTION_POOL_REGISTRY = "pool_registry"
 
 # ================================
 # POSTGRESQL CONFIG (L1/L2/métricas — datos procesados)
@@ -36,6 +39,8 @@ POSTGRES_URI = os.getenv("POSTGRES_URI")
 REGIONAL_ROUTING = os.getenv("REGIONAL_ROUTING", "europe")
 QUEUE_FLEX = int(os.getenv("QUEUE_FLEX", "440"))
 MIN_FRIENDS_IN_MATCH = int(os.getenv("MIN_FRIENDS_IN_MATCH", "5"))
+MAX_MIN_FRIENDS = int(os.getenv("MAX_MIN_FRIENDS", "5"))  # umbral más alto ofrecido en el dashboard
+SEASON_START_TS = 1767830400000  # 2026-01-08 00:00:00 UTC (ms), inicio de la pool 'season'
 
 COUNT_PER_PLAYER = int(os.getenv("COUNT_PER_PLAYER", "800"))
 SLEEP_BETWEEN_CALLS = float(os.getenv("SLEEP_BETWEEN_CALLS", "0.2"))
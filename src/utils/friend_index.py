@@ -0,0 +1,234 @@
+"""
+utils/friend_index.py
+Índice de presencia de amigos por partida (colección L0_match_friends).
+
+Por cada partida raw guarda qué PUUIDs conocidos (riot_accounts + índices de
+usuarios) y qué personas aparecen, para que L1 y las consultas de pools puedan
+responder "qué partidas tienen ≥N amigos" sin leer los payloads completos.
+
+Documento:
+    {
+        "_id": "EUW1_7184073522",
+        "queue": 440,
+        "game_start_ts": 1731422914270,
+        "participants": [...],    # los 10 PUUIDs de la partida
+        "puuids": [...],          # PUUIDs conocidos, en orden de participante
+        "personas": [...],
+        "n_puuids": 5,
+        "n_personas": 5,
+        "known_version": "3f9a0c1b",
+        "indexed_at": datetime
+    }
+
+`known_version` es un hash del conjunto de PUUIDs conocidos. Cuando cambian los
+índices de usuarios, las entradas con otra versión se recalculan desde sus propios
+`participants` (sin leer raw) y solo se reescriben las que cambian; al resto se les
+actualiza la versión con un único update_many.
+"""
+
+import hashlib
+import datetime
+
+from pymongo import UpdateOne, ASCENDING
+
+from utils.config import (
+    COLLECTION_RAW_MATCHES, COLLECTION_ACCOUNTS, COLLECTION_USERS_INDEX,
+    COLLECTION_USERS_INDEX_SEASON, COLLECTION_MATCH_FRIENDS,
+)
+
+DEFAULT_USERS_COLLECTIONS = (COLLECTION_USERS_INDEX, COLLECTION_USERS_INDEX_SEASON)
+
+
+def now_utc():
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
+def load_known_puuids(db, users_collections=DEFAULT_USERS_COLLECTIONS) -> dict[str, str | None]:
+    """Devuelve {puuid: persona} con todas las cuentas conocidas (persona None si solo está en riot_accounts)."""
+    known: dict[str, str | None] = {}
+    for doc in db[COLLECTION_ACCOUNTS].find({}, {"puuid": 1}):
+        if doc.get("puuid"):
+            known[doc["puuid"]] = None
+    for coll in users_collections:
+        for doc in db[coll].find({}, {"persona": 1, "puuids": 1}):
+            for p in doc.get("puuids", []):
+                known[p] = doc.get("persona") or doc["_id"]
+    return known
+
+
+def known_version(known: dict) -> str:
+    base = ",".join(sorted(known))
+    return hashlib.sha1(base.encode("utf-8")).hexdigest()[:8]
+
+
+def build_entry(match_id: str, match_json: dict, known: dict, version: str, indexed_at=None) -> dict:
+    info = match_json.get("info", {})
+    participants = match_json.get("metadata", {}).get("participants", [])
+    puuids = [p for p in participants if p in known]
+    personas = sorted({known[p] for p in puuids if known[p]})
+    return {
+        "_id": match_id,
+        "queue": info.get("queueId"),
+        "game_start_ts": info.get("gameStartTimestamp"),
+        "participants": participants,
+        "puuids": puuids,
+        "personas": personas,
+        "n_puuids": len(puuids),
+        "n_personas": len(personas),
+        "known_version": version,
+        "indexed_at": indexed_at or now_utc(),
+    }
+
+
+def ensure_indexes(db):
+    coll = db[COLLECTION_MATCH_FRIENDS]
+    coll.create_index([("queue", ASCENDING), ("n_puuids", ASCENDING), ("game_start_ts", ASCENDING)])
+    coll.create_index([("queue", ASCENDING), ("n_personas", ASCENDING)])
+    coll.create_index([("known_version", ASCENDING)])
+
+
+def upsert_entry(db, match_id: str, match_json: dict, known: dict, version: str):
+    """Llamado en ingesta: registra la presencia de amigos de una partida recién insertada."""
+    entry = build_entry(match_id, match_json, known, version)
+    db[COLLECTION_MATCH_FRIENDS].replace_one({"_id": match_id}, entry, upsert=True)
+
+
+_RAW_INDEX_PROJECTION = {"_id": 1, "data.metadata.participants": 1,
+                         "data.info.queueId": 1, "data.info.gameStartTimestamp": 1}
+
+
+def _entry_json(entry: dict) -> dict:
+    """Los campos de la partida raw que usa build_entry, a partir de una entrada ya indexada."""
+    return {"metadata": {"participants": entry["participants"]},
+            "info": {"queueId": entry.get("queue"), "gameStartTimestamp": entry.get("game_start_ts")}}
+
+
+def _write_entries(coll, entries, batch_size: int) -> int:
+    """Upsert de las entradas en bulk_write de `batch_size`. Devuelve cuántas."""
+    ops = []
+    written = 0
+    for entry in entries:
+        ops.append(UpdateOne({"_id": entry["_id"]}, {"$set": entry}, upsert=True))
+        written += 1
+        if len(ops) >= batch_size:
+            coll.bulk_write(ops, ordered=False)
+            ops = []
+    if ops:
+        coll.bulk_write(ops, ordered=False)
+    return written
+
+
+def _raw_entries(db, ids: list[str], known: dict, version: str, indexed_at, chunk: int):
+    """Entradas de las partidas `ids`, leídas de raw en trozos de `chunk` `_id`."""
+    raw = db[COLLECTION_RAW_MATCHES]
+    for i in range(0, len(ids), chunk):
+        for doc in raw.find({"_id": {"$in": ids[i:i + chunk]}}, _RAW_INDEX_PROJECTION):
+            yield build_entry(doc["_id"], doc.get("data", {}), known, version, indexed_at)
+
+
+def _changed_entries(coll_idx, stale_query: dict, known: dict, version: str, indexed_at,
+                     legacy: list[str]):
+    """
+    Recalcula las entradas de `stale_query` desde sus `participants` y devuelve solo las
+    que cambian. Las que no tienen `participants` se añaden a `legacy`.
+    """
+    projection = {"participants": 1, "queue": 1, "game_start_ts": 1, "puuids": 1, "personas": 1}
+    for entry in coll_idx.find(stale_query, projection):
+        if "participants" not in entry:
+            legacy.append(entry["_id"])
+            continue
+        fresh = build_entry(entry["_id"], _entry_json(entry), known, version, indexed_at)
+        if fresh["puuids"] != entry.get("puuids") or fresh["personas"] != entry.get("personas"):
+            yield fresh
+
+
+def refresh_index(db, known: dict, batch_size: int = 500) -> int:
+    """
+    Pone el índice al día con `known`. Devuelve el número de entradas escritas
+    (0 si el índice ya estaba al día).
+
+      - Entradas con otra `known_version`: se recalculan desde sus `participants` y
+        solo se reescriben las que cambian de PUUIDs o personas (las afectadas por
+        las cuentas añadidas o quitadas); las demás cambian de versión en bloque.
+      - Entradas sin `participants` (anteriores a ese campo) y partidas raw sin
+        entrada: se indexan leyendo raw, por trozos de `_id`.
+    """
+    coll_idx = db[COLLECTION_MATCH_FRIENDS]
+    raw = db[COLLECTION_RAW_MATCHES]
+    version = known_version(known)
+
+    stale_query = {"known_version": {"$ne": version}}
+    has_stale = coll_idx.find_one(stale_query, {"_id": 1}) is not None
+    if not has_stale and coll_idx.estimated_document_count() >= raw.estimated_document_count():
+        return 0
+
+    ensure_indexes(db)
+    indexed_at = now_utc()
+    written = 0
+
+    if has_stale:
+        legacy: list[str] = []
+        written += _write_entries(
+            coll_idx, _changed_entries(coll_idx, stale_query, known, version, indexed_at, legacy), batch_size)
+        written += _write_entries(
+            coll_idx, _raw_entries(db, legacy, known, version, indexed_at, batch_size), batch_size)
+        coll_idx.update_many(stale_query, {"$set": {"known_version": version}})
+
+    # Partidas raw sin entrada (insertadas sin pasar por ingest_matches)
+    if coll_idx.estimated_document_count() < raw.estimated_document_count():
+        indexed = {d["_id"] for d in coll_idx.find({}, {"_id": 1})}
+        missing = [d["_id"] for d in raw.find({}, {"_id": 1}) if d["_id"] not in indexed]
+        written += _write_entries(
+            coll_idx, _raw_entries(db, missing, known, version, indexed_at, batch_size), batch_size)
+    return written
+
+
+def candidate_match_ids(db, queue_id: int, min_friends: int, since_ts: int | None = None) -> list[str]:
+    """IDs de partidas con al menos `min_friends` PUUIDs conocidos (superconjunto del filtro L1)."""
+    query = {"queue": queue_id, "n_puuids": {"$gte": min_friends}}
+    if since_ts is not None:
+        query["game_start_ts"] = {"$gte": since_ts}
+    return [d["_id"] for d in db[COLLECTION_MATCH_FRIENDS].find(query, {"_id": 1})]
+
+
+# Por encima, la lista de candidatos no va en la query: un $in tan grande se repetiría en
+# la query de cada partición del escaneo (y se acercaría al límite de 16MB de BSON)
+MAX_CANDIDATES_IN = 50_000
+
+
+def raw_match_query(db, queue_id: int, min_friends: int, friend_puuids: set,
+                    since_ts: int | None = None, use_index: bool = True) -> dict:
+    """
+    Query sobre raw para el filtro L1 de una pool: cola, inicio mínimo opcional y, si el
+    índice cubre todos los PUUIDs de la pool, solo los `_id` candidatos (hasta
+    MAX_CANDIDATES_IN; con más se escanea raw con el filtro de cola y fecha).
+    """
+    query = {"data.info.queueId": queue_id}
+    if since_ts is not None:
+        query["data.info.gameStartTimestamp"] = {"$gte": since_ts}
+    if not use_index:
+        return query
+
+    known = load_known_puuids(db)
+    if not friend_puuids <= known.keys():
+        print("[INDEX] pool has PUUIDs outside the friend index, scanning raw matches")
+        return query
+    refreshed = refresh_index(db, known)
+    if refreshed:
+        print(f"[INDEX] refreshed {refreshed} entries in {COLLECTION_MATCH_FRIENDS}")
+    candidates = candidate_match_ids(db, queue_id, min_friends, since_ts)
+    if len(candidates) > MAX_CANDIDATES_IN:
+        print(f"[INDEX] candidates={len(candidates)} > {MAX_CANDIDATES_IN}, scanning raw matches")
+        return query
+    query["_id"] = {"$in": candidates}
+    print(f"[INDEX] candidates={len(candidates)}")
+    return query
+
+
+def friends_in_match(match_json: dict, friend_puuids, persona_por_puuid: dict) -> tuple[list, list]:
+    """(friends_present, personas_present) de una partida raw, tal como se guardan en L1."""
+    participants = match_json.get("metadata", {}).get("participants", [])
+    friends_present = [p for p in participants if p in friend_puuids]
+    personas_present = list({persona_por_puuid[p] for p in friends_present if p in persona_por_puuid})
+    return friends_present, personas_present
+
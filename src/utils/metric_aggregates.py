@@ -0,0 +1,238 @@
+"""
+utils/metric_aggregates.py
+Tablas agregadas metric_agg_* mantenidas por el ETL con deltas aditivos.
+
+Sustituyen a las vistas metric_01/02/05/07/08/10/11/14/15: en lugar de recalcular
+todo el histórico, cada carga suma a las tablas solo las partidas nuevas.
+
+    metric_agg_persona           (pool, queue, friends_count, persona)           → 01, 05, 07, 08, 11
+    metric_agg_persona_champion  (..., persona, champion_name)                   → 02/13
+    metric_agg_persona_role      (..., persona, position)                        → 10
+    metric_agg_champion          (..., is_friend, champion_name)                 → 14, 15
+
+Cada columna es una clave, un contador (COUNT/SUM, se suma al existente) o un
+máximo (GREATEST con el existente). Los promedios se calculan al leer:
+SUM(sum_kills) / SUM(games) sobre los friends_count filtrados.
+
+Qué partidas faltan por agregar lo dice `matches.aggregated`: apply_metric_deltas
+las marca y suma sus filas de player_performances en la misma transacción, así que
+una carga interrumpida se agrega en la siguiente. El swap de una pool borra sus
+agregados en la transacción del swap y los recalcula justo después, en otra, para no
+alargar el bloqueo del DETACH. Las rachas (utils/streaks.py) se actualizan en la misma
+transacción que los agregados, con las mismas partidas.
+
+Regenerar el DDL tras cambiar la lista:
+    cd src && python -m utils.metric_aggregates
+"""
+
+from typing import NamedTuple
+
+from utils.streaks import update_streaks
+
+KEY, COUNT, SUM, MAX = "key", "count", "sum", "max"
+
+
+class AggColumn(NamedTuple):
+    name: str
+    sql_type: str
+    kind: str
+    expr: str = ""          # expresión sobre player_performances (vacía en COUNT)
+
+
+class AggTable(NamedTuple):
+    name: str
+    where: str
+    columns: tuple[AggColumn, ...]
+
+
+_WIN = "CASE WHEN win THEN 1 ELSE 0 END"
+
+_BASE_KEYS = (
+    AggColumn("pool_id",       "VARCHAR(30)  NOT NULL", KEY, "pool_id"),
+    AggColumn("queue_id",      "INTEGER      NOT NULL", KEY, "queue_id"),
+    AggColumn("friends_count", "INTEGER      NOT NULL", KEY, "friends_count"),
+)
+_PERSONA_KEYS = _BASE_KEYS + (AggColumn("persona", "VARCHAR(100) NOT NULL", KEY, "persona"),)
+
+_GAMES = (
+    AggColumn("games", "BIGINT NOT NULL", COUNT),
+    AggColumn("wins",  "BIGINT NOT NULL", SUM, _WIN),
+)
+
+# Sumas para los promedios de metric_05 / metric_10
+_STAT_SUMS = tuple(
+    AggColumn(f"sum_{col}", "BIGINT", SUM, col)
+    for col in ("kills", "deaths", "assists", "damage_dealt", "damage_taken",
+                "vision_score", "gold_earned", "cs_total")
+)
+
+_FRIEND_PERSONA = "is_friend = TRUE AND persona IS NOT NULL"
+
+AGG_TABLES: tuple[AggTable, ...] = (
+    AggTable("metric_agg_persona", _FRIEND_PERSONA, _PERSONA_KEYS + _GAMES + _STAT_SUMS + (
+        # metric_07
+        AggColumn("early_surrenders", "BIGINT", SUM,
+                  "CASE WHEN game_ended_surrender AND NOT win THEN 1 ELSE 0 END"),
+        AggColumn("afks",             "BIGINT", SUM,
+                  "CASE WHEN cs_total < 10 AND (kills+assists) = 0 AND duration_s > 600 THEN 1 ELSE 0 END"),
+        # metric_08
+        AggColumn("fb_kills",                "BIGINT",  SUM, "CASE WHEN first_blood_kill THEN 1 ELSE 0 END"),
+        AggColumn("fb_assists",              "BIGINT",  SUM, "CASE WHEN first_blood_assist THEN 1 ELSE 0 END"),
+        AggColumn("sum_early_takedowns",     "NUMERIC", SUM, "takedowns_first_x_minutes"),
+        AggColumn("sum_gold_per_minute",     "NUMERIC", SUM, "gold_per_minute"),
+        AggColumn("sum_damage_per_minute",   "NUMERIC", SUM, "damage_per_minute"),
+        AggColumn("sum_vision_per_minute",   "NUMERIC", SUM, "vision_score_per_minute"),
+        AggColumn("sum_cs_10m",              "BIGINT",  SUM, "lane_minions_first_10_minutes"),
+        # metric_11
+        AggColumn("max_kills",        "INTEGER", MAX, "kills"),
+        AggColumn("max_deaths",       "INTEGER", MAX, "deaths"),
+        AggColumn("max_assists",      "INTEGER", MAX, "assists"),
+        AggColumn("max_vision_score", "INTEGER", MAX, "vision_score"),
+        AggColumn("max_cs",           "INTEGER", MAX, "cs_total"),
+        AggColumn("max_damage_dealt", "INTEGER", MAX, "damage_dealt"),
+        AggColumn("max_gold",         "INTEGER", MAX, "gold_earned"),
+        AggColumn("max_duration_s",   "INTEGER", MAX, "duration_s"),
+    )),
+    AggTable("metric_agg_persona_champion", _FRIEND_PERSONA, _PERSONA_KEYS + (
+        AggColumn("champion_name", "VARCHAR(60)  NOT NULL", KEY, "COALESCE(champion_name, 'UNKNOWN')"),
+    ) + _GAMES),
+    AggTable("metric_agg_persona_role", _FRIEND_PERSONA, _PERSONA_KEYS + (
+        AggColumn("position", "VARCHAR(20)  NOT NULL", KEY, "COALESCE(role, lane, 'UNKNOWN')"),
+    ) + _GAMES + _STAT_SUMS),
+    AggTable("metric_agg_champion", "TRUE", _BASE_KEYS + (
+        AggColumn("is_friend",     "BOOLEAN      NOT NULL", KEY, "is_friend"),
+        AggColumn("champion_name", "VARCHAR(60)  NOT NULL", KEY, "COALESCE(champion_name, 'UNKNOWN')"),
+    ) + _GAMES),
+)
+
+
+# =============================================================
+# SQL
+# =============================================================
+
+def _keys(table: AggTable) -> list[str]:
+    return [c.name for c in table.columns if c.kind == KEY]
+
+
+def _select_expr(c: AggColumn) -> str:
+    if c.kind == KEY:
+        return f"pp.{c.expr}" if c.expr == c.name else c.expr
+    if c.kind == COUNT:
+        return "COUNT(*)"
+    if c.kind == SUM:
+        return f"COALESCE(SUM({c.expr}), 0)"
+    return f"MAX({c.expr})"
+
+
+def _merge_expr(table: AggTable, c: AggColumn) -> str:
+    if c.kind == MAX:
+        return f"{c.name} = GREATEST({table.name}.{c.name}, EXCLUDED.{c.name})"
+    return f"{c.name} = {table.name}.{c.name} + EXCLUDED.{c.name}"
+
+
+def delta_sql(table: AggTable, pending: str = "_agg_pending") -> str:
+    """INSERT ... ON CONFLICT que suma a `table` las filas de las partidas de `pending`."""
+    keys = _keys(table)
+    cols = ", ".join(c.name for c in table.columns)
+    select = ",\n               ".join(_select_expr(c) for c in table.columns)
+    merge = ",\n            ".join(_merge_expr(table, c) for c in table.columns if c.kind != KEY)
+    return f"""
+        INSERT INTO {table.name} ({cols})
+        SELECT {select}
+        FROM player_performances pp
+        JOIN {pending} n ON n.match_id = pp.match_id AND n.pool_id = pp.pool_id
+        WHERE {table.where}
+        GROUP BY {", ".join(str(i + 1) for i in range(len(keys)))}
+        ON CONFLICT ({", ".join(keys)}) DO UPDATE SET
+            {merge}
+    """
+
+
+def create_table_sql(table: AggTable) -> str:
+    defs = [f"{c.name:<24} {c.sql_type}" for c in table.columns]
+    defs.append(f"PRIMARY KEY ({', '.join(_keys(table))})")
+    return f"CREATE TABLE IF NOT EXISTS {table.name} (\n    " + ",\n    ".join(defs) + "\n);"
+
+
+# =============================================================
+# MANTENIMIENTO
+# =============================================================
+
+def _apply(cur, pool_id: str | None) -> int:
+    """Marca como agregadas las partidas pendientes y suma sus filas. Devuelve cuántas."""
+    cur.execute("CREATE TEMP TABLE _agg_pending (match_id VARCHAR(30), pool_id VARCHAR(30)) ON COMMIT DROP")
+    cur.execute("""
+        WITH marked AS (
+            UPDATE matches SET aggregated = TRUE
+            WHERE NOT aggregated AND (%(pool)s::text IS NULL OR pool_id = %(pool)s)
+            RETURNING match_id, pool_id
+        )
+        INSERT INTO _agg_pending SELECT match_id, pool_id FROM marked
+    """, {"pool": pool_id})
+    n = cur.rowcount
+    if n:
+        for table in AGG_TABLES:
+            cur.execute(delta_sql(table))
+        update_streaks(cur)
+    return n
+
+
+def reset_pool_aggregates(cur, pool_id: str):
+    """Borra los agregados de la pool; sus partidas quedan pendientes (se recalcula entera)."""
+    for table in AGG_TABLES:
+        cur.execute(f"DELETE FROM {table.name} WHERE pool_id = %s", (pool_id,))
+    cur.execute("DELETE FROM streaks WHERE pool_id = %s", (pool_id,))
+    cur.execute("UPDATE matches SET aggregated = FALSE WHERE pool_id = %s AND aggregated", (pool_id,))
+
+
+def _in_transaction(conn, fn, *args):
+    """Ejecuta fn(cur, *args) en una transacción propia aunque `conn` esté en autocommit."""
+    autocommit = conn.autocommit
+    conn.autocommit = False
+    try:
+        with conn.cursor() as cur:
+            result = fn(cur, *args)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.autocommit = autocommit
+    return result
+
+
+def _rebuild(cur, pool_id: str) -> int:
+    reset_pool_aggregates(cur, pool_id)
+    return _apply(cur, pool_id)
+
+
+def rebuild_pool_aggregates(conn, pool_id: str) -> int:
+    """
+    Recalcula los agregados de la pool enteros (reset + deltas) en UNA transacción, tras
+    recargarla sobre las tablas live: la recarga reescribe persona/is_friend/win/... de
+    partidas ya agregadas y los deltas no restan los valores anteriores. Hasta el commit
+    el dashboard sigue viendo los agregados anteriores.
+    """
+    n = _in_transaction(conn, _rebuild, pool_id)
+    print(f"[AGG] ✅ Agregados de la pool {pool_id} recalculados ({n} partidas)")
+    return n
+
+
+def apply_metric_deltas(conn, pool_id: str | None = None, cur=None) -> int:
+    """
+    Suma a las tablas metric_agg_* las partidas de `pool_id` (todas si None) aún no agregadas.
+
+    Con `cur` se ejecuta dentro de la transacción del llamador y no
+    hace commit; sin él abre su propia transacción aunque `conn` esté en autocommit.
+    """
+    if cur is not None:
+        return _apply(cur, pool_id)
+
+    n = _in_transaction(conn, _apply, pool_id)
+    if n:
+        print(f"[AGG] ✅ {n} partidas sumadas a metric_agg_*{f' (pool={pool_id})' if pool_id else ''}")
+    return n
+
+
+if __name__ == "__main__":
+    print("\n\n".join(create_table_sql(t) for t in AGG_TABLES))
@@ -0,0 +1,47 @@
+"""
+utils/metric_views.py
+Refresco de las vistas materializadas metric_* (scripts/create_metric_views.sql).
+
+Las vistas se crean con apply_schema.py; el ETL solo las refresca al terminar
+una carga. Con CONCURRENTLY el dashboard sigue leyendo la versión anterior
+mientras se recalcula (cada vista tiene un índice único para permitirlo).
+"""
+
+import time
+
+METRIC_VIEW_PREFIX = "metric_"
+
+
+def list_metric_views(conn) -> list[tuple[str, bool]]:
+    """[(nombre, poblada)] de las vistas materializadas metric_* del esquema actual."""
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT matviewname, ispopulated
+            FROM pg_matviews
+            WHERE schemaname = current_schema() AND matviewname LIKE %s
+            ORDER BY matviewname
+        """, (METRIC_VIEW_PREFIX.replace("_", r"\_") + "%",))
+        return cur.fetchall()
+
+
+def refresh_metric_views(conn) -> list[str]:
+    """
+    REFRESH MATERIALIZED VIEW CONCURRENTLY de cada metric_*, una transacción por vista.
+
+    Una vista sin poblar (WITH NO DATA) no admite CONCURRENTLY: se refresca normal.
+    Devuelve los nombres refrescados (vacío si apply_schema.py no creó las vistas).
+    """
+    views = list_metric_views(conn)
+    if not views:
+        print("[VIEWS] ⚠️  No hay vistas metric_*; ejecuta scripts/apply_schema.py")
+        return []
+
+    t0 = time.perf_counter()
+    for name, populated in views:
+        mode = "CONCURRENTLY " if populated else ""
+        with conn.cursor() as cur:
+            cur.execute(f"REFRESH MATERIALIZED VIEW {mode}{name}")
+        if not conn.autocommit:
+            conn.commit()
+    print(f"[VIEWS] ✅ {len(views)} vistas metric_* refrescadas en {time.perf_counter() - t0:.1f}s")
+    return [name for name, _ in views]
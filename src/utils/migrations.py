@@ -0,0 +1,132 @@
+"""
+utils/migrations.py
+Migraciones versionadas del esquema PostgreSQL.
+
+Cada fichero `scripts/migrations/NNN_descripcion.sql` es una migración. La tabla
+`schema_version` guarda las que ya se aplicaron:
+
+    version | name                  | applied_at
+    --------+-----------------------+---------------------------
+          1 | legacy_constraints    | 2026-01-10 12:00:00+00
+
+`scripts/init_db.sql` describe siempre el esquema actual completo:
+    - BD nueva      → se ejecuta init_db.sql y se marcan todas las migraciones.
+    - BD existente  → se aplican las migraciones pendientes y luego init_db.sql
+                      (solo crea lo que falte, todo es IF NOT EXISTS).
+
+El ETL solo llama a check_schema(): un par de SELECT, sin DDL.
+"""
+
+import re
+from pathlib import Path
+
+MIGRATIONS_DIR = Path(__file__).resolve().parents[2] / "scripts" / "migrations"
+
+_MIGRATION_RE = re.compile(r"^(\d+)_(\w+)\.sql$")
+
+
+def list_migrations(directory: Path = MIGRATIONS_DIR) -> list[tuple[int, str, Path]]:
+    """[(version, nombre, ruta)] ordenadas por versión."""
+    found = []
+    for path in directory.glob("*.sql"):
+        m = _MIGRATION_RE.match(path.name)
+        if m:
+            found.append((int(m.group(1)), m.group(2), path))
+    return sorted(found)
+
+
+def latest_version(directory: Path = MIGRATIONS_DIR) -> int:
+    migrations = list_migrations(directory)
+    return migrations[-1][0] if migrations else 0
+
+
+def table_exists(conn, table: str) -> bool:
+    with conn.cursor() as cur:
+        cur.execute("SELECT to_regclass(%s) IS NOT NULL", (table,))
+        return cur.fetchone()[0]
+
+
+def current_version(conn) -> int:
+    """Versión aplicada (0 si la BD no tiene schema_version)."""
+    if not table_exists(conn, "schema_version"):
+        return 0
+    with conn.cursor() as cur:
+        cur.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version")
+        return cur.fetchone()[0]
+
+
+def ensure_version_table(conn):
+    with conn.cursor() as cur:
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version     INTEGER      PRIMARY KEY,
+                name        TEXT         NOT NULL,
+                applied_at  TIMESTAMPTZ  NOT NULL DEFAULT NOW()
+            )
+        """)
+    conn.commit()
+
+
+def _record(cur, version: int, name: str):
+    cur.execute(
+        "INSERT INTO schema_version (version, name) VALUES (%s, %s) ON CONFLICT (version) DO NOTHING",
+        (version, name),
+    )
+
+
+def apply_pending(conn, directory: Path = MIGRATIONS_DIR) -> list[int]:
+    """Aplica en orden las migraciones con versión > actual, cada una en su transacción."""
+    ensure_version_table(conn)
+    current = current_version(conn)
+    applied = []
+    for version, name, path in list_migrations(directory):
+        if version <= current:
+            continue
+        print(f"[SCHEMA] Migración {version:03d} {name}...")
+        with conn.cursor() as cur:
+            cur.execute(path.read_text(encoding="utf-8"))
+            _record(cur, version, name)
+        conn.commit()
+        applied.append(version)
+    return applied
+
+
+def stamp_all(conn, directory: Path = MIGRATIONS_DIR):
+    """Marca todas las migraciones como aplicadas (BD creada desde init_db.sql)."""
+    ensure_version_table(conn)
+    with conn.cursor() as cur:
+        for version, name, _ in list_migrations(directory):
+            _record(cur, version, name)
+    conn.commit()
+
+
+def apply_schema(conn, init_sql: str, directory: Path = MIGRATIONS_DIR):
+    """Deja la BD en la última versión. `conn` no debe estar en autocommit."""
+    fresh = not table_exists(conn, "player_performances")
+    if fresh:
+        with conn.cursor() as cur:
+            cur.execute(init_sql)
+        conn.commit()
+        stamp_all(conn, directory)
+        print(f"[SCHEMA] BD nueva: esquema creado en versión {latest_version(directory)}")
+        return
+
+    applied = apply_pending(conn, directory)
+    with conn.cursor() as cur:
+        cur.execute(init_sql)
+    conn.commit()
+    if applied:
+        print(f"[SCHEMA] Migraciones aplicadas: {applied}")
+    else:
+        print(f"[SCHEMA] Esquema al día (versión {current_version(conn)})")
+
+
+def check_schema(conn, directory: Path = MIGRATIONS_DIR):
+    """Comprobación barata para el ETL: falla si faltan migraciones por aplicar."""
+    current = current_version(conn)
+    latest = latest_version(directory)
+    if current < latest:
+        raise RuntimeError(
+            f"Esquema PostgreSQL en versión {current}, se necesita {latest}. "
+            f"Ejecuta: python scripts/apply_schema.py"
+        )
@@ -0,0 +1,78 @@
+"""
+utils/partitioned_scan.py
+Escaneo particionado de colecciones MongoDB en un pool de procesos.
+
+La colección se divide en rangos de `_id` de tamaño similar ($bucketAuto) y cada
+rango se procesa en un proceso independiente. Cada worker abre sus propias
+conexiones (MongoClient y psycopg2 no son fork-safe) y hace sus bulk writes.
+
+Uso:
+    results = run_partitioned(worker, coll, query, partitions, *args)
+
+`worker(query, *args)` debe ser una función de nivel de módulo (picklable) y
+recibe la query original restringida a su rango de `_id`.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+
+def resolve_workers(workers: int | None) -> int:
+    """0 o None → núcleos disponibles; cualquier otro valor se respeta (mínimo 1)."""
+    if not workers:
+        return os.cpu_count() or 1
+    return max(1, workers)
+
+
+def split_id_ranges(coll, query: dict, partitions: int) -> list[tuple]:
+    """
+    Divide los `_id` que cumplen `query` en `partitions` rangos [lo, hi).
+    El primer rango no tiene límite inferior y el último no tiene límite superior,
+    así ningún documento queda fuera aunque se inserte durante el escaneo.
+    """
+    if partitions <= 1:
+        return [(None, None)]
+
+    buckets = list(coll.aggregate([
+        {"$match": query},
+        {"$project": {"_id": 1}},
+        {"$bucketAuto": {"groupBy": "$_id", "buckets": partitions}},
+    ], allowDiskUse=True))
+
+    if len(buckets) <= 1:
+        return [(None, None)]
+
+    bounds = [b["_id"]["min"] for b in buckets[1:]]
+    lows = [None] + bounds
+    highs = bounds + [None]
+    return list(zip(lows, highs))
+
+
+def range_query(query: dict, lo, hi) -> dict:
+    """Restringe `query` al rango de `_id` [lo, hi)."""
+    cond = {}
+    if lo is not None:
+        cond["$gte"] = lo
+    if hi is not None:
+        cond["$lt"] = hi
+    if not cond:
+        return dict(query)
+    if "_id" in query:
+        return {"$and": [query, {"_id": cond}]}
+    return {**query, "_id": cond}
+
+
+def run_partitioned(worker, coll, query: dict, partitions: int, *args) -> list:
+    """
+    Ejecuta `worker(range_query, *args)` sobre cada partición en paralelo y
+    devuelve la lista de resultados (en el orden de las particiones).
+    Con una sola partición se ejecuta en el proceso actual.
+    """
+    ranges = split_id_ranges(coll, query, partitions)
+    if len(ranges) == 1:
+        return [worker(range_query(query, *ranges[0]), *args)]
+
+    print(f"[SCAN] {coll.name}: {len(ranges)} particiones en paralelo", flush=True)
+    with ProcessPoolExecutor(max_workers=len(ranges)) as pool:
+        futures = [pool.submit(worker, range_query(query, lo, hi), *args) for lo, hi in ranges]
+        return [f.result() for f in futures]
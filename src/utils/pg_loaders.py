@@ -0,0 +1,162 @@
+"""
+utils/pg_loaders.py
+Estrategias de escritura masiva (upsert) en PostgreSQL para el ETL.
+
+Cada loader recibe un cursor, un TableTarget y las filas (tuplas en el orden de
+`target.columns`) y hace el upsert completo del lote. Si el lote repite una clave
+de `target.conflict`, todos se quedan con la última fila (dedup_rows):
+
+    batch  → psycopg2.extras.execute_batch, una sentencia INSERT por fila.
+    values → psycopg2.extras.execute_values, un INSERT multi-fila
+             (VALUES (...),(...)) ON CONFLICT por página. Alternativa a COPY
+             donde no se permite crear tablas de staging.
+    copy   → COPY FROM STDIN (CSV) a una tabla temporal de staging y un único
+             INSERT ... SELECT ... ON CONFLICT por lote.
+
+Uso:
+    loader = LOADERS["copy"]
+    with conn.cursor() as cur:
+        loader(cur, MATCHES_TARGET, match_rows)
+    conn.commit()
+"""
+
+import io
+import csv
+from typing import NamedTuple
+
+import psycopg2.extras
+
+
+class TableTarget(NamedTuple):
+    table: str
+    columns: tuple[str, ...]
+    conflict: tuple[str, ...]   # columnas del ON CONFLICT
+    updates: tuple[str, ...]    # columnas actualizadas con EXCLUDED
+
+
+def _on_conflict(target: TableTarget) -> str:
+    conflict = ", ".join(target.conflict)
+    if not target.updates:
+        return f"ON CONFLICT ({conflict}) DO NOTHING"
+    sets = ",\n        ".join(f"{c} = EXCLUDED.{c}" for c in target.updates)
+    return f"ON CONFLICT ({conflict}) DO UPDATE SET\n        {sets}"
+
+
+def dedup_rows(target: TableTarget, rows: list[tuple]) -> list[tuple]:
+    """
+    Una fila por clave de `target.conflict` (la última): un mismo INSERT ... ON CONFLICT
+    no puede actualizar dos veces la misma fila.
+    """
+    idx = [target.columns.index(c) for c in target.conflict]
+    unique = {tuple(row[i] for i in idx): row for row in rows}
+    return rows if len(unique) == len(rows) else list(unique.values())
+
+
+def upsert_sql(target: TableTarget) -> str:
+    """INSERT ... VALUES (%s, ...) ON CONFLICT ... (placeholders posicionales)."""
+    cols = ", ".join(target.columns)
+    values = ", ".join(["%s"] * len(target.columns))
+    return f"INSERT INTO {target.table} ({cols}) VALUES ({values})\n    {_on_conflict(target)}"
+
+
+# =============================================================
+# execute_batch
+# =============================================================
+
+def load_batch(cur, target: TableTarget, rows: list[tuple], page_size: int = 500):
+    if rows:
+        psycopg2.extras.execute_batch(cur, upsert_sql(target), dedup_rows(target, rows), page_size=page_size)
+
+
+# =============================================================
+# execute_values
+# =============================================================
+
+def load_values(cur, target: TableTarget, rows: list[tuple], page_size: int = 500):
+    if not rows:
+        return
+    cols = ", ".join(target.columns)
+    psycopg2.extras.execute_values(
+        cur,
+        f"INSERT INTO {target.table} ({cols}) VALUES %s\n    {_on_conflict(target)}",
+        dedup_rows(target, rows),
+        page_size=page_size,
+    )
+
+
+# =============================================================
+# COPY → staging → INSERT ... ON CONFLICT
+# =============================================================
+
+_CSV_NULL = r"\N"
+
+
+def _pg_array(values) -> str:
+    items = []
+    for v in values:
+        if v is None:
+            items.append("NULL")
+        else:
+            s = str(v).replace("\\", "\\\\").replace('"', '\\"')
+            items.append(f'"{s}"')
+    return "{" + ",".join(items) + "}"
+
+
+def _csv_value(v):
+    if v is None:
+        return _CSV_NULL
+    if isinstance(v, (list, tuple, set, frozenset)):
+        return _pg_array(v)
+    return v
+
+
+def encode_csv(rows: list[tuple]) -> io.StringIO:
+    buf = io.StringIO()
+    writer = csv.writer(buf, lineterminator="\n")
+    for row in rows:
+        writer.writerow([_csv_value(v) for v in row])
+    buf.seek(0)
+    return buf
+
+
+def staging_table(target: TableTarget) -> str:
+    return f"stg_{target.table}"
+
+
+def ensure_staging(cur, target: TableTarget):
+    """
+    Tabla temporal con las columnas del target. Las tablas temporales no escriben
+    WAL y son privadas de la sesión, así que varios workers pueden cargar a la vez.
+    """
+    cols = ", ".join(target.columns)
+    cur.execute(
+        f"CREATE TEMP TABLE IF NOT EXISTS {staging_table(target)} AS "
+        f"SELECT {cols} FROM {target.table} WITH NO DATA"
+    )
+
+
+def load_copy(cur, target: TableTarget, rows: list[tuple]):
+    if not rows:
+        return
+    stg = staging_table(target)
+    cols = ", ".join(target.columns)
+
+    ensure_staging(cur, target)
+    cur.execute(f"TRUNCATE {stg}")
+    cur.copy_expert(
+        f"COPY {stg} ({cols}) FROM STDIN WITH (FORMAT csv, NULL '{_CSV_NULL}')",
+        encode_csv(dedup_rows(target, rows)),
+    )
+    # La staging se vacía en cada lote y dedup_rows ya deja una fila por clave
+    cur.execute(f"""
+        INSERT INTO {target.table} ({cols})
+        SELECT {cols} FROM {stg}
+        {_on_conflict(target)}
+    """)
+
+
+LOADERS = {
+    "batch": load_batch,
+    "values": load_values,
+    "copy": load_copy,
+}
@@ -1,10 +1,13 @@
 
 import os
 import hashlib
+import datetime
 from pathlib import Path
-from typing import List
+from typing import List, NamedTuple
 from dotenv import load_dotenv
-from pymongo import MongoClient
+from pymongo import MongoClient, DESCENDING
+
+from utils.config import COLLECTION_POOL_REGISTRY, COLLECTION_USERS_INDEX
 
 load_dotenv()
 
@@ -21,10 +24,118 @@ def build_pool_version(personas: list) -> str:
     h = hashlib.sha1(base.encode("utf-8")).hexdigest()[:8]
     return f"pool_{h}"
 
+# =============================================================
+# CUENTAS DE UNA POOL (puuid → persona)
+# =============================================================
+
+class PoolAccounts(NamedTuple):
+    """
+    Cuentas de una pool, construidas una vez por ejecución y compartidas (hilos,
+    procesos del scan particionado, varias pools). No se modifican tras crearse.
+    """
+    puuid_to_persona: dict[str, str]
+    friend_puuids: frozenset[str]       # pertenencia O(1) en los bucles por participante
+    personas: tuple[str, ...]
+
+
+def make_pool_accounts(puuid_to_persona: dict[str, str], personas=None) -> PoolAccounts:
+    mapping = dict(puuid_to_persona)
+    return PoolAccounts(mapping, frozenset(mapping),
+                        tuple(sorted(personas if personas is not None else set(mapping.values()))))
+
+
+_USERS_ACCOUNTS: dict[str, PoolAccounts] = {}
+
+
+def load_users_accounts(db, users_collection: str = COLLECTION_USERS_INDEX) -> PoolAccounts:
+    """
+    Cuentas de una colección de usuarios (L0_users_index*), leída una sola vez por proceso.
+    `personas` incluye también las personas sin cuentas (cuentan para build_pool_version).
+    """
+    cached = _USERS_ACCOUNTS.get(users_collection)
+    if cached is None:
+        mapping: dict[str, str] = {}
+        personas = set()
+        for doc in db[users_collection].find({}, {"persona": 1, "puuids": 1}):
+            if doc.get("persona"):
+                personas.add(doc["persona"])
+            for p in doc.get("puuids", []):
+                mapping[p] = doc["_id"]
+        cached = _USERS_ACCOUNTS[users_collection] = make_pool_accounts(mapping, personas)
+    return cached
+
+
+# =============================================================
+# POOL REGISTRY (colección pool_registry)
+# =============================================================
+# Un documento por pool, escrito por build_L1_filtered y leído por los pasos
+# siguientes para no re-escanear L0_users_index ni llamar a list_collection_names:
+#   {
+#       "_id": "pool_ca879f16", "pool_id": "ca879f16",
+#       "users_collection": "L0_users_index", "auto": True,
+#       "personas": [...], "puuids": [...],
+#       "accounts": [{"puuid": ..., "persona": ...}],
+#       "collections": ["L1_q440_min5_pool_ca879f16", ...],
+#       "updated_at": datetime
+#   }
+
+def register_pool(db, pool_version: str, persona_por_puuid: dict, users_collection: str,
+                  auto: bool, collection: str):
+    """Registra (o actualiza) la pool y añade `collection` a sus colecciones construidas."""
+    db[COLLECTION_POOL_REGISTRY].update_one(
+        {"_id": pool_version},
+        {
+            "$set": {
+                "pool_id": pool_version.replace("pool_", "", 1),
+                "users_collection": users_collection,
+                "auto": auto,
+                "personas": sorted(set(persona_por_puuid.values())),
+                "puuids": sorted(persona_por_puuid),
+                "accounts": [{"puuid": p, "persona": persona} for p, persona in persona_por_puuid.items()],
+                "updated_at": datetime.datetime.now(datetime.timezone.utc),
+            },
+            "$addToSet": {"collections": collection},
+        },
+        upsert=True,
+    )
+
+
+def add_pool_collections(db, pool_version: str, *collections: str):
+    db[COLLECTION_POOL_REGISTRY].update_one(
+        {"_id": pool_version},
+        {"$addToSet": {"collections": {"$each": list(collections)}}},
+    )
+
+
+def get_registered_pool(db, pool_id: str | None = None,
+                        users_collection: str = COLLECTION_USERS_INDEX) -> dict | None:
+    """
+    Devuelve la entrada del registro para `pool_id`, o si no se indica, la última
+    pool auto-calculada desde `users_collection`. None si no hay registro.
+
+    La pool auto se comprueba contra las personas actuales de `users_collection`: si
+    han cambiado desde la última build_L1_filtered, se devuelve la entrada del hash
+    recalculado (None si aún no está registrada) en lugar de la pool anterior.
+    """
+    coll = db[COLLECTION_POOL_REGISTRY]
+    if pool_id:
+        return coll.find_one({"_id": f"pool_{pool_id}"})
+    entry = coll.find_one(
+        {"users_collection": users_collection, "auto": True},
+        sort=[("updated_at", DESCENDING)],
+    )
+    if entry is None:
+        return None
+    current = build_pool_version(load_users_accounts(db, users_collection).personas)
+    if entry["_id"] == current:
+        return entry
+    return coll.find_one({"_id": current})
+
+
 def get_available_pools(base_dir: Path) -> List[str]:
     """
-    Scans MongoDB for L1 collections and extracts unique pool IDs.
-    Returns a list of pool IDs (e.g., 'c9e438d4', 'd63e5437').
+    Returns the pool IDs (e.g., 'c9e438d4', 'd63e5437') that have L1 collections.
+    Reads the pool registry; falls back to scanning MongoDB collection names.
     """
     try:
         MONGO_URI = os.getenv("MONGO_URI")
@@ -36,6 +147,13 @@ def get_available_pools(base_dir: Path) -> List[str]:
         
         client = MongoClient(MONGO_URI)
         db = client[DB_NAME]
+
+        registered = db[COLLECTION_POOL_REGISTRY].distinct(
+            "pool_id", {"collections": {"$regex": "^L1_"}}
+        )
+        if registered:
+            client.close()
+            return sorted(registered)
         
         # Get all L1 collection names
         l1_collections = [c for c in db.list_collection_names() if c.startswith("L1_")]
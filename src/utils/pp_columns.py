@@ -0,0 +1,158 @@
+"""
+utils/pp_columns.py
+Especificación declarativa de las columnas de player_performances.
+
+Cada columna declara su tipo SQL y de dónde sale el valor:
+
+    "kills"                        → participante: p.get("kills", default)
+    "challenges.goldPerMinute"     → ruta anidada dentro del participante
+    "match.pool_id"                → contexto de la partida (dict común a sus 10 filas)
+    CALC                           → calculado en populate_pg.build_rows y pasado por nombre
+
+A partir de la misma lista salen:
+    - PP_COLUMNS_NAMES: orden de columnas para TableTarget / COPY / INSERT
+    - compile_extractor(): función que devuelve la fila como tupla, sin dict intermedio
+    - create_table_sql(): el CREATE TABLE de init_db.sql
+
+Regenerar el DDL tras cambiar la lista:
+    python src/utils/pp_columns.py
+"""
+
+from typing import NamedTuple
+
+CALC = "calc"
+
+
+class Column(NamedTuple):
+    name: str
+    sql_type: str
+    source: str
+    default: object = None
+    comment: str = ""
+
+
+PP_COLUMNS: tuple[Column, ...] = (
+    Column("match_id",             "VARCHAR(30)  NOT NULL",     "match.match_id"),
+    Column("puuid",                "VARCHAR(100) NOT NULL",     "puuid"),
+    Column("persona",              "VARCHAR(100)",              CALC, comment="NULL si es rival"),
+    Column("is_friend",            "BOOLEAN      NOT NULL",     CALC),
+    Column("champion_name",        "VARCHAR(60)",               "championName"),
+    Column("team_id",              "INTEGER",                   "teamId", comment="100 o 200"),
+    Column("win",                  "BOOLEAN",                   "win"),
+    Column("lane",                 "VARCHAR(20)",               "lane"),
+    Column("role",                 "VARCHAR(20)",               CALC, comment="teamPosition, o role si falta"),
+    Column("kills",                "INTEGER",                   "kills"),
+    Column("deaths",               "INTEGER",                   "deaths"),
+    Column("assists",              "INTEGER",                   "assists"),
+    Column("gold_earned",          "INTEGER",                   "goldEarned"),
+    Column("damage_dealt",         "INTEGER",                   "totalDamageDealtToChampions"),
+    Column("damage_taken",         "INTEGER",                   "totalDamageTaken"),
+    Column("vision_score",         "INTEGER",                   "visionScore"),
+    Column("damage_mitigated",     "INTEGER",                   "damageSelfMitigated"),
+    Column("cs_total",             "INTEGER",                   CALC,
+           comment="totalMinionsKilled + neutralMinionsKilled"),
+    Column("riot_id_name",         "VARCHAR(100)",              CALC, comment="Nombre visible (GameName#Tag)"),
+    Column("game_ended_surrender", "BOOLEAN DEFAULT FALSE",     CALC),
+    Column("pool_id",              "VARCHAR(30)  NOT NULL",     "match.pool_id",
+           comment="Clave de partición"),
+    Column("queue_id",             "INTEGER",                   "match.queue_id"),
+    Column("game_start_at",        "TIMESTAMPTZ",               "match.game_start_at"),
+    Column("duration_s",           "INTEGER",                   "match.duration_s"),
+    Column("friends_count",        "INTEGER",                   "match.friends_count",
+           comment="Número real de amigos en esta partida"),
+    Column("first_blood_kill",     "BOOLEAN DEFAULT FALSE",     "firstBloodKill", False),
+    Column("first_blood_assist",   "BOOLEAN DEFAULT FALSE",     "firstBloodAssist", False),
+    Column("longest_time_spent_living",     "INTEGER",          "longestTimeSpentLiving", 0),
+    Column("takedowns_first_x_minutes",     "NUMERIC",          "challenges.takedownsFirstXMinutes", 0),
+    Column("gold_per_minute",               "NUMERIC",          "challenges.goldPerMinute", 0),
+    Column("damage_per_minute",             "NUMERIC",          "challenges.damagePerMinute", 0),
+    Column("vision_score_per_minute",       "NUMERIC",          "challenges.visionScorePerMinute", 0),
+    Column("lane_minions_first_10_minutes", "INTEGER",          "challenges.laneMinionsFirst10Minutes", 0),
+    Column("spell1_casts",         "INTEGER DEFAULT 0",         "spell1Casts", 0),
+    Column("spell2_casts",         "INTEGER DEFAULT 0",         "spell2Casts", 0),
+    Column("spell3_casts",         "INTEGER DEFAULT 0",         "spell3Casts", 0),
+    Column("spell4_casts",         "INTEGER DEFAULT 0",         "spell4Casts", 0),
+)
+
+# Columnas de la tabla que no carga el ETL. Tabla particionada por LIST (pool_id):
+# las claves únicas deben incluir la clave de partición.
+PP_TABLE_HEAD = ("id                   BIGSERIAL    NOT NULL",)
+PP_TABLE_CONSTRAINTS = ("PRIMARY KEY (id, pool_id)", "UNIQUE (match_id, pool_id, puuid)")
+PP_PARTITION_BY = "LIST (pool_id)"
+
+PP_COLUMNS_NAMES = tuple(c.name for c in PP_COLUMNS)
+
+
+# =============================================================
+# EXTRACTOR
+# =============================================================
+
+def _source_expr(col: Column, nested: dict[str, str]) -> str:
+    if col.source == CALC:
+        return col.name
+    parts = col.source.split(".")
+    if parts[0] == "match":
+        return f"m[{parts[1]!r}]"
+    if len(parts) == 1:
+        return f"p.get({parts[0]!r}, {col.default!r})"
+    expr = nested[parts[0]]
+    for key in parts[1:-1]:
+        expr = f"({expr}.get({key!r}) or {{}})"
+    return f"{expr}.get({parts[-1]!r}, {col.default!r})"
+
+
+def compile_extractor(columns: tuple[Column, ...] = PP_COLUMNS):
+    """
+    Genera `extract(p, m, **calc) -> tuple` para `columns`.
+
+    `p` es el participante (dict de Riot), `m` el contexto de la partida y cada
+    columna CALC es un argumento con su nombre. Los sub-dicts de primer nivel
+    (p.ej. `challenges`) se leen una sola vez por fila.
+    """
+    for c in columns:
+        if not isinstance(c.default, (type(None), bool, int, float, str)):
+            raise ValueError(f"Default no literal en la columna {c.name}: {c.default!r}")
+
+    nested: dict[str, str] = {}
+    lines = []
+    for c in columns:
+        parts = c.source.split(".")
+        if c.source != CALC and parts[0] != "match" and len(parts) > 1 and parts[0] not in nested:
+            nested[parts[0]] = f"_n{len(nested)}"
+            lines.append(f"    {nested[parts[0]]} = p.get({parts[0]!r}) or {{}}")
+
+    calc = [c.name for c in columns if c.source == CALC]
+    args = ", ".join(["p", "m"] + ([f"*, {', '.join(calc)}"] if calc else []))
+    values = ",\n        ".join(_source_expr(c, nested) for c in columns)
+    src = f"def extract({args}):\n" + "\n".join(lines) + f"\n    return (\n        {values},\n    )\n"
+
+    namespace: dict = {}
+    exec(compile(src, "<pp_columns.extract>", "exec"), namespace)
+    extract = namespace["extract"]
+    extract.source = src
+    return extract
+
+
+# =============================================================
+# DDL
+# =============================================================
+
+def create_table_sql(table: str = "player_performances",
+                     columns: tuple[Column, ...] = PP_COLUMNS,
+                     head: tuple[str, ...] = PP_TABLE_HEAD,
+                     constraints: tuple[str, ...] = PP_TABLE_CONSTRAINTS,
+                     partition_by: str | None = PP_PARTITION_BY) -> str:
+    defs = [(d, "") for d in head]
+    defs += [(f"{c.name:<20} {c.sql_type}", c.comment) for c in columns]
+    defs += [(d, "") for d in constraints]
+
+    body = []
+    for i, (code, comment) in enumerate(defs):
+        line = f"    {code}{',' if i < len(defs) - 1 else ''}"
+        body.append(f"{line:<50} -- {comment}" if comment else line)
+    partition = f" PARTITION BY {partition_by}" if partition_by else ""
+    return f"CREATE TABLE IF NOT EXISTS {table} (\n" + "\n".join(body) + f"\n){partition};"
+
+
+if __name__ == "__main__":
+    print(create_table_sql())
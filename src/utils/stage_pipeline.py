@@ -0,0 +1,112 @@
+"""
+utils/stage_pipeline.py
+Pipeline productor/consumidor en hilos: lectura → transformación → escritura.
+
+    reader (1 hilo)        itera `source` y agrupa los elementos en lotes
+    transform (N hilos)    aplica `transform(lote)` a cada lote
+    writer (hilo llamante) pasa cada resultado a `sink(resultado)`
+
+Las colas entre etapas están acotadas (`queue_size` lotes), así que el lector no
+adelanta más de unos pocos lotes al escritor y la memoria se mantiene estable.
+La latencia de red de Mongo (lector) y de PostgreSQL (escritor) se solapa.
+
+Si una etapa lanza una excepción, el resto se detiene y la excepción se relanza
+en el hilo llamante. El orden de los lotes en `sink` no está garantizado con más
+de un hilo de transformación.
+
+Uso:
+    run_pipeline(cursor, transform, sink, batch_size=500, transform_workers=2)
+"""
+
+import queue
+import threading
+from itertools import islice
+
+_DONE = object()
+_POLL_S = 0.5
+
+
+def _put(q: queue.Queue, item, stop: threading.Event) -> bool:
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=_POLL_S)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _get(q: queue.Queue, stop: threading.Event):
+    while not stop.is_set():
+        try:
+            return q.get(timeout=_POLL_S)
+        except queue.Empty:
+            continue
+    return _DONE
+
+
+def run_pipeline(source, transform, sink, batch_size: int = 500,
+                 transform_workers: int = 1, queue_size: int = 4):
+    transform_workers = max(1, transform_workers)
+    q_in: queue.Queue = queue.Queue(maxsize=queue_size)
+    q_out: queue.Queue = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    errors: list[BaseException] = []
+
+    def fail(exc: BaseException):
+        errors.append(exc)
+        stop.set()
+
+    def reader():
+        try:
+            it = iter(source)
+            while True:
+                batch = list(islice(it, batch_size))
+                if not batch or not _put(q_in, batch, stop):
+                    break
+        except BaseException as exc:
+            fail(exc)
+        finally:
+            for _ in range(transform_workers):
+                _put(q_in, _DONE, stop)
+
+    def transformer():
+        try:
+            while True:
+                batch = _get(q_in, stop)
+                if batch is _DONE:
+                    break
+                if not _put(q_out, transform(batch), stop):
+                    break
+        except BaseException as exc:
+            fail(exc)
+        finally:
+            _put(q_out, _DONE, stop)
+
+    threads = [threading.Thread(target=reader, name="pipeline-reader", daemon=True)]
+    threads += [
+        threading.Thread(target=transformer, name=f"pipeline-transform-{i}", daemon=True)
+        for i in range(transform_workers)
+    ]
+    for t in threads:
+        t.start()
+
+    # Writer: el hilo llamante, dueño de la conexión de escritura
+    pending = transform_workers
+    try:
+        while pending:
+            result = _get(q_out, stop)
+            if result is _DONE:
+                if stop.is_set():
+                    break
+                pending -= 1
+                continue
+            sink(result)
+    except BaseException as exc:
+        fail(exc)
+    finally:
+        for t in threads:
+            t.join()
+
+    if errors:
+        raise errors[0]
@@ -0,0 +1,165 @@
+"""
+utils/streaks.py
+Rachas de victorias/derrotas precalculadas en la tabla `streaks`.
+
+Una fila por (pool, cola, umbral min_friends, persona, posición) con el estado de la
+racha al final de la serie: racha máxima de victorias y derrotas, resultado y longitud
+de la racha actual, y la fecha de la última partida contada. La serie de un umbral N
+son las partidas de la persona con friends_count >= N (lo mismo que filtra el
+dashboard); la posición es 'Todos' o la que da position_of().
+
+Se actualiza junto a los agregados (metric_aggregates._apply), con las partidas de
+`_agg_pending`: si todas son posteriores a la última contada, el estado se extiende;
+si llega alguna anterior (carga de histórico), se recalcula la persona entera en esa
+pool y cola a partir de player_performances.
+"""
+
+from typing import NamedTuple
+
+import psycopg2.extras
+
+ALL_POSITIONS = "Todos"
+
+_MID = ("MIDDLE", "MID")
+
+
+def position_of(role: str | None, lane: str | None) -> str | None:
+    """Posición del dashboard (TOP/JUNGLE/MID/ADC/SUPPORT) o None; mismo criterio que _POS_FILTER_REC."""
+    if role is None:
+        return {"TOP": "TOP", "JUNGLE": "JUNGLE", "MIDDLE": "MID", "MID": "MID"}.get(lane)
+    if role in ("TOP", "JUNGLE"):
+        return role
+    if role in _MID:
+        return "MID"
+    if role == "BOTTOM":
+        return "ADC"
+    if role in ("UTILITY", "SUPPORT"):
+        return "SUPPORT"
+    return None
+
+
+class Streak(NamedTuple):
+    max_win: int = 0
+    max_lose: int = 0
+    current_win: bool | None = None
+    current_len: int = 0
+    last_game_at: object = None
+    last_match_id: str | None = None
+
+
+def extend(state: Streak, win: bool, game_at, match_id: str) -> Streak:
+    win = bool(win)
+    length = state.current_len + 1 if state.current_len and state.current_win == win else 1
+    return Streak(
+        max(state.max_win, length) if win else state.max_win,
+        state.max_lose if win else max(state.max_lose, length),
+        win, length, game_at, match_id,
+    )
+
+
+def _keys(row) -> list[tuple]:
+    """Series a las que pertenece una fila de player_performances."""
+    pool_id, queue_id, friends_count, persona, role, lane = row[:6]
+    positions = [ALL_POSITIONS]
+    pos = position_of(role, lane)
+    if pos:
+        positions.append(pos)
+    return [(pool_id, queue_id, n, persona, p)
+            for n in range(1, (friends_count or 0) + 1) for p in positions]
+
+
+_ROW_COLS = "pp.pool_id, pp.queue_id, pp.friends_count, pp.persona, pp.role, pp.lane, pp.win, pp.game_start_at, pp.match_id"
+_ORDER = "ORDER BY pp.game_start_at, pp.match_id"
+
+
+def _fold(rows, states: dict[tuple, Streak]) -> dict[tuple, Streak]:
+    for row in rows:
+        win, game_at, match_id = row[6:]
+        for key in _keys(row):
+            states[key] = extend(states.get(key, Streak()), win, game_at, match_id)
+    return states
+
+
+def _save(cur, states: dict[tuple, Streak]):
+    if not states:
+        return
+    psycopg2.extras.execute_values(cur, """
+        INSERT INTO streaks (pool_id, queue_id, min_friends, persona, position,
+                             max_win_streak, max_lose_streak, current_win, current_len,
+                             last_game_at, last_match_id)
+        VALUES %s
+        ON CONFLICT (pool_id, queue_id, min_friends, persona, position) DO UPDATE SET
+            max_win_streak  = EXCLUDED.max_win_streak,
+            max_lose_streak = EXCLUDED.max_lose_streak,
+            current_win     = EXCLUDED.current_win,
+            current_len     = EXCLUDED.current_len,
+            last_game_at    = EXCLUDED.last_game_at,
+            last_match_id   = EXCLUDED.last_match_id
+    """, [key + tuple(s) for key, s in states.items()])
+
+
+def _recompute(cur, series: set[tuple]) -> dict[tuple, Streak]:
+    """Estado completo de las (pool, cola, persona) indicadas, desde todas sus partidas."""
+    states: dict[tuple, Streak] = {}
+    for pool_id, queue_id, persona in sorted(series):
+        cur.execute("DELETE FROM streaks WHERE pool_id = %s AND queue_id = %s AND persona = %s",
+                    (pool_id, queue_id, persona))
+        cur.execute(f"""
+            SELECT {_ROW_COLS} FROM player_performances pp
+            WHERE pp.pool_id = %s AND pp.queue_id = %s AND pp.persona = %s AND pp.is_friend
+            {_ORDER}
+        """, (pool_id, queue_id, persona))
+        _fold(cur.fetchall(), states)
+    return states
+
+
+def update_streaks(cur, pending: str = "_agg_pending") -> int:
+    """Aplica a `streaks` las partidas de `pending`. Devuelve las series actualizadas."""
+    cur.execute(f"""
+        SELECT {_ROW_COLS}
+        FROM player_performances pp
+        JOIN {pending} n ON n.match_id = pp.match_id AND n.pool_id = pp.pool_id
+        WHERE pp.is_friend AND pp.persona IS NOT NULL
+        {_ORDER}
+    """)
+    rows = cur.fetchall()
+    if not rows:
+        return 0
+
+    # Primera partida nueva de cada (pool, cola, persona)
+    first_new: dict[tuple, object] = {}
+    for row in rows:
+        first_new.setdefault((row[0], row[1], row[3]), row[7])
+
+    cur.execute("""
+        SELECT pool_id, queue_id, min_friends, persona, position,
+               max_win_streak, max_lose_streak, current_win, current_len, last_game_at, last_match_id
+        FROM streaks
+        WHERE (pool_id, queue_id, persona) IN (SELECT * FROM unnest(%s::text[], %s::int[], %s::text[]))
+    """, tuple(map(list, zip(*first_new))))
+    states = {tuple(r[:5]): Streak(*r[5:]) for r in cur.fetchall()}
+
+    # Partidas anteriores a lo ya contado: esa persona se recalcula entera
+    stale = set()
+    for key, s in states.items():
+        first = first_new[(key[0], key[1], key[3])]
+        if s.last_game_at is None or first is None or first <= s.last_game_at:
+            stale.add((key[0], key[1], key[3]))
+
+    states = {k: s for k, s in states.items() if (k[0], k[1], k[3]) not in stale}
+    _fold((r for r in rows if (r[0], r[1], r[3]) not in stale), states)
+    states.update(_recompute(cur, stale))
+    _save(cur, states)
+    return len(states)
+
+
+def rebuild_streaks(cur, pool_id: str | None = None) -> int:
+    """Recalcula `streaks` desde player_performances (todas las pools si None)."""
+    cur.execute("""
+        SELECT DISTINCT pool_id, queue_id, persona FROM player_performances
+        WHERE is_friend AND persona IS NOT NULL AND (%(pool)s::text IS NULL OR pool_id = %(pool)s)
+    """, {"pool": pool_id})
+    states = _recompute(cur, {tuple(r) for r in cur.fetchall()})
+    _save(cur, states)
+    return len(states)
+
@@ -0,0 +1,78 @@
+"""
+utils/team_columns.py
+Especificación de team_performances: una fila por (partida, pool, equipo).
+
+Mismo formato que utils/pp_columns.py, pero el dict de origen es el equipo de
+`info.teams` (objetivos) y los totales de jugadores llegan como columnas CALC,
+acumulados en populate_pg.build_rows sobre los 5 participantes del equipo.
+
+Regenerar el DDL tras cambiar la lista:
+    cd src && python -m utils.team_columns
+"""
+
+from utils.pp_columns import CALC, Column, compile_extractor, create_table_sql
+
+TEAM_COLUMNS: tuple[Column, ...] = (
+    Column("match_id",        "VARCHAR(30)  NOT NULL",  "match.match_id"),
+    Column("pool_id",         "VARCHAR(30)  NOT NULL",  "match.pool_id"),
+    Column("team_id",         "INTEGER      NOT NULL",  "teamId", comment="100 o 200"),
+    Column("queue_id",        "INTEGER",                "match.queue_id"),
+    Column("game_start_at",   "TIMESTAMPTZ",            "match.game_start_at"),
+    Column("duration_s",      "INTEGER",                "match.duration_s"),
+    Column("friends_count",   "INTEGER",                "match.friends_count",
+           comment="Amigos en la partida (ambos equipos)"),
+    Column("friends_on_team", "INTEGER",                CALC),
+    Column("is_friends_team", "BOOLEAN      NOT NULL",  CALC,
+           comment="Equipo con más amigos (empate: el de menor team_id)"),
+    Column("win",             "BOOLEAN",                "win"),
+    Column("kills",           "INTEGER",                CALC),
+    Column("deaths",          "INTEGER",                CALC),
+    Column("assists",         "INTEGER",                CALC),
+    Column("damage_dealt",    "INTEGER",                CALC),
+    Column("damage_taken",    "INTEGER",                CALC),
+    Column("gold_earned",     "INTEGER",                CALC),
+    Column("vision_score",    "INTEGER",                CALC),
+    Column("cs_total",        "INTEGER",                CALC),
+    Column("first_blood",     "BOOLEAN",                "objectives.champion.first", False),
+    Column("first_tower",     "BOOLEAN",                "objectives.tower.first", False),
+    Column("first_inhibitor", "BOOLEAN",                "objectives.inhibitor.first", False),
+    Column("first_dragon",    "BOOLEAN",                "objectives.dragon.first", False),
+    Column("first_herald",    "BOOLEAN",                "objectives.riftHerald.first", False),
+    Column("first_horde",     "BOOLEAN",                "objectives.horde.first", False, comment="Larvas del vacío"),
+    Column("first_baron",     "BOOLEAN",                "objectives.baron.first", False),
+    Column("tower_kills",     "INTEGER",                "objectives.tower.kills", 0),
+    Column("inhibitor_kills", "INTEGER",                "objectives.inhibitor.kills", 0),
+    Column("dragon_kills",    "INTEGER",                "objectives.dragon.kills", 0),
+    Column("herald_kills",    "INTEGER",                "objectives.riftHerald.kills", 0),
+    Column("horde_kills",     "INTEGER",                "objectives.horde.kills", 0),
+    Column("baron_kills",     "INTEGER",                "objectives.baron.kills", 0),
+)
+
+TEAM_TABLE_CONSTRAINTS = ("PRIMARY KEY (match_id, pool_id, team_id)",)
+
+TEAM_COLUMNS_NAMES = tuple(c.name for c in TEAM_COLUMNS)
+
+# Totales por equipo que build_rows acumula desde los participantes: columna → campo Riot
+# (cs_total se suma aparte: totalMinionsKilled + neutralMinionsKilled)
+TEAM_TOTALS = {
+    "kills": "kills",
+    "deaths": "deaths",
+    "assists": "assists",
+    "damage_dealt": "totalDamageDealtToChampions",
+    "damage_taken": "totalDamageTaken",
+    "gold_earned": "goldEarned",
+    "vision_score": "visionScore",
+}
+
+
+def team_extractor():
+    return compile_extractor(TEAM_COLUMNS)
+
+
+def team_table_sql() -> str:
+    return create_table_sql("team_performances", TEAM_COLUMNS, head=(),
+                            constraints=TEAM_TABLE_CONSTRAINTS, partition_by=None)
+
+
+if __name__ == "__main__":
+    print(team_table_sql())